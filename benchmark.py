@@ -0,0 +1,422 @@
+import argparse
+import difflib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import fitz # PyMuPDF
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+import pytesseract
+import ocr_pipeline
+import ocr_preprocess
+
+# Benchmark harness. Generates a deterministic synthetic corpus of "scanned" PDFs (rendered text
+# with skew, speckle noise, mixed page sizes and blank pages), times the pipeline stages one by
+# one on a single core, then runs the OCR workers and the full convert_files batch for each
+# worker count in a fresh child process (so peak RSS is per run). Results are written as JSON;
+# --compare checks them against an earlier result file and fails on regressions. The OCR text is
+# also scored against the corpus' ground truth with and without --preprocess steps.
+#
+#   python benchmark.py --workers 1,2,4 --output bench.json
+#   python benchmark.py --workers 1,2,4 --compare bench.json
+
+BENCHMARK_VERSION = 1
+DEFAULT_SEED = 1234
+DEFAULT_DOCUMENTS = 2
+DEFAULT_PAGES_PER_DOCUMENT = 20
+SCAN_DPI = 200
+BLANK_PAGE_EVERY = 9
+PAGE_SIZES = [(595, 842), (612, 792), (420, 595), (1191, 842)] # A4, Letter, A5, A3 landscape (points)
+PAGE_SIZE_WEIGHTS = [6, 3, 2, 1]
+HEURISTICS_BENCH_LINES = 200_000
+DEFAULT_REGRESSION_TOLERANCE = 0.10
+WORDS = ("the of and to in is that for it as was with be by on not he this are or his from at which but have an "
+         "they you were her she there been one all we their has would when if so no will more what up out who "
+         "document page scanner archive library chapter section report figure table method result analysis").split()
+
+# ---- Synthetic corpus ----
+
+def synthetic_page_lines(rng, page_number):
+    lines = []
+    if page_number % 5 == 0:
+        lines.append(f"CHAPTER {page_number // 5 + 1} {rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}")
+    for paragraph in range(rng.randint(3, 6)):
+        if rng.random() < 0.4:
+            lines.append(f"{paragraph + 1}.{rng.randint(1, 9)} {' '.join(rng.choice(WORDS) for _ in range(3)).title()}")
+        elif rng.random() < 0.2:
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(3)).upper())
+        for _ in range(rng.randint(4, 9)):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 13))).capitalize())
+        lines.append("")
+    return lines
+
+# Returns (image, the lines that fit on the page)
+def synthetic_scan_image(rng, width_pt, height_pt, lines):
+    scale = SCAN_DPI / 72
+    width_px, height_px = int(width_pt * scale), int(height_pt * scale)
+    img = Image.new("L", (width_px, height_px), 255)
+    if lines:
+        draw = ImageDraw.Draw(img)
+        font = ImageFont.load_default(size=int(11 * scale))
+        heading_font = ImageFont.load_default(size=int(16 * scale))
+        x, y = int(72 * scale), int(72 * scale)
+        line_height = int(15 * scale)
+        for line_index, line in enumerate(lines):
+            if y > height_px - 72 * scale:
+                lines = lines[:line_index]
+                break
+            draw.text((x, y), line, fill=rng.randint(0, 60), font=heading_font if line.isupper() or line.startswith("CHAPTER") else font)
+            y += line_height
+        img = img.rotate(rng.uniform(-1.5, 1.5), resample=Image.Resampling.BICUBIC, fillcolor=255)
+    # Speckle noise from seeded bytes (Image.effect_noise is not reproducible)
+    noise = Image.frombytes("L", (width_px, height_px), rng.randbytes(width_px * height_px))
+    speckle = noise.point(lambda value: 0 if value < 2 else 255)
+    return ImageChops.darker(img, speckle), lines
+
+# Returns (pdf_paths, {pdf_path: [ground truth text of each page]})
+def generate_corpus(directory, documents, pages_per_document, seed):
+    rng = random.Random(seed)
+    pdf_paths, ground_truth = [], {}
+    for doc_index in range(documents):
+        doc = fitz.open()
+        page_truths = []
+        for page_number in range(pages_per_document):
+            width_pt, height_pt = rng.choices(PAGE_SIZES, weights=PAGE_SIZE_WEIGHTS)[0]
+            blank = page_number % BLANK_PAGE_EVERY == BLANK_PAGE_EVERY - 1
+            img, lines = synthetic_scan_image(rng, width_pt, height_pt, [] if blank else synthetic_page_lines(rng, page_number))
+            page_truths.append("\n".join(lines))
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=75)
+            page = doc.new_page(width=width_pt, height=height_pt)
+            page.insert_image(page.rect, stream=buffer.getvalue())
+        pdf_path = os.path.join(directory, f"synthetic_{seed}_{doc_index:02d}.pdf")
+        doc.set_metadata({"producer": "ocr-pdf-converter benchmark", "creator": "", "creationDate": "", "modDate": ""})
+        doc.save(pdf_path, garbage=3, deflate=True, no_new_id=True) # Byte-identical across runs
+        doc.close()
+        pdf_paths.append(pdf_path)
+        ground_truth[pdf_path] = page_truths
+    return pdf_paths, ground_truth
+
+# ---- Statistics ----
+
+# unit is what one latency was measured for: "pages", or "documents" for the open stage
+def summarize(latencies_ms, wall_seconds=None, unit="pages"):
+    if not latencies_ms:
+        return {unit: 0}
+    total_seconds = wall_seconds if wall_seconds is not None else sum(latencies_ms) / 1000
+    if len(latencies_ms) > 1:
+        percentiles = statistics.quantiles(latencies_ms, n=100, method="inclusive")
+        p50, p95 = percentiles[49], percentiles[94]
+    else:
+        p50 = p95 = latencies_ms[0]
+    return {unit: len(latencies_ms), "seconds": round(total_seconds, 4),
+            f"{unit}_per_sec": round(len(latencies_ms) / total_seconds, 3) if total_seconds > 0 else None,
+            "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "max_ms": round(max(latencies_ms), 3)}
+
+def peak_rss_mb():
+    try:
+        import resource # Not available on Windows
+    except ImportError:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS; for children it is the largest single child
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1),
+            "largest_worker": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1)}
+
+# ---- Single-core stage timings ----
+
+def benchmark_stages(pdf_paths, ocr_lang, dpi, ocr_options, run_ocr, run_pandoc, work_directory):
+    timings = {stage: [] for stage in ["open", "rasterize", "encode", "ocr", "heuristics", "pandoc"]}
+    backend = ocr_pipeline.ocr_backends.get_ocr_backend(ocr_options.get("backend", ocr_pipeline.ocr_backends.DEFAULT_OCR_BACKEND))
+    raster_mode = ocr_options.get("raster_mode", ocr_pipeline.DEFAULT_RASTER_MODE)
+    psm = ocr_options.get("psm", ocr_pipeline.ocr_backends.DEFAULT_PSM)
+    encoded_bytes = pixels = 0
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        doc = fitz.open(pdf_path)
+        timings["open"].append((time.perf_counter() - start) * 1000)
+        page_texts = []
+        for page in doc:
+            start = time.perf_counter()
+            page_dpi, clips, cols = ocr_pipeline.ocr_render.plan_page_render(page, dpi, ocr_options)
+            rendered = [ocr_pipeline.render_page_image(page, page_dpi, raster_mode, clip) for clip in clips]
+            timings["rasterize"].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            for pix, img in rendered:
+                buffer = io.BytesIO()
+                img.save(buffer, format="PPM") # What the batch backend writes for Tesseract
+                encoded_bytes += buffer.tell()
+                pixels += img.width * img.height
+            timings["encode"].append((time.perf_counter() - start) * 1000)
+
+            if run_ocr:
+                start = time.perf_counter()
+                tile_texts = backend.recognize_pages([img for pix, img in rendered], ocr_lang, psm)
+                timings["ocr"].append((time.perf_counter() - start) * 1000)
+                page_texts.append(ocr_pipeline.ocr_render.stitch_tile_texts(tile_texts, cols) if cols > 1 or len(clips) > 1 else tile_texts[0])
+            else:
+                page_texts.append("\n".join(synthetic_page_lines(random.Random(page.number), page.number)) + "\f")
+            for pix, img in rendered:
+                img.close()
+            del rendered
+
+        markdown_path = os.path.join(work_directory, os.path.splitext(os.path.basename(pdf_path))[0] + "_bench.md")
+        blank_lines = ocr_pipeline.ocr_format.BlankLineCollapser()
+        with open(markdown_path, "w", encoding="utf-8") as f_md:
+            for page_number, page_text in enumerate(page_texts):
+                start = time.perf_counter()
+                formatted_text = ocr_pipeline.ocr_format.format_page_text(page_text)
+                timings["heuristics"].append((time.perf_counter() - start) * 1000)
+                if page_number:
+                    f_md.write(blank_lines.feed("\n\n"))
+                f_md.write(blank_lines.feed(ocr_pipeline.ocr_format.escape_markdown(formatted_text)))
+            f_md.write(blank_lines.finish())
+
+        if run_pandoc:
+            start = time.perf_counter()
+            error = ocr_pipeline.run_pandoc(pdf_path, markdown_path, work_directory, ocr_pipeline.resolve_pandoc_settings())
+            # Per-page share of the document's Pandoc time, so it is comparable with the other stages
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if error is None:
+                timings["pandoc"].extend([elapsed_ms / len(doc)] * len(doc))
+        doc.close()
+
+    results = {stage: summarize(latencies, unit="documents" if stage == "open" else "pages") for stage, latencies in timings.items() if latencies}
+    results["encode"]["bytes"] = encoded_bytes
+    results["rasterize"]["megapixels"] = round(pixels / 1e6, 2)
+    for stage in ["ocr", "pandoc"]:
+        if not timings[stage]:
+            results[stage] = {"skipped": "tesseract not found" if stage == "ocr" else "pandoc not found or failed"}
+    return results
+
+# Throughput of the heading heuristics on a large text (whole document, as format_text_with_heuristics)
+def benchmark_heuristics_throughput(seed):
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < HEURISTICS_BENCH_LINES:
+        lines.extend(synthetic_page_lines(rng, len(lines) % 50))
+    text = "\n".join(lines[:HEURISTICS_BENCH_LINES])
+    start = time.perf_counter()
+    ocr_pipeline.ocr_format.format_text_with_heuristics(text)
+    elapsed = time.perf_counter() - start
+    return {"lines": HEURISTICS_BENCH_LINES, "megabytes": round(len(text.encode("utf-8")) / 1e6, 2), "seconds": round(elapsed, 4),
+            "lines_per_sec": round(HEURISTICS_BENCH_LINES / elapsed), "mb_per_sec": round(len(text.encode("utf-8")) / 1e6 / elapsed, 2)}
+
+# ---- Preprocessing: OCR time and accuracy with and without it ----
+
+# Share of the ground-truth words found, in order, in the OCR text (1.0 for an empty page with no text)
+def word_accuracy(truth, ocr_text):
+    truth_words, ocr_words = truth.split(), ocr_text.split()
+    if not truth_words:
+        return 1.0 if not ocr_words else 0.0
+    matcher = difflib.SequenceMatcher(None, truth_words, ocr_words, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(truth_words)
+
+def benchmark_preprocessing(pdf_paths, ground_truth, ocr_lang, dpi, ocr_options, preprocess_steps):
+    tesseract_cmd = getattr(pytesseract.pytesseract, 'tesseract_cmd', None)
+    results = {}
+    for steps in [[], preprocess_steps]:
+        variant_options = dict(ocr_options, preprocess=steps)
+        preprocess_ms, ocr_ms, accuracies = [], [], []
+        for pdf_path in pdf_paths:
+            for page_num, page_truth in enumerate(ground_truth[pdf_path]):
+                page_results = ocr_pipeline.ocr_page_range_worker_function((pdf_path, [page_num], ocr_lang, dpi, tesseract_cmd, variant_options))
+                page_text, page_info = page_results[0][1], page_results[0][3]
+                preprocess_ms.append(page_info["metrics"]["preprocess_ms"])
+                ocr_ms.append(page_info["metrics"]["encode_ms"] + page_info["metrics"]["ocr_ms"])
+                accuracies.append(word_accuracy(page_truth, page_text))
+        results["+".join(steps) or "none"] = {"preprocess": summarize(preprocess_ms), "ocr": summarize(ocr_ms),
+                                              "word_accuracy": round(statistics.fmean(accuracies), 4) if accuracies else None}
+    return results
+
+# ---- Per worker count (runs in a child process) ----
+
+def _timed_page_task(args_tuple):
+    start = time.perf_counter()
+    results = ocr_pipeline.ocr_page_range_worker_function(args_tuple)
+    return (time.perf_counter() - start) * 1000, len(results)
+
+def run_worker_benchmark(config):
+    pdf_paths, workers, executor = config["pdf_paths"], config["workers"], config["executor"]
+    ocr_options = config["ocr_options"]
+    tesseract_cmd = getattr(pytesseract.pytesseract, 'tesseract_cmd', None)
+    tasks = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            tasks.extend((pdf_path, [page_num], config["ocr_lang"], config["dpi"], tesseract_cmd, ocr_options) for page_num in range(len(doc)))
+
+    latencies = []
+    start = time.perf_counter()
+    with ocr_pipeline.create_ocr_pool(workers, executor) as pool:
+        for elapsed_ms, page_count in pool.imap_unordered(_timed_page_task, tasks):
+            latencies.append(elapsed_ms / page_count)
+    result = {"workers": workers, "executor": executor, "ocr_workers": summarize(latencies, time.perf_counter() - start)}
+
+    if config["end_to_end"]:
+        total_pages = len(tasks)
+        with tempfile.TemporaryDirectory(prefix="ocr_bench_out_") as out_dir:
+            start = time.perf_counter()
+            failures = ocr_pipeline.convert_files(pdf_paths, out_dir, ocr_lang=config["ocr_lang"], dpi=config["dpi"], num_processes=workers,
+                                                  executor=executor, ocr_options=ocr_options, resume=False,
+                                                  output_engine=config["output_engine"], status_callback=lambda message: None)
+            elapsed = time.perf_counter() - start
+        result["end_to_end"] = {"pages": total_pages, "seconds": round(elapsed, 4), "pages_per_sec": round(total_pages / elapsed, 3),
+                                "output_engine": config["output_engine"], "failed_files": len(failures)}
+        if failures: # A batch that failed part-way is not a throughput; keep it out of --compare
+            result["end_to_end"].update(pages_per_sec=None, skipped=f"{len(failures)} file(s) failed")
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def run_worker_benchmark_in_child(config, verbose):
+    with tempfile.TemporaryDirectory(prefix="ocr_bench_cfg_") as tmp_dir:
+        config_path, result_path = os.path.join(tmp_dir, "config.json"), os.path.join(tmp_dir, "result.json")
+        with open(config_path, "w", encoding="utf-8") as f_config:
+            json.dump(config, f_config)
+        output = None if verbose else subprocess.DEVNULL
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", config_path, result_path], stdout=output, stderr=output)
+        if proc.returncode != 0 or not os.path.exists(result_path):
+            return {"workers": config["workers"], "executor": config["executor"], "error": f"child exited with {proc.returncode}"}
+        with open(result_path, encoding="utf-8") as f_result:
+            return json.load(f_result)
+
+# ---- Regression check ----
+
+# Compares pages/sec (documents/sec for the open stage) of every stage and worker run with a previous result. Returns a list of regressions.
+def compare_results(current, baseline, tolerance):
+    def throughputs(result):
+        values = {f"stage:{stage}": stats.get("pages_per_sec", stats.get("documents_per_sec")) for stage, stats in result.get("stages", {}).items()}
+        values["heuristics_throughput"] = result.get("heuristics_throughput", {}).get("mb_per_sec")
+        for variant, stats in result.get("preprocessing", {}).items():
+            if isinstance(stats, dict):
+                values[f"preprocess:{variant}"] = stats["preprocess"].get("pages_per_sec") if variant != "none" else None
+                values[f"ocr_after_preprocess:{variant}"] = stats["ocr"].get("pages_per_sec")
+                values[f"word_accuracy:{variant}"] = stats.get("word_accuracy")
+        for run in result.get("workers", []):
+            for section in ["ocr_workers", "end_to_end"]:
+                if section in run:
+                    values[f"{section}:{run['executor']}:{run['workers']}"] = run[section].get("pages_per_sec")
+        return {name: value for name, value in values.items() if value}
+
+    current_values, baseline_values = throughputs(current), throughputs(baseline)
+    regressions = []
+    for name, baseline_value in sorted(baseline_values.items()):
+        current_value = current_values.get(name)
+        if current_value is None:
+            continue
+        ratio = current_value / baseline_value
+        marker = "REGRESSION" if ratio < 1 - tolerance else "ok"
+        print(f"{name:<32} {baseline_value:>12.3f} -> {current_value:>12.3f}  ({ratio:6.2f}x)  {marker}")
+        if marker != "ok":
+            regressions.append(name)
+    return regressions
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the OCR converter on a synthetic scanned-PDF corpus.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to run")
+    parser.add_argument("--executor", default="process", choices=["process", "thread"])
+    parser.add_argument("--documents", type=int, default=DEFAULT_DOCUMENTS)
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES_PER_DOCUMENT, help="Pages per synthetic document")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("-l", "--lang", default="eng")
+    parser.add_argument("--dpi", type=int, default=ocr_pipeline.DEFAULT_DPI)
+    parser.add_argument("--ocr-backend", default=ocr_pipeline.ocr_backends.DEFAULT_OCR_BACKEND, choices=ocr_pipeline.ocr_backends.OCR_BACKENDS)
+    parser.add_argument("--output-engine", default=ocr_pipeline.ocr_output.DEFAULT_OUTPUT_ENGINE, choices=ocr_pipeline.ocr_output.OUTPUT_ENGINES)
+    parser.add_argument("--preprocess", default="all", help="Steps compared against no preprocessing (see ocr_preprocess), or 'none' to skip")
+    parser.add_argument("--corpus-dir", default=None, help="Keep the generated corpus here (default: a temp folder)")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Only time the OCR workers per worker count, not convert_files")
+    parser.add_argument("-o", "--output", default=None, help="Write the JSON result here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON result to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_REGRESSION_TOLERANCE, help="Allowed relative slowdown before --compare fails")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline output of the worker runs")
+    parser.add_argument("--child", nargs=2, metavar=("CONFIG", "RESULT"), help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.child:
+        with open(args.child[0], encoding="utf-8") as f_config:
+            config = json.load(f_config)
+        result = run_worker_benchmark(config)
+        with open(args.child[1], "w", encoding="utf-8") as f_result:
+            json.dump(result, f_result)
+        return 0
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+    tesseract_found = ocr_pipeline.is_tesseract_available()
+    pandoc_found = args.output_engine == "pandoc" and shutil.which("pandoc") is not None
+    ocr_options = {"backend": args.ocr_backend, "force_ocr": True}
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="ocr_bench_corpus_")
+    os.makedirs(corpus_dir, exist_ok=True)
+    try:
+        print(f"Generating corpus: {args.documents} document(s) x {args.pages} pages (seed {args.seed}) in {corpus_dir}", file=sys.stderr)
+        pdf_paths, ground_truth = generate_corpus(corpus_dir, args.documents, args.pages, args.seed)
+
+        print("Timing stages on one core...", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="ocr_bench_stage_") as stage_dir:
+            stages = benchmark_stages(pdf_paths, args.lang, args.dpi, ocr_options, tesseract_found, pandoc_found, stage_dir)
+        heuristics_throughput = benchmark_heuristics_throughput(args.seed)
+
+        preprocess_steps = ocr_preprocess.parse_preprocess_steps(args.preprocess)
+        if not tesseract_found or not preprocess_steps:
+            preprocessing = {"skipped": "tesseract not found" if preprocess_steps else "no steps selected"}
+        elif not ocr_preprocess.is_available():
+            preprocessing = {"skipped": "numpy not installed"}
+        else:
+            print(f"Comparing OCR with and without preprocessing ({'+'.join(preprocess_steps)})...", file=sys.stderr)
+            preprocessing = benchmark_preprocessing(pdf_paths, ground_truth, args.lang, args.dpi, ocr_options, preprocess_steps)
+
+        worker_results = []
+        if tesseract_found:
+            for workers in worker_counts:
+                print(f"Running with {workers} {args.executor} worker(s)...", file=sys.stderr)
+                worker_results.append(run_worker_benchmark_in_child({
+                    "pdf_paths": pdf_paths, "workers": workers, "executor": args.executor, "ocr_lang": args.lang, "dpi": args.dpi,
+                    "ocr_options": ocr_options, "output_engine": args.output_engine, "end_to_end": not args.skip_end_to_end,
+                }, args.verbose))
+        else:
+            print("Tesseract not found: skipping the OCR and worker-count runs.", file=sys.stderr)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    result = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                        "pymupdf": fitz.VersionBind, "tesseract": str(pytesseract.get_tesseract_version()) if tesseract_found else None,
+                        "ocr_backend": args.ocr_backend},
+        "corpus": {"documents": args.documents, "pages_per_document": args.pages, "seed": args.seed, "scan_dpi": SCAN_DPI},
+        "settings": {"ocr_lang": args.lang, "dpi": args.dpi, "executor": args.executor, "output_engine": args.output_engine},
+        "stages": stages,
+        "heuristics_throughput": heuristics_throughput,
+        "preprocessing": preprocessing,
+        "workers": worker_results,
+    }
+    result_json = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f_out:
+            f_out.write(result_json + "\n")
+        print(f"Benchmark result saved: {args.output}", file=sys.stderr)
+    else:
+        print(result_json)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f_baseline:
+            baseline = json.load(f_baseline)
+        regressions = compare_results(result, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
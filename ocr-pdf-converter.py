@@ -1,481 +1,172 @@
-import tkinter
-import tkinter.messagebox
-import customtkinter
-from tkinter import filedialog
-import os
-import threading
-import subprocess # For Pandoc
-import pytesseract
-import fitz # PyMuPDF
-from PIL import Image
-import io
-import multiprocessing # For parallel processing
-import re # For Regex operations
-
-# Specify the path to Tesseract if it's not in the system's PATH (may be needed for Windows)
-try:
-    subprocess.run(["tesseract", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    print("Tesseract OCR found in PATH.")
-    TESSERACT_AVAILABLE = True
-except (subprocess.CalledProcessError, FileNotFoundError):
-    print("Tesseract OCR not found in PATH. Attempting to set manually or add to PATH.")
-    TESSERACT_AVAILABLE = False
-    if os.name == 'nt': # Only for Windows
-        tesseract_path_windows = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        if os.path.exists(tesseract_path_windows):
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path_windows
-            print(f"Tesseract OCR path set to: {tesseract_path_windows}")
-            TESSERACT_AVAILABLE = True
-        else:
-            print(f"Default Tesseract OCR path ({tesseract_path_windows}) not found.")
-
-customtkinter.set_appearance_mode("System")
-customtkinter.set_default_color_theme("blue")
-
-# OCR function to be executed by worker processes
-def ocr_page_worker_function(args_tuple):
-    pdf_path, page_num, ocr_lang, dpi, tesseract_cmd_path_from_main = args_tuple
-
-    if tesseract_cmd_path_from_main:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd_path_from_main
-    
-    try:
-        doc = fitz.open(pdf_path) 
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(dpi=dpi, alpha=False)
-        doc.close() 
-
-        img_bytes = pix.tobytes("png")
-        img = Image.open(io.BytesIO(img_bytes))
-
-        custom_config = r'--psm 3' # Page segmentation mode
-        page_text = pytesseract.image_to_string(img, lang=ocr_lang, config=custom_config)
-        return (page_num, page_text)
-    except pytesseract.TesseractNotFoundError:
-        print(f"TESSERACT NOT FOUND IN WORKER PROCESS: Page {page_num+1}, File: {os.path.basename(pdf_path)}. Command Path: {getattr(pytesseract.pytesseract, 'tesseract_cmd', 'Not Set')}")
-        return (page_num, f"[Tesseract Not Found Error for Page {page_num+1}]")
-    except Exception as e:
-        print(f"OCR Error (Worker): Page {page_num+1}, File: {os.path.basename(pdf_path)}: {e}")
-        return (page_num, f"[OCR Error for Page {page_num+1}: {str(e)}]")
-
-def format_text_with_heuristics(text):
-    lines = text.splitlines()
-    formatted_lines = []
-    
-    numbered_heading_pattern = re.compile(r"^\s*(\d+(\.\d+)*\.?)\s+([A-Z][\w\s:,()-]+)$")
-    chapter_heading_pattern = re.compile(r"^(?:\d+\s*[-\u2013\u2014]?\s*)?CHAPTER\s*\d*[:\-\s]*([A-Z0-9].*)$", re.IGNORECASE)
-    all_caps_short_heading_pattern = re.compile(r"^\s*([A-Z0-9][A-Z0-9\s'-]{5,80})\s*$")
-    common_section_keywords = ["introduction", "conclusion", "summary", "abstract", "references", "appendix", "acknowledgements", "contents", "figure", "table"]
-    common_section_pattern = re.compile(r"^\s*(" + "|".join(common_section_keywords) + r")[:\.]?\s*$", re.IGNORECASE)
-
-    for i, line in enumerate(lines):
-        stripped_line = line.strip()
-        original_line_to_append = line
-
-        if not stripped_line:
-            formatted_lines.append(line)
-            continue
-
-        match_numbered = numbered_heading_pattern.match(stripped_line)
-        if match_numbered:
-            text_part = match_numbered.group(3).strip()
-            if text_part and len(text_part.split()) < 10 and text_part[0].isupper():
-                formatted_lines.append(f"## {stripped_line}")
-                continue
-
-        match_chapter = chapter_heading_pattern.match(stripped_line)
-        if match_chapter:
-            text_part = match_chapter.group(1).strip()
-            if text_part:
-                formatted_lines.append(f"# {text_part.upper()}")
-                if i + 1 < len(lines):
-                    next_line_stripped = lines[i+1].strip()
-                    if next_line_stripped and next_line_stripped[0].islower() and len(next_line_stripped.split()) < 7:
-                        pass
-                continue
-
-        if stripped_line.isupper() and \
-           len(stripped_line.split()) > 0 and \
-           len(stripped_line.split()) < 8 and \
-           not re.search(r'[.,;:!?]$', stripped_line) and \
-           sum(1 for char in stripped_line if char.isalpha()) > len(stripped_line) * 0.6:
-            is_likely_standalone_heading = True
-            if i > 0 and lines[i-1].strip():
-                if not lines[i-1].strip().endswith(('.', '!', '?', ':')):
-                    is_likely_standalone_heading = False
-            if i + 1 < len(lines) and lines[i+1].strip():
-                if not lines[i+1].strip()[0].isupper():
-                     is_likely_standalone_heading = False
-            if is_likely_standalone_heading:
-                formatted_lines.append(f"### {stripped_line}")
-                continue
-        
-        match_common_section = common_section_pattern.match(stripped_line)
-        if match_common_section:
-            prev_line_empty_or_heading = (i == 0) or \
-                                         (not lines[i-1].strip()) or \
-                                         (lines[i-1].strip().startswith("#"))
-            if prev_line_empty_or_heading:
-                formatted_lines.append(f"## {stripped_line.capitalize()}")
-                continue
-
-        match_text_then_num = re.match(r"^\s*([A-Za-z][\w\s'-]+?)\s*[-\u2013\u2014]\s*\d+\s*$", stripped_line)
-        if match_text_then_num:
-            text_part = match_text_then_num.group(1).strip()
-            if len(text_part.split()) < 8 and len(text_part) > 5:
-                formatted_lines.append(f"### {text_part}")
-                continue
-
-        formatted_lines.append(original_line_to_append)
-
-    final_text = "\n".join(formatted_lines)
-    final_text = re.sub(r'\n{3,}', '\n\n', final_text)
-    return final_text
-
-class App(customtkinter.CTk):
-    def __init__(self):
-        super().__init__()
-
-        self.title("Intelligent PDF Converter (OCR + Pandoc)")
-        self.geometry(f"{800}x{680}")
-
-        self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1)
-
-        self.current_font_size = customtkinter.StringVar(value="11pt")
-        self.current_margin = customtkinter.StringVar(value="0.7in")
-        self.current_main_font = customtkinter.StringVar(value="Liberation Serif")
-        self.current_pdf_engine = customtkinter.StringVar(value="xelatex")
-        self.current_line_spacing = customtkinter.StringVar(value="1.0")
-
-        self.tabview = customtkinter.CTkTabview(self, width=250)
-        self.tabview.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
-        self.tabview.add("Files")
-        self.tabview.add("Settings")
-
-        # --- Files Tab ---
-        self.tabview.tab("Files").grid_columnconfigure(0, weight=1)
-        self.file_list_frame = customtkinter.CTkFrame(self.tabview.tab("Files"))
-        self.file_list_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-        self.file_list_frame.grid_columnconfigure(0, weight=1)
-        self.file_list_frame.grid_rowconfigure(0, weight=1)
-        self.file_listbox = tkinter.Listbox(self.file_list_frame, selectmode=tkinter.EXTENDED, borderwidth=0, highlightthickness=0)
-        self.file_listbox.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
-        self.listbox_scrollbar = customtkinter.CTkScrollbar(self.file_list_frame, command=self.file_listbox.yview)
-        self.listbox_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.file_listbox.configure(yscrollcommand=self.listbox_scrollbar.set)
-        
-        self.button_frame = customtkinter.CTkFrame(self.tabview.tab("Files"))
-        self.button_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
-        self.add_files_button = customtkinter.CTkButton(self.button_frame, text="Add Files", command=self.add_files)
-        self.add_files_button.pack(side="left", padx=5, pady=5)
-        self.remove_selected_button = customtkinter.CTkButton(self.button_frame, text="Remove Selected", command=self.remove_selected_files)
-        self.remove_selected_button.pack(side="left", padx=5, pady=5)
-        self.clear_list_button = customtkinter.CTkButton(self.button_frame, text="Clear List", command=self.clear_file_list)
-        self.clear_list_button.pack(side="left", padx=5, pady=5)
-        
-        self.target_dir_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="Output Folder: Not selected")
-        self.target_dir_label.grid(row=2, column=0, padx=10, pady=(10,0), sticky="w")
-        self.select_target_button = customtkinter.CTkButton(self.tabview.tab("Files"), text="Select Output Folder", command=self.select_target_directory)
-        self.select_target_button.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
-        
-        self.language_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="OCR Language:")
-        self.language_label.grid(row=4, column=0, padx=10, pady=(10,0), sticky="w")
-        self.language_var = customtkinter.StringVar(value="eng+tur")
-        self.language_options = ["eng", "tur", "eng+tur", "deu", "fra", "ara", "rus", "spa", "jpn", "chi_sim"]
-        self.language_menu = customtkinter.CTkOptionMenu(self.tabview.tab("Files"), variable=self.language_var, values=self.language_options)
-        self.language_menu.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
-        
-        self.convert_button = customtkinter.CTkButton(self.tabview.tab("Files"), text="Convert", command=self.start_conversion_thread, font=customtkinter.CTkFont(size=16, weight="bold"))
-        self.convert_button.grid(row=6, column=0, padx=10, pady=20, sticky="ew")
-        
-        self.status_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="Status: Idle")
-        self.status_label.grid(row=7, column=0, padx=10, pady=5, sticky="ew")
-        self.progressbar = customtkinter.CTkProgressBar(self.tabview.tab("Files"))
-        self.progressbar.grid(row=8, column=0, padx=10, pady=10, sticky="ew")
-        self.progressbar.set(0)
-
-        # --- Settings Tab ---
-        self.tabview.tab("Settings").grid_columnconfigure(0, weight=1)
-        self.appearance_mode_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Appearance Mode:", anchor="w")
-        self.appearance_mode_label.grid(row=0, column=0, padx=20, pady=(10, 0), sticky="w")
-        self.appearance_mode_optionemenu = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), values=["Light", "Dark", "System"], command=self.change_appearance_mode_event)
-        self.appearance_mode_optionemenu.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
-        self.appearance_mode_optionemenu.set("System")
-        
-        self.pandoc_settings_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Pandoc PDF Settings", font=customtkinter.CTkFont(size=14, weight="bold"))
-        self.pandoc_settings_label.grid(row=2, column=0, padx=20, pady=(10,5), sticky="w")
-        
-        self.font_size_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Font Size:")
-        self.font_size_label.grid(row=3, column=0, padx=20, pady=(5,0), sticky="w")
-        self.font_size_options = ["8pt", "9pt", "10pt", "11pt", "12pt", "13pt", "14pt", "16pt", "18pt", "20pt", "22pt", "24pt"]
-        self.font_size_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_font_size, values=self.font_size_options)
-        self.font_size_dropdown.grid(row=4, column=0, padx=20, pady=(0,10), sticky="ew")
-        
-        self.main_font_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Main Font (for Xe/LuaLaTeX):")
-        self.main_font_label.grid(row=5, column=0, padx=20, pady=(5,0), sticky="w")
-        self.main_font_options = ["Liberation Serif", "Linux Libertine O", "Times New Roman", "Arial", "Calibri", "DejaVu Serif", "DejaVu Sans", "Georgia", "Verdana", "EB Garamond", "Noto Serif", "Noto Sans", "CMU Serif", "CMU Sans Serif"]
-        self.main_font_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_main_font, values=self.main_font_options)
-        self.main_font_dropdown.grid(row=6, column=0, padx=20, pady=(0,10), sticky="ew")
-        
-        self.margin_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Margin (e.g., 0.7in, 2cm):")
-        self.margin_label.grid(row=7, column=0, padx=20, pady=(5,0), sticky="w")
-        self.margin_entry = customtkinter.CTkEntry(self.tabview.tab("Settings"), textvariable=self.current_margin)
-        self.margin_entry.grid(row=8, column=0, padx=20, pady=(0,10), sticky="ew")
-        
-        self.pdf_engine_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="PDF Engine:")
-        self.pdf_engine_label.grid(row=9, column=0, padx=20, pady=(5,0), sticky="w")
-        self.pdf_engine_options = ["xelatex", "lualatex", "pdflatex"]
-        self.pdf_engine_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_pdf_engine, values=self.pdf_engine_options)
-        self.pdf_engine_dropdown.grid(row=10, column=0, padx=20, pady=(0,10), sticky="ew")
-        
-        self.line_spacing_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Line Spacing (e.g., 1.0, 1.5):")
-        self.line_spacing_label.grid(row=11, column=0, padx=20, pady=(5,0), sticky="w")
-        self.line_spacing_entry = customtkinter.CTkEntry(self.tabview.tab("Settings"), textvariable=self.current_line_spacing)
-        self.line_spacing_entry.grid(row=12, column=0, padx=20, pady=(0,10), sticky="ew")
-        
-        self.save_settings_button = customtkinter.CTkButton(self.tabview.tab("Settings"), text="Apply Settings (Informational)", command=self.apply_pandoc_settings)
-        self.save_settings_button.grid(row=13, column=0, padx=20, pady=20, sticky="ew")
-
-        self.selected_files = []
-        self.target_directory = ""
-        
-        if not TESSERACT_AVAILABLE:
-            if os.name == 'nt' and not os.path.exists(r'C:\Program Files\Tesseract-OCR\tesseract.exe'):
-                 self.after(100, lambda: tkinter.messagebox.showwarning("Warning", "Tesseract OCR not found or not in PATH.\nThe default path C:\\Program Files\\Tesseract-OCR\\tesseract.exe is also invalid.\nPlease install it and add to PATH, or specify its path in the code."))
-            elif os.name != 'nt':
-                 self.after(100, lambda: tkinter.messagebox.showwarning("Warning", "Tesseract OCR not found or not in PATH.\nPlease install it and add to your system's PATH."))
-
-        self.change_appearance_mode_event(customtkinter.get_appearance_mode())
-
-    def apply_pandoc_settings(self):
-        font_size = self.current_font_size.get()
-        main_font = self.current_main_font.get()
-        margin = self.current_margin.get()
-        pdf_engine = self.current_pdf_engine.get()
-        line_spacing = self.current_line_spacing.get()
-        tkinter.messagebox.showinfo("Settings",
-                                    f"Settings updated (will be used during conversion):\n"
-                                    f"- Font Size: {font_size}\n"
-                                    f"- Font: {main_font}\n"
-                                    f"- Margin: {margin}\n"
-                                    f"- PDF Engine: {pdf_engine}\n"
-                                    f"- Line Spacing: {line_spacing}")
-        print(f"Pandoc settings updated in UI: Size={font_size}, Font={main_font}, Margin={margin}, Engine={pdf_engine}, Line Spacing={line_spacing}")
-
-    def change_appearance_mode_event(self, new_appearance_mode: str):
-        customtkinter.set_appearance_mode(new_appearance_mode)
-        effective_mode = customtkinter.get_appearance_mode() 
-        if effective_mode == "Dark":
-            self.file_listbox.configure(bg="#2B2B2B", fg="white")
-        else: # Light
-            self.file_listbox.configure(bg="white", fg="black")
-
-    def add_files(self):
-        files = filedialog.askopenfilenames(title="Select PDF Files", filetypes=(("PDF Files", "*.pdf"), ("All Files", "*.*")))
-        if files:
-            for file_path in files:
-                if file_path not in self.selected_files:
-                    self.selected_files.append(file_path)
-                    self.file_listbox.insert(tkinter.END, os.path.basename(file_path))
-            self.update_status(f"{len(files)} file(s) added.")
-
-    def remove_selected_files(self):
-        selected_indices = self.file_listbox.curselection()
-        if not selected_indices:
-            tkinter.messagebox.showwarning("Warning", "Select at least one file to remove.")
-            return
-        for index in reversed(selected_indices):
-            del self.selected_files[index]
-            self.file_listbox.delete(index)
-        self.update_status(f"{len(selected_indices)} file(s) removed.")
-
-    def clear_file_list(self):
-        self.selected_files.clear()
-        self.file_listbox.delete(0, tkinter.END)
-        self.update_status("File list cleared.")
-
-    def select_target_directory(self):
-        directory = filedialog.askdirectory(title="Select Output Folder")
-        if directory:
-            self.target_directory = directory
-            self.target_dir_label.configure(text=f"Output Folder: {self.target_directory}")
-            self.update_status(f"Output folder set to: {self.target_directory}")
-
-    def update_status(self, message):
-        self.status_label.configure(text=f"Status: {message}")
-        self.update_idletasks()
-
-    def update_progressbar(self, value):
-        self.progressbar.set(value)
-        self.update_idletasks()
-
-    def set_ui_elements_state(self, state):
-        widgets_to_toggle = [
-            self.convert_button, self.add_files_button, self.remove_selected_button,
-            self.clear_list_button, self.select_target_button, self.language_menu,
-            self.font_size_dropdown, self.main_font_dropdown, self.margin_entry,
-            self.pdf_engine_dropdown, self.line_spacing_entry,
-            self.save_settings_button, self.appearance_mode_optionemenu
-        ]
-        for widget in widgets_to_toggle:
-            if widget: widget.configure(state=state)
-
-    def start_conversion_thread(self):
-        if not TESSERACT_AVAILABLE:
-            tkinter.messagebox.showerror("Error", "Tesseract OCR not found or not configured correctly.")
-            return
-        if not self.selected_files:
-            tkinter.messagebox.showerror("Error", "Please select at least one PDF file to convert.")
-            return
-        if not self.target_directory:
-            tkinter.messagebox.showerror("Error", "Please select an output folder.")
-            return
-
-        self.set_ui_elements_state("disabled")
-        self.update_progressbar(0)
-        conversion_thread = threading.Thread(target=self.process_files, daemon=True)
-        conversion_thread.start()
-
-    def process_files(self):
-        total_files = len(self.selected_files)
-        ocr_lang = self.language_var.get()
-
-        font_size = self.current_font_size.get()
-        margin = self.current_margin.get().strip()
-        main_font = self.current_main_font.get()
-        pdf_engine = self.current_pdf_engine.get()
-        line_spacing = self.current_line_spacing.get().strip()
-
-        if not margin: margin = "0.7in"
-        if not line_spacing: line_spacing = "1.0"
-        else:
-            try:
-                float_val = float(line_spacing)
-                if float_val <= 0:
-                    print(f"Invalid line spacing: '{line_spacing}'. Using default '1.0'.")
-                    line_spacing = "1.0"
-            except ValueError:
-                print(f"Invalid line spacing format: '{line_spacing}'. Using default '1.0'.")
-                line_spacing = "1.0"
-
-        print(f"Settings: Size={font_size}, Font={main_font}, Margin={margin}, Engine={pdf_engine}, Line Spacing={line_spacing}")
-        
-        tesseract_cmd_for_worker = getattr(pytesseract.pytesseract, 'tesseract_cmd', None)
-        
-        cpu_cores = os.cpu_count() or 1
-        num_processes = max(1, min(cpu_cores, 8)) 
-        maxtasksperchild = 10 
-        print(f"Using {num_processes} parallel processes, Maxtasksperchild: {maxtasksperchild}")
-
-        for i, pdf_path in enumerate(self.selected_files):
-            current_file_basename = os.path.basename(pdf_path)
-            base_name_no_ext = os.path.splitext(current_file_basename)[0]
-            self.update_status(f"Processing: {current_file_basename} ({i+1}/{total_files})")
-            
-            raw_ocr_text = ""
-
-            try:
-                total_pages = 0
-                try:
-                    doc_meta = fitz.open(pdf_path)
-                    total_pages = len(doc_meta)
-                    doc_meta.close()
-                except Exception as e_meta:
-                    print(f"Could not open PDF/read page count ({current_file_basename}): {e_meta}")
-                    self.update_status(f"Error (page count): {current_file_basename}")
-                    raw_ocr_text = f"[Could not open document or read page count: {e_meta}]\n\n"
-                    output_txt_path_error = os.path.join(self.target_directory, f"{base_name_no_ext}_ocr.txt")
-                    try:
-                        with open(output_txt_path_error, "w", encoding="utf-8") as f_txt_err:
-                            f_txt_err.write(raw_ocr_text)
-                        print(f"Text output for failed file: {output_txt_path_error}")
-                    except Exception as e_write_txt_error:
-                        print(f"Could not write TXT for failed file: {e_write_txt_error}")
-                    continue 
-
-                full_text_parts = [None] * total_pages
-                
-                if total_pages == 0:
-                    print(f"PDF ({current_file_basename}) is empty or has no pages.")
-                    raw_ocr_text = "[Document is empty or contains no pages]\n\n"
-                else:
-                    self.update_status(f"Starting OCR: {current_file_basename} - {total_pages} pages")
-                    
-                    page_task_args_list = [
-                        (pdf_path, page_num, ocr_lang, 300, tesseract_cmd_for_worker) 
-                        for page_num in range(total_pages)
-                    ]
-                    
-                    pages_processed_count = 0
-                    with multiprocessing.Pool(processes=num_processes, maxtasksperchild=maxtasksperchild) as pool:
-                        results_iterator = pool.imap_unordered(ocr_page_worker_function, page_task_args_list)
-                        
-                        for page_num_result, page_text_result in results_iterator:
-                            if 0 <= page_num_result < total_pages:
-                                full_text_parts[page_num_result] = page_text_result
-                            else:
-                                print(f"Warning: Invalid page number ({page_num_result}) returned from OCR result.")
-                            
-                            pages_processed_count += 1
-                            self.update_status(f"OCR: {current_file_basename} - Page {pages_processed_count}/{total_pages}")
-                    
-                    raw_ocr_text = "\n\n".join(text for text in full_text_parts if text is not None)
-
-                output_txt_path = os.path.join(self.target_directory, f"{base_name_no_ext}_ocr.txt")
-                try:
-                    with open(output_txt_path, "w", encoding="utf-8") as f_txt:
-                        f_txt.write(raw_ocr_text) 
-                    print(f"Text output saved: {output_txt_path}")
-                except Exception as e_write_txt:
-                    print(f"Could not write TXT file ({output_txt_path}): {e_write_txt}")
-                    self.update_status(f"TXT Write Error: {current_file_basename}")
-
-                formatted_for_pandoc = format_text_with_heuristics(raw_ocr_text)
-                pandoc_input_text = formatted_for_pandoc.replace('\\', r'\\') 
-
-                output_pdf_path = os.path.join(self.target_directory, f"{base_name_no_ext}_ocr.pdf")
-                pandoc_command = [
-                    'pandoc', '-s', f'--pdf-engine={pdf_engine}',
-                    '-V', f'fontsize={font_size}', '-V', f'geometry:margin={margin}',
-                    '-V', 'papersize=a4', '-V', f'linestretch={line_spacing}',
-                    '-f', 'markdown', '-o', output_pdf_path,
-                    '-V', 'documentclass=scrartcl'
-                ]
-                if pdf_engine in ["xelatex", "lualatex"]:
-                    pandoc_command.extend(['-V', f'mainfont={main_font}', '-V', 'lang=en-US']) # Changed lang to en-US
-                elif pdf_engine == "pdflatex":
-                    pandoc_command.extend(['-V', 'fontenc=T1', '-V', 'inputenc=utf8'])
-                
-                print(f"Executing Pandoc command: {' '.join(pandoc_command)}")
-                process = subprocess.Popen(pandoc_command, stdin=subprocess.PIPE, text=True, encoding='utf-8',
-                                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = process.communicate(input=pandoc_input_text)
-
-                if process.returncode != 0:
-                    error_message = f"Pandoc error ({current_file_basename}):\n{stderr.strip()}\n\nStdout:\n{stdout.strip()}"
-                    print(error_message)
-                    self.update_status(f"Pandoc error: {current_file_basename}")
-                    self.after(0, lambda msg=error_message: tkinter.messagebox.showerror("Pandoc Error", msg))
-                else:
-                    print(f"PDF successfully converted: {output_pdf_path}")
-                    if stderr.strip(): print(f"Pandoc warnings:\n{stderr.strip()}")
-
-            except Exception as e_file:
-                error_message_general = f"General error while processing file ({current_file_basename}): {e_file}"
-                print(error_message_general)
-                import traceback
-                traceback.print_exc()
-                self.update_status(f"Error: {current_file_basename}")
-                self.after(0, lambda msg=error_message_general: tkinter.messagebox.showerror("Processing Error", msg))
-            
-            self.update_progressbar((i + 1) / total_files)
-
-        self.update_status("All files processed!")
-        self.after(0, lambda: tkinter.messagebox.showinfo("Complete", "Conversion process has finished."))
-        self.set_ui_elements_state("normal")
-
-if __name__ == "__main__":
-    multiprocessing.freeze_support()
-    app = App()
-    app.mainloop()
\ No newline at end of file
+import argparse
+import glob
+import os
+import sys
+import multiprocessing # For parallel processing
+import ocr_pipeline
+import ocr_progress
+
+# Entry point. With input files the pipeline runs headless; without them the customtkinter GUI starts.
+# The GUI stack is imported lazily so batch jobs and spawned pool workers never load tkinter.
+
+def expand_input_paths(patterns):
+    pdf_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            print(f"Warning: No files match '{pattern}'.")
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in pdf_paths:
+                pdf_paths.append(path)
+    return pdf_paths
+
+def preprocess_steps_arg(text):
+    try:
+        return ocr_pipeline.ocr_preprocess.parse_preprocess_steps(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Intelligent PDF Converter (OCR + Pandoc). Run without inputs to start the GUI.")
+    parser.add_argument("inputs", nargs="*", help="PDF files or glob patterns to convert")
+    parser.add_argument("-o", "--output-dir", help="Output folder (required in headless mode)")
+    parser.add_argument("-l", "--lang", default=ocr_pipeline.DEFAULT_OCR_LANG, help="Tesseract language(s), e.g. eng+tur")
+    parser.add_argument("--dpi", type=int, default=ocr_pipeline.DEFAULT_DPI, help="Render resolution for OCR (the maximum when adaptive DPI is on)")
+    parser.add_argument("--no-adaptive-dpi", action="store_true", help="Render every page at --dpi instead of choosing a DPI from the text size")
+    parser.add_argument("--max-page-megapixels", type=float, default=ocr_pipeline.ocr_render.DEFAULT_MAX_PAGE_MEGAPIXELS, help="Pages larger than this are OCR'd in overlapping tiles")
+    parser.add_argument("--raster", default=ocr_pipeline.DEFAULT_RASTER_MODE, choices=ocr_pipeline.RASTER_MODES, help="Color mode pages are rendered in for OCR")
+    parser.add_argument("--ocr-backend", default=ocr_pipeline.ocr_backends.DEFAULT_OCR_BACKEND, choices=ocr_pipeline.ocr_backends.OCR_BACKENDS, help="auto: tesserocr if installed, else batched tesseract runs")
+    parser.add_argument("--preprocess", type=preprocess_steps_arg, default=[], metavar="STEPS", help="Clean up pages before OCR (needs NumPy): comma-separated threshold, deskew, crop, or 'all'")
+    parser.add_argument("--prepass", action="store_true", help="Check every page at 36 DPI first: skip blank pages, reuse the text of duplicate pages")
+    parser.add_argument("--blank-ink-ratio", type=float, default=ocr_pipeline.ocr_prepass.DEFAULT_BLANK_INK_RATIO, help="Pre-pass: pages with less ink than this share of their area are blank")
+    parser.add_argument("--duplicate-threshold", type=float, default=ocr_pipeline.ocr_prepass.DEFAULT_DUPLICATE_THRESHOLD, help="Pre-pass: largest share of differing ink pixels in any part of two pages that still makes them duplicates (0 turns duplicate detection off)")
+    parser.add_argument("--osd", action="store_true", help="Detect each page's rotation and script first (needs osd.traineddata): rotate it upright, OCR it with the selected languages of that script only")
+    parser.add_argument("--force-ocr", action="store_true", help="OCR every page, even pages that already have a usable text layer")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore journals of interrupted runs and OCR every file from the start")
+    parser.add_argument("--cache-dir", default=None, help="OCR result cache folder (default: the user cache dir)")
+    parser.add_argument("--cache-size-mb", type=int, default=ocr_pipeline.ocr_cache.DEFAULT_CACHE_MAX_MB, help="Size limit of the OCR result cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always OCR every page, do not read or write the cache")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of OCR workers (default: CPU count)")
+    parser.add_argument("--executor", default="process", choices=["process", "thread", "spool"], help="Run OCR workers as processes or threads, or hand the pages to --spool-worker processes (-j: their number)")
+    parser.add_argument("--spool-dir", default=None, help="Shared spool folder between a --executor spool run and its --spool-worker processes")
+    parser.add_argument("--spool-lease-seconds", type=int, default=ocr_pipeline.ocr_spool.DEFAULT_LEASE_SECONDS, help="Tasks of workers silent for this long are given to another worker")
+    parser.add_argument("--spool-worker-timeout", type=int, default=ocr_pipeline.ocr_spool.DEFAULT_WORKER_TIMEOUT, help="Stop with an error when no spool worker has taken a task for this many seconds")
+    parser.add_argument("--spool-worker", action="store_true", help="Run -j OCR workers that take tasks from --spool-dir instead of converting files")
+    parser.add_argument("--spool-idle-exit", type=float, default=None, metavar="SECONDS", help="Spool workers exit after this long without a task (default: run until stopped)")
+    parser.add_argument("--output-engine", default=ocr_pipeline.ocr_output.DEFAULT_OUTPUT_ENGINE, choices=ocr_pipeline.ocr_output.OUTPUT_ENGINES, help="pandoc: reformatted PDF via LaTeX; pymupdf: original pages with an invisible OCR text layer")
+    parser.add_argument("--reflow-pdf", action="store_true", help="Also write a text-only <name>_ocr_text.pdf (PyMuPDF, no LaTeX)")
+    parser.add_argument("--render-workers", type=int, default=ocr_pipeline.DEFAULT_RENDER_WORKERS, help="Documents typeset/written at the same time, next to the OCR workers")
+    parser.add_argument("--precompile-preamble", action="store_true", help="pdflatex only: typeset every document from a cached format of the LaTeX preamble")
+    parser.add_argument("--metrics-dir", default=None, help="Write a per-page JSONL trace and a Prometheus textfile summary to this folder")
+    parser.add_argument("--profile-dir", default=None, help="Write a cProfile profile of every OCR worker to this folder")
+    parser.add_argument("--font-size", default=ocr_pipeline.DEFAULT_PANDOC_SETTINGS["font_size"])
+    parser.add_argument("--margin", default=ocr_pipeline.DEFAULT_PANDOC_SETTINGS["margin"])
+    parser.add_argument("--main-font", default=ocr_pipeline.DEFAULT_PANDOC_SETTINGS["main_font"])
+    parser.add_argument("--pdf-engine", default=ocr_pipeline.DEFAULT_PANDOC_SETTINGS["pdf_engine"], choices=["xelatex", "lualatex", "pdflatex"])
+    parser.add_argument("--line-spacing", default=ocr_pipeline.DEFAULT_PANDOC_SETTINGS["line_spacing"])
+    return parser
+
+def run_headless(args, parser):
+    if not args.output_dir:
+        parser.error("--output-dir is required when input files are given")
+    pdf_paths = expand_input_paths(args.inputs)
+    if not pdf_paths:
+        parser.error("no input files found")
+    if args.dpi <= 0:
+        parser.error("--dpi must be positive")
+    if args.max_page_megapixels < ocr_pipeline.ocr_render.MIN_PAGE_MEGAPIXELS:
+        parser.error(f"--max-page-megapixels must be at least {ocr_pipeline.ocr_render.MIN_PAGE_MEGAPIXELS}")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be positive")
+    if args.blank_ink_ratio < 0 or args.duplicate_threshold < 0:
+        parser.error("--blank-ink-ratio and --duplicate-threshold must not be negative")
+    if args.render_workers <= 0:
+        parser.error("--render-workers must be positive")
+    if args.executor == "spool" and not args.spool_dir:
+        parser.error("--executor spool needs --spool-dir")
+    if args.spool_lease_seconds <= 0 or args.spool_worker_timeout <= 0:
+        parser.error("--spool-lease-seconds and --spool-worker-timeout must be positive")
+    if not ocr_pipeline.is_tesseract_available():
+        print("Error: Tesseract OCR not found or not configured correctly.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ocr_options = {"raster_mode": args.raster, "backend": args.ocr_backend, "force_ocr": args.force_ocr,
+                   "adaptive_dpi": not args.no_adaptive_dpi, "max_page_megapixels": args.max_page_megapixels,
+                   "preprocess": args.preprocess, "osd": args.osd}
+    if not args.no_cache:
+        ocr_options["cache_dir"] = os.path.abspath(args.cache_dir or ocr_pipeline.ocr_cache.default_cache_directory())
+        ocr_options["cache_max_bytes"] = args.cache_size_mb * 1024 * 1024
+    pandoc_settings = ocr_pipeline.resolve_pandoc_settings(
+        font_size=args.font_size, margin=args.margin, main_font=args.main_font,
+        pdf_engine=args.pdf_engine, line_spacing=args.line_spacing, precompiled_preamble=args.precompile_preamble,
+    )
+    spool_settings = None
+    if args.executor == "spool":
+        spool_settings = {"spool_dir": args.spool_dir, "lease_seconds": args.spool_lease_seconds,
+                          "worker_timeout": args.spool_worker_timeout}
+    prepass_settings = None
+    if args.prepass:
+        prepass_settings = ocr_pipeline.ocr_prepass.resolve_prepass_settings(args.blank_ink_ratio, args.duplicate_threshold)
+    # Per-page status goes through the same throttled channel as in the GUI
+    progress = ocr_progress.ProgressChannel()
+    console = ocr_progress.ConsoleProgress(progress).start()
+    try:
+        failures = ocr_pipeline.convert_files(
+            pdf_paths, args.output_dir, ocr_lang=args.lang, dpi=args.dpi,
+            num_processes=args.workers, pandoc_settings=pandoc_settings, executor=args.executor,
+            ocr_options=ocr_options, resume=not args.no_resume,
+            output_engine=args.output_engine, reflow_pdf=args.reflow_pdf, render_workers=args.render_workers,
+            prepass_settings=prepass_settings, spool_settings=spool_settings, metrics_dir=args.metrics_dir, profile_dir=args.profile_dir,
+            cancel_event=progress.cancel_event, status_callback=progress.status, progress_callback=progress.progress,
+        )
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr) # No spool worker came; the journals keep the pages done so far
+        return 2
+    finally:
+        console.stop()
+    for pdf_path, error_message in failures:
+        print(f"FAILED: {pdf_path}: {error_message}", file=sys.stderr)
+    return 1 if failures else 0
+
+def run_spool_worker(spool_dir, worker_settings, idle_exit_seconds):
+    ocr_pipeline.ocr_spool.run_spool_worker(spool_dir, worker_settings, idle_exit_seconds)
+
+# Worker side of --executor spool: -j worker processes on this machine take tasks from the spool
+def run_spool_workers(args, parser):
+    if not args.spool_dir:
+        parser.error("--spool-worker needs --spool-dir")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be positive")
+    worker_settings = {"cache_dir": None if args.no_cache else os.path.abspath(args.cache_dir or ocr_pipeline.ocr_cache.default_cache_directory())}
+    num_workers = args.workers or ocr_pipeline.default_process_count()
+    if num_workers == 1:
+        run_spool_worker(args.spool_dir, worker_settings, args.spool_idle_exit)
+        return 0
+    workers = [multiprocessing.Process(target=run_spool_worker, args=(args.spool_dir, worker_settings, args.spool_idle_exit))
+               for _ in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return 0 if all(worker.exitcode == 0 for worker in workers) else 1
+
+def run_gui():
+    from ocr_gui import App
+    app = App()
+    app.mainloop()
+    return 0
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.spool_worker:
+        return run_spool_workers(args, parser)
+    if args.inputs:
+        return run_headless(args, parser)
+    return run_gui()
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+import collections
+import subprocess
+import tempfile
+import threading
+import time
+import multiprocessing.util
+import pytesseract
+
+# OCR engines behind ocr_page_worker_function. Every backend turns an iterable of page images
+# into one text per page, in Tesseract's plain-text format (page text followed by a form feed),
+# so the rest of the pipeline does not care which engine produced it.
+# recognize_pages_with_words also returns each page's word boxes from Tesseract's TSV output
+# (used to write an invisible text layer over the page images).
+# With a `stats` list, backends append one {"encode_ms", "bytes", "ocr_ms"} record per image, for
+# ocr_metrics; keys a backend cannot measure separately are left out.
+#
+#   tesserocr   - in-process Tesseract API; traineddata is loaded once per worker and reused
+#   batch       - one tesseract process per page range, fed a list file of images
+#   pytesseract - one tesseract process per page (the original path, always available)
+
+try:
+    import tesserocr # Optional dependency
+except ImportError:
+    tesserocr = None
+
+OCR_BACKENDS = ["auto", "tesserocr", "batch", "pytesseract"]
+DEFAULT_OCR_BACKEND = "auto"
+DEFAULT_PSM = 3 # Page segmentation mode
+PAGE_SEPARATOR = "\f" # Tesseract's default page separator for the txt renderer
+
+def tesseract_config(psm=DEFAULT_PSM):
+    return f'--psm {psm}'
+
+# Returns {page_num: [(left, top, right, bottom, text), ...]} in image pixels from Tesseract TSV
+def parse_tsv_words(tsv_text):
+    pages = collections.defaultdict(list)
+    for row in tsv_text.splitlines():
+        fields = row.split("\t")
+        if len(fields) < 12 or fields[0] != "5":
+            continue
+        text = fields[11].strip()
+        if not text:
+            continue
+        left, top, width, height = (int(value) for value in fields[6:10])
+        pages[int(fields[1])].append((left, top, left + width, top + height, text))
+    return pages
+
+def _single_page_words(tsv_text):
+    pages = parse_tsv_words(tsv_text)
+    return next(iter(pages.values()), [])
+
+def _record_image_stats(stats, **values):
+    if stats is not None:
+        stats.append(values)
+
+class PytesseractBackend:
+    name = "pytesseract"
+
+    # pytesseract writes the image file itself, so encoding is part of ocr_ms here
+    def recognize_pages(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        page_texts = []
+        for img in images:
+            start = time.perf_counter()
+            page_texts.append(pytesseract.image_to_string(img, lang=lang, config=tesseract_config(psm)))
+            _record_image_stats(stats, ocr_ms=(time.perf_counter() - start) * 1000)
+        return page_texts
+
+    def recognize_pages_with_words(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        # Two tesseract runs per page; the batch and tesserocr backends get both outputs from one
+        results = []
+        for img in images:
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(img, lang=lang, config=tesseract_config(psm))
+            tsv_text = pytesseract.image_to_data(img, lang=lang, config=tesseract_config(psm))
+            _record_image_stats(stats, ocr_ms=(time.perf_counter() - start) * 1000)
+            results.append((text, _single_page_words(tsv_text)))
+        return results
+
+class TesseractBatchBackend:
+    name = "batch"
+
+    def recognize_pages(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        return self._recognize(images, lang, psm, with_words=False, stats=stats)
+
+    def recognize_pages_with_words(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        return self._recognize(images, lang, psm, with_words=True, stats=stats)
+
+    # Images are written to a temp dir as they arrive, so only one rendered page is in memory at a time.
+    # One Tesseract run covers all images; each image's ocr_ms is its pixel share of that run.
+    def _recognize(self, images, lang, psm, with_words, stats=None):
+        with tempfile.TemporaryDirectory(prefix="tess_batch_") as tmp_dir:
+            image_paths, image_stats = [], []
+            for index, img in enumerate(images):
+                image_path = os.path.join(tmp_dir, f"page_{index:05d}.pnm")
+                start = time.perf_counter()
+                img.save(image_path, format="PPM")
+                image_stats.append({"encode_ms": (time.perf_counter() - start) * 1000, "bytes": os.path.getsize(image_path),
+                                    "pixels": img.width * img.height})
+                image_paths.append(image_path)
+            if not image_paths:
+                return []
+
+            list_file_path = os.path.join(tmp_dir, "pages.txt")
+            with open(list_file_path, "w", encoding="utf-8") as list_file:
+                list_file.write("\n".join(image_paths) + "\n")
+
+            output_base = os.path.join(tmp_dir, "output")
+            cmd_args = [pytesseract.pytesseract.tesseract_cmd, list_file_path, output_base, '-l', lang,
+                        '--psm', str(psm), '-c', 'page_separator=' + PAGE_SEPARATOR, 'txt'] + (['tsv'] if with_words else [])
+            start = time.perf_counter()
+            try:
+                proc = subprocess.run(cmd_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                raise pytesseract.TesseractNotFoundError()
+            if proc.returncode != 0:
+                raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace").strip())
+
+            with open(output_base + ".txt", encoding="utf-8") as output_file:
+                output_text = output_file.read()
+            page_words = {}
+            if with_words:
+                with open(output_base + ".tsv", encoding="utf-8") as tsv_file:
+                    page_words = parse_tsv_words(tsv_file.read())
+            ocr_ms = (time.perf_counter() - start) * 1000
+
+        # Every page, including the last, is terminated by the separator
+        page_texts = output_text.split(PAGE_SEPARATOR)
+        if len(page_texts) != len(image_paths) + 1 or page_texts[-1].strip():
+            raise RuntimeError(f"Batch OCR returned {len(page_texts) - 1} pages for {len(image_paths)} images")
+        total_pixels = sum(entry["pixels"] for entry in image_stats) or 1
+        for entry in image_stats:
+            _record_image_stats(stats, encode_ms=entry["encode_ms"], bytes=entry["bytes"], ocr_ms=ocr_ms * entry["pixels"] / total_pixels)
+        if with_words:
+            return [(text + PAGE_SEPARATOR, page_words.get(index + 1, [])) for index, text in enumerate(page_texts[:-1])]
+        return [text + PAGE_SEPARATOR for text in page_texts[:-1]]
+
+class TesserocrBackend:
+    name = "tesserocr"
+
+    def __init__(self):
+        # PyTessBaseAPI instances are not thread-safe, so each worker thread gets its own
+        self._local = threading.local()
+        self._all_apis = []
+        self._lock = threading.Lock()
+        multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def _get_api(self, lang, psm):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        api = apis.get((lang, psm))
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+            apis[(lang, psm)] = api
+            with self._lock:
+                self._all_apis.append(api)
+        return api
+
+    # SetImage (the PIL -> Leptonica conversion) is counted as encoding
+    def recognize_pages(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        api = self._get_api(lang, psm)
+        page_texts = []
+        for img in images:
+            start = time.perf_counter()
+            api.SetImage(img)
+            encoded = time.perf_counter()
+            page_texts.append(api.GetUTF8Text() + PAGE_SEPARATOR)
+            _record_image_stats(stats, encode_ms=(encoded - start) * 1000, ocr_ms=(time.perf_counter() - encoded) * 1000)
+        return page_texts
+
+    def recognize_pages_with_words(self, images, lang, psm=DEFAULT_PSM, stats=None):
+        api = self._get_api(lang, psm)
+        results = []
+        for img in images:
+            start = time.perf_counter()
+            api.SetImage(img)
+            encoded = time.perf_counter()
+            text = api.GetUTF8Text() + PAGE_SEPARATOR
+            words = _single_page_words(api.GetTSVText(0))
+            _record_image_stats(stats, encode_ms=(encoded - start) * 1000, ocr_ms=(time.perf_counter() - encoded) * 1000)
+            results.append((text, words))
+        return results
+
+    def close(self):
+        with self._lock:
+            while self._all_apis:
+                self._all_apis.pop().End()
+
+_backends = {}
+_backends_lock = threading.Lock()
+_engine_ids = {}
+
+# "<backend>:<Tesseract version>", looked up once per worker process. Part of the OCR cache key,
+# so switching backends or upgrading Tesseract does not reuse the previous engine's text.
+def engine_id(backend):
+    engine = _engine_ids.get(backend.name)
+    if engine is None:
+        try:
+            version = tesserocr.tesseract_version() if backend.name == "tesserocr" else str(pytesseract.get_tesseract_version())
+        except Exception:
+            version = "unknown"
+        engine = _engine_ids[backend.name] = f"{backend.name}:{' '.join(version.split())}"
+    return engine
+
+# Backends are created once per worker process and reused for every task it runs
+def get_ocr_backend(name=DEFAULT_OCR_BACKEND):
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            resolved_name = name
+            if resolved_name == "auto":
+                resolved_name = "tesserocr" if tesserocr is not None else "batch"
+            if resolved_name == "tesserocr" and tesserocr is None:
+                print("tesserocr is not installed; falling back to the batch Tesseract backend.")
+                resolved_name = "batch"
+
+            if resolved_name == "tesserocr":
+                backend = TesserocrBackend()
+            elif resolved_name == "batch":
+                backend = TesseractBatchBackend()
+            elif resolved_name == "pytesseract":
+                backend = PytesseractBackend()
+            else:
+                raise ValueError(f"Unknown OCR backend: {name}")
+            _backends[name] = backend
+    return backend
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+
+# Persistent, content-addressed store of OCR page texts. A page's key is derived from what is
+# drawn on it (content stream, images, fonts, geometry) plus the OCR parameters and engine, so
+# reruns of a batch - after a Pandoc failure, a crash or a formatting change - skip OCR for
+# known pages.
+# Entries are evicted least-recently-used once the store grows past its size limit.
+# An entry can also carry the page's word boxes (JSON) for the searchable PDF output.
+
+DEFAULT_CACHE_MAX_MB = 512
+DEFAULT_CACHE_MAX_BYTES = DEFAULT_CACHE_MAX_MB * 1024 * 1024
+CACHE_FORMAT_VERSION = 2 # Bump to invalidate every stored entry
+
+def default_cache_directory():
+    if os.name == 'nt':
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ocr-pdf-converter")
+
+def page_content_hash(doc, page):
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.mediabox), page.rotation)).encode("utf-8"))
+    digest.update(page.read_contents())
+    xrefs = set()
+    for image in page.get_images(full=True):
+        xrefs.add(image[0])
+        if image[1]: xrefs.add(image[1]) # Soft mask
+    for xobject in page.get_xobjects():
+        xrefs.add(xobject[0])
+    for xref in sorted(xrefs):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    for font in page.get_fonts(full=True):
+        digest.update(repr(font[1:5]).encode("utf-8"))
+    return digest.hexdigest()
+
+# render_policy identifies how the effective per-page DPI and tiling are derived from `dpi`;
+# engine is the OCR backend and Tesseract version (ocr_backends.engine_id)
+def ocr_cache_key(content_hash, ocr_lang, dpi, psm, raster_mode, render_policy="", engine=""):
+    params = f"v{CACHE_FORMAT_VERSION}|{content_hash}|{ocr_lang}|{dpi}|{psm}|{raster_mode}|{render_policy}|{engine}"
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+class OCRResultCache:
+    def __init__(self, cache_directory, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_directory = cache_directory
+        self.db_path = os.path.join(cache_directory, "ocr_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    # One connection per thread and per process: sqlite connections must not cross threads,
+    # and a connection inherited through fork must not be reused by the child
+    def _connection(self):
+        conn_info = getattr(self._local, "conn_info", None)
+        if conn_info is None or conn_info[0] != os.getpid():
+            os.makedirs(self.cache_directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            if "words" not in [column[1] for column in conn.execute("PRAGMA table_info(entries)")]:
+                conn.execute("ALTER TABLE entries ADD COLUMN words TEXT")
+            conn.commit()
+            conn_info = self._local.conn_info = (os.getpid(), conn)
+        return conn_info[1]
+
+    # Returns {key: (text, words)} for the keys that are stored, and marks them as recently used.
+    # words is None for entries stored without word boxes.
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        conn = self._connection()
+        found = {}
+        for key in keys:
+            row = conn.execute("SELECT text, words FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                found[key] = (row[0], row[1])
+        if found:
+            now = time.time()
+            conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+            conn.commit()
+        return found
+
+    # items: (key, text, words) with words as a JSON string or None
+    def put_many(self, items):
+        if not items:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.executemany("INSERT OR REPLACE INTO entries (key, text, words, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                         [(key, text, words, len(text.encode("utf-8")) + len((words or "").encode("utf-8")), now) for key, text, words in items])
+        conn.commit()
+
+    def total_size(self):
+        row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return row[0], row[1]
+
+    # Drops least recently used entries until the store fits in max_bytes. Returns the number removed.
+    def evict(self):
+        conn = self._connection()
+        entry_count, total_bytes = self.total_size()
+        if total_bytes <= self.max_bytes:
+            return 0
+        removed = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used ASC").fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_bytes -= size
+            removed += 1
+        conn.commit()
+        return removed
+
+    def close(self):
+        conn_info = getattr(self._local, "conn_info", None)
+        if conn_info is not None and conn_info[0] == os.getpid():
+            conn_info[1].close()
+        self._local.conn_info = None
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Cache handles are created once per worker process and shared by its threads
+def get_ocr_cache(cache_directory, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    with _caches_lock:
+        cache = _caches.get(cache_directory)
+        if cache is None:
+            cache = _caches[cache_directory] = OCRResultCache(cache_directory, max_bytes)
+        cache.max_bytes = max_bytes
+    return cache
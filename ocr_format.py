@@ -0,0 +1,105 @@
+import re
+import itertools
+
+# Markdown heading heuristics applied to OCR text before it goes to Pandoc.
+#
+# Lines are classified in one pass over a line iterator; a line's result depends only on the
+# line itself and its two raw neighbours. Documents are pages joined by blank lines, so every
+# page can be formatted on its own in the OCR worker. Joining the formatted pages and collapsing
+# blank lines across the seams then gives the same output as formatting the whole document.
+
+NUMBERED_HEADING_PATTERN = re.compile(r"^\s*(\d+(\.\d+)*\.?)\s+([A-Z][\w\s:,()-]+)$")
+CHAPTER_HEADING_PATTERN = re.compile(r"^(?:\d+\s*[-–—]?\s*)?CHAPTER\s*\d*[:\-\s]*([A-Z0-9].*)$", re.IGNORECASE)
+COMMON_SECTION_KEYWORDS = ["introduction", "conclusion", "summary", "abstract", "references", "appendix", "acknowledgements", "contents", "figure", "table"]
+COMMON_SECTION_PATTERN = re.compile(r"^\s*(" + "|".join(COMMON_SECTION_KEYWORDS) + r")[:\.]?\s*$", re.IGNORECASE)
+COMMON_SECTION_MAX_LENGTH = max(len(keyword) for keyword in COMMON_SECTION_KEYWORDS) + 1 # Keyword plus ':' or '.'
+TEXT_THEN_NUMBER_PATTERN = re.compile(r"^\s*([A-Za-z][\w\s'-]+?)\s*[-–—]\s*\d+\s*$")
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+# Returns the Markdown for a non-blank stripped line, or None if it is body text.
+# prev_stripped/next_stripped are the stripped neighbouring lines ("" at the ends).
+# The character tests in front of the patterns only skip lines a pattern cannot match.
+def classify_line(stripped_line, prev_stripped, next_stripped):
+    if stripped_line[0].isdigit():
+        match_numbered = NUMBERED_HEADING_PATTERN.match(stripped_line)
+        if match_numbered:
+            text_part = match_numbered.group(3).strip()
+            if text_part and len(text_part.split()) < 10 and text_part[0].isupper():
+                return f"## {stripped_line}"
+
+    if "chapter" in stripped_line.lower():
+        match_chapter = CHAPTER_HEADING_PATTERN.match(stripped_line)
+        if match_chapter:
+            text_part = match_chapter.group(1).strip()
+            if text_part:
+                return f"# {text_part.upper()}"
+
+    if stripped_line.isupper() and \
+       0 < len(stripped_line.split()) < 8 and \
+       stripped_line[-1] not in ".,;:!?" and \
+       sum(1 for char in stripped_line if char.isalpha()) > len(stripped_line) * 0.6:
+        is_likely_standalone_heading = True
+        if prev_stripped and not prev_stripped.endswith(('.', '!', '?', ':')):
+            is_likely_standalone_heading = False
+        if next_stripped and not next_stripped[0].isupper():
+            is_likely_standalone_heading = False
+        if is_likely_standalone_heading:
+            return f"### {stripped_line}"
+
+    if len(stripped_line) <= COMMON_SECTION_MAX_LENGTH and (not prev_stripped or prev_stripped.startswith("#")):
+        if COMMON_SECTION_PATTERN.match(stripped_line):
+            return f"## {stripped_line.capitalize()}"
+
+    if stripped_line[-1].isdigit():
+        match_text_then_num = TEXT_THEN_NUMBER_PATTERN.match(stripped_line)
+        if match_text_then_num:
+            text_part = match_text_then_num.group(1).strip()
+            if len(text_part.split()) < 8 and len(text_part) > 5:
+                return f"### {text_part}"
+    return None
+
+# Yields one formatted line per input line
+def iter_formatted_lines(lines):
+    lines = iter(lines)
+    line = next(lines, None)
+    if line is None:
+        return
+    prev_stripped, stripped_line = "", line.strip()
+    for next_line in itertools.chain(lines, [None]):
+        next_stripped = next_line.strip() if next_line is not None else ""
+        if stripped_line:
+            yield classify_line(stripped_line, prev_stripped, next_stripped) or line
+        else:
+            yield line
+        prev_stripped, line, stripped_line = stripped_line, next_line, next_stripped
+
+# One page, formatted in the OCR worker. Blank runs are collapsed when the pages are joined.
+def format_page_text(page_text):
+    return "\n".join(iter_formatted_lines(page_text.splitlines()))
+
+def format_text_with_heuristics(text):
+    return BLANK_LINES_PATTERN.sub('\n\n', format_page_text(text))
+
+# Backslashes are literal in OCR text but escapes in Pandoc's Markdown
+def escape_markdown(text):
+    return text.replace('\\', r'\\')
+
+# Applies the "\n{3,}" -> "\n\n" collapse to text written in pieces, including runs that span pieces
+class BlankLineCollapser:
+    def __init__(self):
+        self.pending_newlines = 0
+
+    def feed(self, text):
+        body = text.lstrip("\n")
+        self.pending_newlines += len(text) - len(body)
+        if not body:
+            return ""
+        trimmed_body = body.rstrip("\n")
+        output = "\n" * min(self.pending_newlines, 2) + BLANK_LINES_PATTERN.sub('\n\n', trimmed_body)
+        self.pending_newlines = len(body) - len(trimmed_body)
+        return output
+
+    def finish(self):
+        output = "\n" * min(self.pending_newlines, 2)
+        self.pending_newlines = 0
+        return output
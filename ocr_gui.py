@@ -0,0 +1,390 @@
+import tkinter
+import tkinter.messagebox
+import customtkinter
+from tkinter import filedialog
+import os
+import threading
+import ocr_pipeline
+import ocr_progress
+
+customtkinter.set_appearance_mode("System")
+customtkinter.set_default_color_theme("blue")
+
+class App(customtkinter.CTk):
+    def __init__(self):
+        super().__init__()
+
+        self.title("Intelligent PDF Converter (OCR + Pandoc)")
+        self.geometry(f"{800}x{680}")
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.current_font_size = customtkinter.StringVar(value="11pt")
+        self.current_margin = customtkinter.StringVar(value="0.7in")
+        self.current_main_font = customtkinter.StringVar(value="Liberation Serif")
+        self.current_pdf_engine = customtkinter.StringVar(value="xelatex")
+        self.current_line_spacing = customtkinter.StringVar(value="1.0")
+        self.current_ocr_workers = customtkinter.StringVar(value=str(ocr_pipeline.default_process_count()))
+        self.current_ocr_executor = customtkinter.StringVar(value="process")
+        self.use_ocr_cache = customtkinter.BooleanVar(value=True)
+        self.force_ocr = customtkinter.BooleanVar(value=False)
+        self.current_output_engine = customtkinter.StringVar(value=ocr_pipeline.ocr_output.DEFAULT_OUTPUT_ENGINE)
+        self.reflow_pdf = customtkinter.BooleanVar(value=False)
+        self.current_render_workers = customtkinter.StringVar(value=str(ocr_pipeline.DEFAULT_RENDER_WORKERS))
+        self.precompiled_preamble = customtkinter.BooleanVar(value=False)
+        self.current_preprocess = customtkinter.StringVar(value="none")
+        self.prepass = customtkinter.BooleanVar(value=False)
+        self.detect_osd = customtkinter.BooleanVar(value=False)
+
+        self.tabview = customtkinter.CTkTabview(self, width=250)
+        self.tabview.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
+        self.tabview.add("Files")
+        self.tabview.add("Settings")
+        self.tabview.add("Pipeline")
+
+        # --- Files Tab ---
+        self.tabview.tab("Files").grid_columnconfigure(0, weight=1)
+        self.file_list_frame = customtkinter.CTkFrame(self.tabview.tab("Files"))
+        self.file_list_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.file_list_frame.grid_columnconfigure(0, weight=1)
+        self.file_list_frame.grid_rowconfigure(0, weight=1)
+        self.file_listbox = tkinter.Listbox(self.file_list_frame, selectmode=tkinter.EXTENDED, borderwidth=0, highlightthickness=0)
+        self.file_listbox.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
+        self.listbox_scrollbar = customtkinter.CTkScrollbar(self.file_list_frame, command=self.file_listbox.yview)
+        self.listbox_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.file_listbox.configure(yscrollcommand=self.listbox_scrollbar.set)
+        
+        self.button_frame = customtkinter.CTkFrame(self.tabview.tab("Files"))
+        self.button_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        self.add_files_button = customtkinter.CTkButton(self.button_frame, text="Add Files", command=self.add_files)
+        self.add_files_button.pack(side="left", padx=5, pady=5)
+        self.remove_selected_button = customtkinter.CTkButton(self.button_frame, text="Remove Selected", command=self.remove_selected_files)
+        self.remove_selected_button.pack(side="left", padx=5, pady=5)
+        self.clear_list_button = customtkinter.CTkButton(self.button_frame, text="Clear List", command=self.clear_file_list)
+        self.clear_list_button.pack(side="left", padx=5, pady=5)
+        
+        self.target_dir_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="Output Folder: Not selected")
+        self.target_dir_label.grid(row=2, column=0, padx=10, pady=(10,0), sticky="w")
+        self.select_target_button = customtkinter.CTkButton(self.tabview.tab("Files"), text="Select Output Folder", command=self.select_target_directory)
+        self.select_target_button.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+        
+        self.language_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="OCR Language:")
+        self.language_label.grid(row=4, column=0, padx=10, pady=(10,0), sticky="w")
+        self.language_var = customtkinter.StringVar(value="eng+tur")
+        self.language_options = ["eng", "tur", "eng+tur", "deu", "fra", "ara", "rus", "spa", "jpn", "chi_sim"]
+        self.language_menu = customtkinter.CTkOptionMenu(self.tabview.tab("Files"), variable=self.language_var, values=self.language_options)
+        self.language_menu.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
+        
+        self.convert_button = customtkinter.CTkButton(self.tabview.tab("Files"), text="Convert", command=self.start_conversion_thread, font=customtkinter.CTkFont(size=16, weight="bold"))
+        self.convert_button.grid(row=6, column=0, padx=10, pady=20, sticky="ew")
+        
+        self.status_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="Status: Idle")
+        self.status_label.grid(row=7, column=0, padx=10, pady=5, sticky="ew")
+        self.progressbar = customtkinter.CTkProgressBar(self.tabview.tab("Files"))
+        self.progressbar.grid(row=8, column=0, padx=10, pady=10, sticky="ew")
+        self.progressbar.set(0)
+        self.progress_detail_label = customtkinter.CTkLabel(self.tabview.tab("Files"), text="")
+        self.progress_detail_label.grid(row=9, column=0, padx=10, pady=(0,5), sticky="ew")
+        self.cancel_button = customtkinter.CTkButton(self.tabview.tab("Files"), text="Cancel", command=self.cancel_conversion, state="disabled")
+        self.cancel_button.grid(row=10, column=0, padx=10, pady=(0,10), sticky="ew")
+
+        # --- Settings Tab ---
+        self.tabview.tab("Settings").grid_columnconfigure(0, weight=1)
+        self.appearance_mode_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Appearance Mode:", anchor="w")
+        self.appearance_mode_label.grid(row=0, column=0, padx=20, pady=(10, 0), sticky="w")
+        self.appearance_mode_optionemenu = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), values=["Light", "Dark", "System"], command=self.change_appearance_mode_event)
+        self.appearance_mode_optionemenu.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.appearance_mode_optionemenu.set("System")
+        
+        self.pandoc_settings_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Pandoc PDF Settings", font=customtkinter.CTkFont(size=14, weight="bold"))
+        self.pandoc_settings_label.grid(row=2, column=0, padx=20, pady=(10,5), sticky="w")
+        
+        self.font_size_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Font Size:")
+        self.font_size_label.grid(row=3, column=0, padx=20, pady=(5,0), sticky="w")
+        self.font_size_options = ["8pt", "9pt", "10pt", "11pt", "12pt", "13pt", "14pt", "16pt", "18pt", "20pt", "22pt", "24pt"]
+        self.font_size_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_font_size, values=self.font_size_options)
+        self.font_size_dropdown.grid(row=4, column=0, padx=20, pady=(0,10), sticky="ew")
+        
+        self.main_font_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Main Font (for Xe/LuaLaTeX):")
+        self.main_font_label.grid(row=5, column=0, padx=20, pady=(5,0), sticky="w")
+        self.main_font_options = ["Liberation Serif", "Linux Libertine O", "Times New Roman", "Arial", "Calibri", "DejaVu Serif", "DejaVu Sans", "Georgia", "Verdana", "EB Garamond", "Noto Serif", "Noto Sans", "CMU Serif", "CMU Sans Serif"]
+        self.main_font_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_main_font, values=self.main_font_options)
+        self.main_font_dropdown.grid(row=6, column=0, padx=20, pady=(0,10), sticky="ew")
+        
+        self.margin_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Margin (e.g., 0.7in, 2cm):")
+        self.margin_label.grid(row=7, column=0, padx=20, pady=(5,0), sticky="w")
+        self.margin_entry = customtkinter.CTkEntry(self.tabview.tab("Settings"), textvariable=self.current_margin)
+        self.margin_entry.grid(row=8, column=0, padx=20, pady=(0,10), sticky="ew")
+        
+        self.pdf_engine_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="PDF Engine:")
+        self.pdf_engine_label.grid(row=9, column=0, padx=20, pady=(5,0), sticky="w")
+        self.pdf_engine_options = ["xelatex", "lualatex", "pdflatex"]
+        self.pdf_engine_dropdown = customtkinter.CTkOptionMenu(self.tabview.tab("Settings"), variable=self.current_pdf_engine, values=self.pdf_engine_options)
+        self.pdf_engine_dropdown.grid(row=10, column=0, padx=20, pady=(0,10), sticky="ew")
+        
+        self.line_spacing_label = customtkinter.CTkLabel(self.tabview.tab("Settings"), text="Line Spacing (e.g., 1.0, 1.5):")
+        self.line_spacing_label.grid(row=11, column=0, padx=20, pady=(5,0), sticky="w")
+        self.line_spacing_entry = customtkinter.CTkEntry(self.tabview.tab("Settings"), textvariable=self.current_line_spacing)
+        self.line_spacing_entry.grid(row=12, column=0, padx=20, pady=(0,10), sticky="ew")
+        
+        self.precompiled_preamble_checkbox = customtkinter.CTkCheckBox(self.tabview.tab("Settings"), text="Precompiled LaTeX preamble (pdflatex)", variable=self.precompiled_preamble)
+        self.precompiled_preamble_checkbox.grid(row=13, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.save_settings_button = customtkinter.CTkButton(self.tabview.tab("Settings"), text="Apply Settings (Informational)", command=self.apply_pandoc_settings)
+        self.save_settings_button.grid(row=14, column=0, padx=20, pady=20, sticky="ew")
+
+        # --- Pipeline Tab ---
+        self.tabview.tab("Pipeline").grid_columnconfigure(0, weight=1)
+        self.tabview.tab("Pipeline").grid_rowconfigure(0, weight=1)
+        self.pipeline_frame = customtkinter.CTkScrollableFrame(self.tabview.tab("Pipeline"), label_text="OCR Pipeline Settings")
+        self.pipeline_frame.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
+        self.pipeline_frame.grid_columnconfigure(0, weight=1)
+
+        self.ocr_workers_label = customtkinter.CTkLabel(self.pipeline_frame, text="OCR Workers:")
+        self.ocr_workers_label.grid(row=0, column=0, padx=20, pady=(5,0), sticky="w")
+        self.ocr_workers_entry = customtkinter.CTkEntry(self.pipeline_frame, textvariable=self.current_ocr_workers)
+        self.ocr_workers_entry.grid(row=1, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.ocr_executor_label = customtkinter.CTkLabel(self.pipeline_frame, text="OCR Executor:")
+        self.ocr_executor_label.grid(row=2, column=0, padx=20, pady=(5,0), sticky="w")
+        self.ocr_executor_options = ["process", "thread"]
+        self.ocr_executor_dropdown = customtkinter.CTkOptionMenu(self.pipeline_frame, variable=self.current_ocr_executor, values=self.ocr_executor_options)
+        self.ocr_executor_dropdown.grid(row=3, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.ocr_cache_checkbox = customtkinter.CTkCheckBox(self.pipeline_frame, text="Reuse cached OCR results", variable=self.use_ocr_cache)
+        self.ocr_cache_checkbox.grid(row=4, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.force_ocr_checkbox = customtkinter.CTkCheckBox(self.pipeline_frame, text="Force OCR (ignore existing text layers)", variable=self.force_ocr)
+        self.force_ocr_checkbox.grid(row=5, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.output_engine_label = customtkinter.CTkLabel(self.pipeline_frame, text="Output Engine:")
+        self.output_engine_label.grid(row=6, column=0, padx=20, pady=(5,0), sticky="w")
+        self.output_engine_dropdown = customtkinter.CTkOptionMenu(self.pipeline_frame, variable=self.current_output_engine, values=ocr_pipeline.ocr_output.OUTPUT_ENGINES)
+        self.output_engine_dropdown.grid(row=7, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.reflow_pdf_checkbox = customtkinter.CTkCheckBox(self.pipeline_frame, text="Also write a text-only PDF (no LaTeX)", variable=self.reflow_pdf)
+        self.reflow_pdf_checkbox.grid(row=8, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.render_workers_label = customtkinter.CTkLabel(self.pipeline_frame, text="Render Workers (documents typeset at once):")
+        self.render_workers_label.grid(row=9, column=0, padx=20, pady=(5,0), sticky="w")
+        self.render_workers_entry = customtkinter.CTkEntry(self.pipeline_frame, textvariable=self.current_render_workers)
+        self.render_workers_entry.grid(row=10, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.preprocess_label = customtkinter.CTkLabel(self.pipeline_frame, text="Preprocessing before OCR (needs NumPy):")
+        self.preprocess_label.grid(row=11, column=0, padx=20, pady=(5,0), sticky="w")
+        self.preprocess_dropdown = customtkinter.CTkOptionMenu(self.pipeline_frame, variable=self.current_preprocess, values=ocr_pipeline.ocr_preprocess.PREPROCESS_CHOICES)
+        self.preprocess_dropdown.grid(row=12, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.prepass_checkbox = customtkinter.CTkCheckBox(self.pipeline_frame, text="Skip blank pages, reuse text of duplicate pages", variable=self.prepass)
+        self.prepass_checkbox.grid(row=13, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.osd_checkbox = customtkinter.CTkCheckBox(self.pipeline_frame, text="Detect page rotation and script (narrows the OCR languages per page)", variable=self.detect_osd)
+        self.osd_checkbox.grid(row=14, column=0, padx=20, pady=(5,10), sticky="w")
+
+        self.selected_files = []
+        self.target_directory = ""
+        self.progress = None # ocr_progress.ProgressChannel of the running batch
+        
+        if not ocr_pipeline.is_tesseract_available():
+            if os.name == 'nt' and not os.path.exists(ocr_pipeline.TESSERACT_WINDOWS_PATH):
+                 self.after(100, lambda: tkinter.messagebox.showwarning("Warning", "Tesseract OCR not found or not in PATH.\nThe default path C:\\Program Files\\Tesseract-OCR\\tesseract.exe is also invalid.\nPlease install it and add to PATH, or specify its path in the code."))
+            elif os.name != 'nt':
+                 self.after(100, lambda: tkinter.messagebox.showwarning("Warning", "Tesseract OCR not found or not in PATH.\nPlease install it and add to your system's PATH."))
+
+        self.change_appearance_mode_event(customtkinter.get_appearance_mode())
+
+    def apply_pandoc_settings(self):
+        font_size = self.current_font_size.get()
+        main_font = self.current_main_font.get()
+        margin = self.current_margin.get()
+        pdf_engine = self.current_pdf_engine.get()
+        line_spacing = self.current_line_spacing.get()
+        tkinter.messagebox.showinfo("Settings",
+                                    f"Settings updated (will be used during conversion):\n"
+                                    f"- Font Size: {font_size}\n"
+                                    f"- Font: {main_font}\n"
+                                    f"- Margin: {margin}\n"
+                                    f"- PDF Engine: {pdf_engine}\n"
+                                    f"- Line Spacing: {line_spacing}")
+        print(f"Pandoc settings updated in UI: Size={font_size}, Font={main_font}, Margin={margin}, Engine={pdf_engine}, Line Spacing={line_spacing}")
+
+    def change_appearance_mode_event(self, new_appearance_mode: str):
+        customtkinter.set_appearance_mode(new_appearance_mode)
+        effective_mode = customtkinter.get_appearance_mode() 
+        if effective_mode == "Dark":
+            self.file_listbox.configure(bg="#2B2B2B", fg="white")
+        else: # Light
+            self.file_listbox.configure(bg="white", fg="black")
+
+    def add_files(self):
+        files = filedialog.askopenfilenames(title="Select PDF Files", filetypes=(("PDF Files", "*.pdf"), ("All Files", "*.*")))
+        if files:
+            for file_path in files:
+                if file_path not in self.selected_files:
+                    self.selected_files.append(file_path)
+                    self.file_listbox.insert(tkinter.END, os.path.basename(file_path))
+            self.update_status(f"{len(files)} file(s) added.")
+
+    def remove_selected_files(self):
+        selected_indices = self.file_listbox.curselection()
+        if not selected_indices:
+            tkinter.messagebox.showwarning("Warning", "Select at least one file to remove.")
+            return
+        for index in reversed(selected_indices):
+            del self.selected_files[index]
+            self.file_listbox.delete(index)
+        self.update_status(f"{len(selected_indices)} file(s) removed.")
+
+    def clear_file_list(self):
+        self.selected_files.clear()
+        self.file_listbox.delete(0, tkinter.END)
+        self.update_status("File list cleared.")
+
+    def select_target_directory(self):
+        directory = filedialog.askdirectory(title="Select Output Folder")
+        if directory:
+            self.target_directory = directory
+            self.target_dir_label.configure(text=f"Output Folder: {self.target_directory}")
+            self.update_status(f"Output folder set to: {self.target_directory}")
+
+    # Tk thread only; the conversion thread reports through self.progress (see poll_progress)
+    def update_status(self, message):
+        self.status_label.configure(text=f"Status: {message}")
+
+    def update_progressbar(self, value):
+        self.progressbar.set(value)
+
+    # Drains the progress channel from the Tk loop, at most every GUI_POLL_MS
+    def poll_progress(self):
+        snapshot = self.progress.drain()
+        if snapshot is not None:
+            if snapshot["status"]:
+                self.update_status(snapshot["status"])
+            if snapshot["total_pages"]:
+                self.update_progressbar(snapshot["fraction"])
+                self.progress_detail_label.configure(text=ocr_progress.format_progress(snapshot))
+            if snapshot["finished"]:
+                self.conversion_finished(snapshot)
+                return
+        self.after(ocr_progress.GUI_POLL_MS, self.poll_progress)
+
+    def cancel_conversion(self):
+        if self.progress is not None:
+            self.progress.cancel()
+            self.cancel_button.configure(state="disabled")
+            self.update_status("Cancelling after the pages in progress...")
+
+    def conversion_finished(self, snapshot):
+        failures = snapshot["result"] or []
+        self.progress = None
+        self.cancel_button.configure(state="disabled")
+        self.set_ui_elements_state("normal")
+        # Errors are collected per file and shown once, when the batch is done
+        if failures:
+            summary = "\n\n".join(f"{os.path.basename(pdf_path)}:\n{error_message.strip()[:500]}" for pdf_path, error_message in failures)
+            tkinter.messagebox.showerror("Completed with errors", f"{len(failures)} file(s) failed:\n\n{summary}")
+        elif snapshot["cancelled"]:
+            tkinter.messagebox.showinfo("Cancelled", f"Conversion cancelled after {snapshot['pages_done']} of {snapshot['total_pages']} pages.\nConverting the same files again continues where it stopped.")
+        else:
+            tkinter.messagebox.showinfo("Complete", "Conversion process has finished.")
+
+    def set_ui_elements_state(self, state):
+        widgets_to_toggle = [
+            self.convert_button, self.add_files_button, self.remove_selected_button,
+            self.clear_list_button, self.select_target_button, self.language_menu,
+            self.font_size_dropdown, self.main_font_dropdown, self.margin_entry,
+            self.pdf_engine_dropdown, self.line_spacing_entry,
+            self.ocr_workers_entry, self.ocr_executor_dropdown, self.ocr_cache_checkbox,
+            self.force_ocr_checkbox, self.output_engine_dropdown, self.reflow_pdf_checkbox,
+            self.render_workers_entry, self.precompiled_preamble_checkbox, self.preprocess_dropdown,
+            self.prepass_checkbox, self.osd_checkbox,
+            self.save_settings_button, self.appearance_mode_optionemenu
+        ]
+        for widget in widgets_to_toggle:
+            if widget: widget.configure(state=state)
+
+    def start_conversion_thread(self):
+        if not ocr_pipeline.is_tesseract_available():
+            tkinter.messagebox.showerror("Error", "Tesseract OCR not found or not configured correctly.")
+            return
+        if not self.selected_files:
+            tkinter.messagebox.showerror("Error", "Please select at least one PDF file to convert.")
+            return
+        if not self.target_directory:
+            tkinter.messagebox.showerror("Error", "Please select an output folder.")
+            return
+
+        self.set_ui_elements_state("disabled")
+        self.update_progressbar(0)
+        self.progress_detail_label.configure(text="")
+        self.progress = ocr_progress.ProgressChannel()
+        self.cancel_button.configure(state="normal")
+        conversion_thread = threading.Thread(target=self.process_files, daemon=True,
+                                             args=(self.progress, list(self.selected_files), self.target_directory, self.get_conversion_settings()))
+        conversion_thread.start()
+        self.after(ocr_progress.GUI_POLL_MS, self.poll_progress)
+
+    def get_ocr_worker_count(self):
+        workers = self.current_ocr_workers.get().strip()
+        try:
+            if int(workers) > 0:
+                return int(workers)
+        except ValueError:
+            pass
+        print(f"Invalid OCR worker count: '{workers}'. Using default ({ocr_pipeline.default_process_count()}).")
+        return ocr_pipeline.default_process_count()
+
+    def get_render_worker_count(self):
+        workers = self.current_render_workers.get().strip()
+        try:
+            if int(workers) > 0:
+                return int(workers)
+        except ValueError:
+            pass
+        print(f"Invalid render worker count: '{workers}'. Using default ({ocr_pipeline.DEFAULT_RENDER_WORKERS}).")
+        return ocr_pipeline.DEFAULT_RENDER_WORKERS
+
+    # Reads the settings widgets on the Tk thread; returns the keyword arguments for convert_files
+    def get_conversion_settings(self):
+        pandoc_settings = ocr_pipeline.resolve_pandoc_settings(
+            font_size=self.current_font_size.get(),
+            margin=self.current_margin.get(),
+            main_font=self.current_main_font.get(),
+            pdf_engine=self.current_pdf_engine.get(),
+            line_spacing=self.current_line_spacing.get(),
+            precompiled_preamble=self.precompiled_preamble.get(),
+        )
+
+        ocr_options = {"force_ocr": self.force_ocr.get(),
+                       "preprocess": ocr_pipeline.ocr_preprocess.parse_preprocess_steps(self.current_preprocess.get()),
+                       "osd": self.detect_osd.get()}
+        if self.use_ocr_cache.get():
+            ocr_options["cache_dir"] = ocr_pipeline.ocr_cache.default_cache_directory()
+
+        return dict(
+            ocr_lang=self.language_var.get(),
+            num_processes=self.get_ocr_worker_count(),
+            executor=self.current_ocr_executor.get(),
+            ocr_options=ocr_options,
+            pandoc_settings=pandoc_settings,
+            output_engine=self.current_output_engine.get(),
+            reflow_pdf=self.reflow_pdf.get(),
+            render_workers=self.get_render_worker_count(),
+            prepass_settings=ocr_pipeline.ocr_prepass.resolve_prepass_settings() if self.prepass.get() else None,
+        )
+
+    # Runs on the conversion thread: no Tk calls here, everything goes through progress
+    def process_files(self, progress, pdf_paths, target_directory, conversion_settings):
+        try:
+            failures = ocr_pipeline.convert_files(
+                pdf_paths, target_directory, **conversion_settings,
+                cancel_event=progress.cancel_event,
+                status_callback=progress.status,
+                progress_callback=progress.progress,
+            )
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            failures = [(pdf_path, f"Conversion failed: {e}") for pdf_path in pdf_paths]
+        progress.finish(failures)
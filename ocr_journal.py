@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+import ocr_format
+
+# Streaming, crash-resumable output for one document.
+#
+# Every finished page is appended to <name>_ocr.journal (one JSON line per page) as soon as it
+# comes back from a worker, in whatever order pages complete. A reorder buffer writes pages to
+# <name>_ocr.txt strictly in page order, so only the pages that arrived ahead of a gap are held
+# in memory. The same buffer streams the pages' Markdown (formatted by the workers) to
+# <name>_ocr.md, which is what Pandoc reads. If the process dies, a restarted run reads the journal, OCRs only the missing pages
+# and takes the others from the journal (by file offset, not by loading them all into memory).
+
+JOURNAL_VERSION = 1
+PAGE_JOINER = "\n\n"
+
+# OCR settings that change page texts; a journal written with other settings is not reused
+JOURNAL_OCR_OPTION_KEYS = ["raster_mode", "psm", "adaptive_dpi", "max_page_megapixels", "force_ocr", "word_boxes", "preprocess", "osd"]
+
+def journal_settings_key(ocr_lang, dpi, ocr_options):
+    settings = [ocr_lang, dpi] + [ocr_options.get(key) for key in JOURNAL_OCR_OPTION_KEYS]
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+def output_paths(pdf_path, target_directory):
+    base_name_no_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+    return (os.path.join(target_directory, f"{base_name_no_ext}_ocr.txt"),
+            os.path.join(target_directory, f"{base_name_no_ext}_ocr.md"),
+            os.path.join(target_directory, f"{base_name_no_ext}_ocr.journal"))
+
+class StreamingDocumentWriter:
+    def __init__(self, pdf_path, target_directory, total_pages, settings_key, resume=True):
+        self.pdf_path = pdf_path
+        self.total_pages = total_pages
+        self.txt_path, self.markdown_path, self.journal_path = output_paths(pdf_path, target_directory)
+        stat = os.stat(pdf_path)
+        self.header = {"version": JOURNAL_VERSION, "pdf_path": os.path.abspath(pdf_path), "size": stat.st_size,
+                       "mtime": stat.st_mtime, "total_pages": total_pages, "settings": settings_key}
+        self.recovered = self._load_journal() if resume else {} # page_num -> (offset, page_info)
+        self.pending = {} # page_num -> (text, markdown), or None when the text is read back from the journal
+        self.next_page = 0
+        self._journal_file = None
+        self._journal_reader = None
+        self._txt_file = None
+        self._markdown_file = None
+        self._blank_lines = ocr_format.BlankLineCollapser()
+
+    # Returns {page_num: (offset, page_info)} of the pages a previous run already finished.
+    # A truncated last line (crash mid-write) is ignored.
+    def _load_journal(self):
+        if not os.path.exists(self.journal_path):
+            return {}
+        recovered = {}
+        try:
+            with open(self.journal_path, "rb") as journal_file:
+                header_line = journal_file.readline()
+                if not header_line.endswith(b"\n") or json.loads(header_line) != self.header:
+                    print(f"Journal does not match the current file or settings, starting over: {self.journal_path}")
+                    return {}
+                while True:
+                    offset = journal_file.tell()
+                    line = journal_file.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = json.loads(line)
+                    if 0 <= entry["page"] < self.total_pages:
+                        recovered[entry["page"]] = (offset, entry.get("info"))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read journal ({self.journal_path}), starting over: {e}")
+            return {}
+        print(f"Resuming {os.path.basename(self.pdf_path)}: {len(recovered)}/{self.total_pages} pages recovered from journal")
+        return recovered
+
+    def missing_pages(self):
+        return [page_num for page_num in range(self.total_pages) if page_num not in self.recovered]
+
+    def recovered_page_info(self):
+        return {page_num: page_info for page_num, (offset, page_info) in self.recovered.items()}
+
+    def _open(self):
+        if self._txt_file is not None:
+            return
+        if self.recovered:
+            self._journal_file = open(self.journal_path, "ab")
+            # Drop a torn last line so new entries start on a line boundary
+            self._journal_file.truncate(self._valid_journal_length())
+        else:
+            self._journal_file = open(self.journal_path, "wb")
+            self._journal_file.write(json.dumps(self.header).encode("utf-8") + b"\n")
+        self._txt_file = open(self.txt_path, "w", encoding="utf-8")
+        self._markdown_file = open(self.markdown_path, "w", encoding="utf-8")
+        for page_num in self.recovered:
+            self.pending[page_num] = None
+
+    def _valid_journal_length(self):
+        with open(self.journal_path, "rb") as journal_file:
+            valid_length = 0
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    break
+                valid_length += len(line)
+        return valid_length
+
+    def _read_journal_text(self, offset):
+        if self._journal_reader is None:
+            self._journal_reader = open(self.journal_path, "rb")
+        self._journal_reader.seek(offset)
+        return json.loads(self._journal_reader.readline())["text"]
+
+    # page_results: (page_num, page_text, formatted_text, page_info).
+    # Error placeholders are written to the TXT but not journaled, so a rerun retries those pages.
+    # Word boxes are moved from page_info to the journal entry, which is where the searchable
+    # PDF output reads them from.
+    def add_pages(self, page_results):
+        self._open()
+        for page_num, page_text, formatted_text, page_info in page_results:
+            words = page_info.pop("words", None)
+            if not page_info.get("error"):
+                entry = {"page": page_num, "text": page_text, "info": page_info}
+                if words is not None:
+                    entry["words"] = words
+                self._journal_file.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.pending[page_num] = (page_text, formatted_text)
+        self._journal_file.flush()
+        self._write_ready_pages()
+
+    def _write_ready_pages(self):
+        while self.next_page in self.pending:
+            page = self.pending.pop(self.next_page)
+            if page is None:
+                self._journal_file.flush()
+                page_text = self._read_journal_text(self.recovered[self.next_page][0])
+                formatted_text = ocr_format.format_page_text(page_text)
+            else:
+                page_text, formatted_text = page
+            if self.next_page > 0:
+                self._txt_file.write(PAGE_JOINER)
+                self._markdown_file.write(self._blank_lines.feed(PAGE_JOINER))
+            self._txt_file.write(page_text)
+            self._markdown_file.write(self._blank_lines.feed(ocr_format.escape_markdown(formatted_text)))
+            self.next_page += 1
+        self._txt_file.flush()
+
+    # Writes whatever is left and closes the files. Returns True when every page made it to the TXT.
+    def close(self):
+        self._open()
+        self._write_ready_pages()
+        complete = self.next_page == self.total_pages
+        self._markdown_file.write(self._blank_lines.finish())
+        for handle in (self._txt_file, self._markdown_file, self._journal_file, self._journal_reader):
+            if handle is not None:
+                handle.close()
+        self._txt_file = self._markdown_file = self._journal_file = self._journal_reader = None
+        return complete
+
+    # Closes the files of a document whose batch was cancelled. The journal stays, so a rerun
+    # only OCRs the missing pages; nothing is written for a document that had not started.
+    def abort(self):
+        if self._txt_file is None:
+            return
+        self.close()
+
+    def remove_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+
+# Yields (page_num, words) for every journaled page that has word boxes
+def iter_journal_words(journal_path):
+    with open(journal_path, "rb") as journal_file:
+        journal_file.readline() # Header
+        for line in journal_file:
+            if not line.endswith(b"\n"):
+                break
+            entry = json.loads(line)
+            if entry.get("words") is not None:
+                yield entry["page"], entry["words"]
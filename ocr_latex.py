@@ -0,0 +1,72 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+import ocr_cache
+
+# Precompiled preamble for the Pandoc path. Every document of a batch starts with the same
+# LaTeX header (scrartcl, geometry, fonts, packages), so it is dumped once into a format with
+# mylatexformat and each document is typeset from that format. Pandoc then only writes the
+# .tex, and LaTeX skips reading the preamble's packages again for every file.
+# Formats are keyed by the exact preamble text and kept in the cache folder between runs.
+# Only pdflatex is supported: XeTeX and LuaTeX cannot dump fonts loaded by fontspec.
+
+FORMAT_ENGINES = ["pdflatex"]
+MAX_LATEX_RUNS = 3 # hyperref needs a second run for the PDF outline
+_format_lock = threading.Lock()
+
+def default_format_directory():
+    return os.path.join(ocr_cache.default_cache_directory(), "latex-formats")
+
+def split_preamble(tex):
+    begin = tex.find("\\begin{document}")
+    if begin < 0:
+        raise ValueError("no \\begin{document} in Pandoc output")
+    return tex[:begin]
+
+# Returns the format name for this preamble, building the format the first time it is seen
+def ensure_preamble_format(preamble, engine, format_directory, log=print):
+    format_name = "ocrpreamble-" + hashlib.sha256((engine + "\n" + preamble).encode("utf-8")).hexdigest()[:16]
+    format_path = os.path.join(format_directory, format_name + ".fmt")
+    with _format_lock:
+        if os.path.exists(format_path):
+            return format_name
+        os.makedirs(format_directory, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="ocr_fmt_") as tmp_dir:
+            with open(os.path.join(tmp_dir, format_name + ".tex"), "w", encoding="utf-8") as f_tex:
+                f_tex.write(preamble + "\\begin{document}\n\\end{document}\n")
+            cmd_args = [engine, "-ini", "-interaction=nonstopmode", f"-jobname={format_name}",
+                        f"&{engine}", "mylatexformat.ltx", format_name + ".tex"]
+            proc = subprocess.run(cmd_args, cwd=tmp_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            built_path = os.path.join(tmp_dir, format_name + ".fmt")
+            if proc.returncode != 0 or not os.path.exists(built_path):
+                raise RuntimeError(f"building the preamble format failed:\n{proc.stdout.decode('utf-8', 'replace')[-2000:]}")
+            shutil.move(built_path, format_path)
+        log(f"Precompiled LaTeX preamble: {format_path}")
+    return format_name
+
+# Pandoc writes the .tex; LaTeX runs on it from the preamble format. Raises on any failure so
+# the caller can fall back to a plain Pandoc run.
+def run_pandoc_with_preamble_format(pandoc_command_for, markdown_path, output_pdf_path, engine, format_directory, log=print):
+    with tempfile.TemporaryDirectory(prefix="ocr_tex_") as tmp_dir:
+        tex_path = os.path.join(tmp_dir, "document.tex")
+        proc = subprocess.run(pandoc_command_for(tex_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Pandoc could not write LaTeX:\n{proc.stderr.decode('utf-8', 'replace').strip()}")
+        with open(tex_path, encoding="utf-8") as f_tex:
+            preamble = split_preamble(f_tex.read())
+        format_name = ensure_preamble_format(preamble, engine, format_directory, log)
+
+        # An empty entry makes kpathsea append the default format search path
+        env = dict(os.environ, TEXFORMATS=format_directory + os.pathsep)
+        latex_command = [engine, "-interaction=nonstopmode", "-halt-on-error", f"-fmt={format_name}", "document.tex"]
+        for _ in range(MAX_LATEX_RUNS):
+            proc = subprocess.run(latex_command, cwd=tmp_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if proc.returncode != 0:
+                raise RuntimeError(f"{engine} failed:\n{proc.stdout.decode('utf-8', 'replace')[-2000:]}")
+            with open(os.path.join(tmp_dir, "document.log"), encoding="utf-8", errors="replace") as f_log:
+                if "Rerun to get" not in f_log.read():
+                    break
+        shutil.move(os.path.join(tmp_dir, "document.pdf"), output_pdf_path)
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import heapq
+import pstats
+import cProfile
+import threading
+import collections
+
+# Batch instrumentation. Workers attach a timing record to every page (page_info["metrics"]) and
+# every task; convert_files feeds them to BatchMetrics, which writes
+#
+#   ocr_trace.jsonl  - one JSON record per page, task and output document, as they happen
+#   ocr_metrics.prom - Prometheus textfile-collector summary (pages/sec, stage seconds, worker
+#                      utilization, queue depths, slowest pages), refreshed during the batch
+#
+# Stage times are per page: render includes the DPI/tiling plan, encode is writing the image for
+# the engine (not separable for pytesseract, which encodes inside its OCR call), and for the batch
+# backend, where one Tesseract run covers a whole page range, each page gets its pixel share of it.
+# With a profile directory each worker also keeps a cProfile profile, dumped after every task.
+
+TRACE_FILE_NAME = "ocr_trace.jsonl"
+PROMETHEUS_FILE_NAME = "ocr_metrics.prom"
+PROFILE_SUMMARY_FILE_NAME = "profile_summary.txt"
+METRIC_PREFIX = "ocr_pdf"
+PAGE_STAGES = ["osd", "render", "preprocess", "encode", "ocr", "format"]
+SLOWEST_PAGES = 10
+SUMMARY_REFRESH_SECONDS = 10
+PROFILE_SUMMARY_LINES = 40
+
+def new_page_metrics():
+    return {"osd_ms": 0.0, "render_ms": 0.0, "preprocess_ms": 0.0, "encode_ms": 0.0, "ocr_ms": 0.0, "format_ms": 0.0, "pixels": 0, "bytes": 0, "retries": 0}
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+def worker_id():
+    return f"{os.getpid()}:{threading.current_thread().name}"
+
+# ---- Worker side: optional cProfile hook ----
+
+_profilers = threading.local()
+
+# Runs function(*args) under this worker thread's profiler and dumps the accumulated profile.
+# Profiles are cumulative per worker (process and thread), one .prof file each.
+def run_profiled(profile_dir, function, *args):
+    if not profile_dir:
+        return function(*args)
+    profiler = getattr(_profilers, "profiler", None)
+    if profiler is None:
+        profiler = _profilers.profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active in this process (only one is allowed from Python 3.12 on)
+        return function(*args)
+    try:
+        return function(*args)
+    finally:
+        profiler.disable()
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir, f"worker-{os.getpid()}-{threading.get_ident()}.prof"))
+        except Exception as e:
+            print(f"Could not write worker profile ({profile_dir}): {e}")
+
+# Merges the worker profiles into combined.prof and a text summary sorted by cumulative time
+def write_profile_summary(profile_dir):
+    profile_paths = sorted(os.path.join(profile_dir, name) for name in os.listdir(profile_dir)
+                           if name.startswith("worker-") and name.endswith(".prof"))
+    if not profile_paths:
+        return None
+    summary_path = os.path.join(profile_dir, PROFILE_SUMMARY_FILE_NAME)
+    with open(summary_path, "w", encoding="utf-8") as f_summary:
+        stats = pstats.Stats(*profile_paths, stream=f_summary)
+        stats.dump_stats(os.path.join(profile_dir, "combined.prof"))
+        f_summary.write(f"{len(profile_paths)} worker profile(s)\n")
+        stats.sort_stats("cumulative").print_stats(PROFILE_SUMMARY_LINES)
+    return summary_path
+
+# ---- Main process: aggregation ----
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _metric_lines(name, metric_type, help_text, samples):
+    lines = [f"# HELP {METRIC_PREFIX}_{name} {help_text}", f"# TYPE {METRIC_PREFIX}_{name} {metric_type}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{_label_value(label)}"' for key, label in labels.items())
+        lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRIC_PREFIX}_{name} {value}")
+    return lines
+
+class BatchMetrics:
+    def __init__(self, metrics_dir, num_workers, executor):
+        self.metrics_dir = metrics_dir
+        self.num_workers = num_workers
+        self.executor = executor
+        self.start_time = time.monotonic()
+        self.ocr_start_time = self.ocr_end_time = None
+        self.pages = collections.Counter() # by source
+        self.totals = collections.Counter() # errors, retries, pixels, bytes, output documents...
+        self.stage_seconds = collections.Counter()
+        self.worker_busy_seconds = 0.0
+        self.tasks_submitted = self.tasks_completed = 0
+        self.render_queue_depth = 0
+        self.max_queue_depth = collections.Counter()
+        self.slowest = [] # min-heap of (seconds, file, page)
+        self.failed_files = 0
+        self.last_summary_time = 0.0
+        self.trace_file = None
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+            self.trace_file = open(os.path.join(metrics_dir, TRACE_FILE_NAME), "w", encoding="utf-8")
+
+    def _trace(self, record):
+        if self.trace_file is not None:
+            record["t"] = round(time.monotonic() - self.start_time, 4)
+            self.trace_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # Wraps the task generator handed to the pool; the pool pulls tasks ahead of the workers, so
+    # submitted - completed is the OCR queue depth
+    def track_tasks(self, tasks):
+        for task in tasks:
+            if self.ocr_start_time is None:
+                self.ocr_start_time = time.monotonic()
+            self.tasks_submitted += 1
+            yield task
+
+    @property
+    def ocr_queue_depth(self):
+        return self.tasks_submitted - self.tasks_completed
+
+    def record_resumed_pages(self, page_count):
+        self.pages["journal"] += page_count
+
+    # Blank pages are completed by the pre-pass; duplicates are counted when their original comes back
+    def record_prepass(self, pages_checked, skipped_counts, seconds):
+        self.pages["blank"] += skipped_counts["blank"]
+        self.stage_seconds["prepass"] += seconds
+        self._trace({"type": "prepass", "pages": pages_checked, "blank": skipped_counts["blank"],
+                     "duplicate": skipped_counts["duplicate"], "seconds": round(seconds, 4)})
+
+    # task_info: {"worker", "busy_ms"}; page_results: (page_num, page_info) with page_info["metrics"]
+    # already popped into metrics
+    def record_task(self, pdf_path, task_info, page_results, render_queue_depth):
+        file_name = os.path.basename(pdf_path)
+        self.tasks_completed += 1
+        self.ocr_end_time = time.monotonic()
+        self.worker_busy_seconds += task_info["busy_ms"] / 1000
+        self.render_queue_depth = render_queue_depth
+        self.max_queue_depth["ocr"] = max(self.max_queue_depth["ocr"], self.ocr_queue_depth)
+        self.max_queue_depth["render"] = max(self.max_queue_depth["render"], render_queue_depth)
+        for page_num, page_info, metrics in page_results:
+            metrics = metrics or new_page_metrics()
+            self.pages[page_info["source"]] += 1
+            self.totals["errors"] += int(bool(page_info["error"]))
+            for key in ["retries", "pixels", "bytes"]:
+                self.totals[key] += metrics.get(key, 0)
+            page_seconds = 0.0
+            for stage in PAGE_STAGES:
+                stage_seconds = metrics.get(f"{stage}_ms", 0) / 1000
+                self.stage_seconds[stage] += stage_seconds
+                page_seconds += stage_seconds
+            heap_entry = (page_seconds, file_name, page_num + 1)
+            if len(self.slowest) < SLOWEST_PAGES:
+                heapq.heappush(self.slowest, heap_entry)
+            elif heap_entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, heap_entry)
+            record = {"type": "page", "file": file_name, "page": page_num + 1, "source": page_info["source"],
+                      "cache_hit": page_info["cache_hit"], "error": page_info["error"], "worker": task_info["worker"]}
+            for key in ["error_message", "dpi", "tiles"]:
+                if key in page_info:
+                    record[key] = page_info[key]
+            record.update({key: round(value, 3) if isinstance(value, float) else value for key, value in metrics.items()})
+            self._trace(record)
+        self._trace({"type": "task", "file": file_name, "pages": len(page_results), "worker": task_info["worker"],
+                     "busy_ms": round(task_info["busy_ms"], 3), "ocr_queue_depth": self.ocr_queue_depth, "render_queue_depth": render_queue_depth})
+        if self.metrics_dir and time.monotonic() - self.last_summary_time >= SUMMARY_REFRESH_SECONDS:
+            self.write_summary(running=True)
+
+    def record_output(self, pdf_path, page_count, seconds, error):
+        self.totals["output_documents"] += 1
+        self.totals["output_pages"] += page_count
+        self.stage_seconds["output"] += seconds
+        if error:
+            self.failed_files += 1
+        self._trace({"type": "output", "file": os.path.basename(pdf_path), "pages": page_count, "seconds": round(seconds, 4),
+                     "error": error[1] if error else None})
+
+    def record_failure(self, pdf_path, error_message):
+        self.failed_files += 1
+        self._trace({"type": "failure", "file": os.path.basename(pdf_path), "error": error_message})
+
+    def summary(self):
+        ocr_elapsed = (self.ocr_end_time - self.ocr_start_time) if self.ocr_start_time and self.ocr_end_time else 0.0
+        processed_pages = sum(count for source, count in self.pages.items() if source != "journal")
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.start_time, 3),
+            "ocr_elapsed_seconds": round(ocr_elapsed, 3),
+            "pages": dict(self.pages),
+            "pages_per_sec": round(processed_pages / ocr_elapsed, 3) if ocr_elapsed > 0 else 0.0,
+            "workers": self.num_workers,
+            "executor": self.executor,
+            "worker_utilization": round(self.worker_busy_seconds / (self.num_workers * ocr_elapsed), 4) if ocr_elapsed > 0 else 0.0,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+            "errors": self.totals["errors"], "retries": self.totals["retries"],
+            "pixels": self.totals["pixels"], "encoded_bytes": self.totals["bytes"],
+            "max_queue_depth": dict(self.max_queue_depth),
+            "failed_files": self.failed_files,
+            "slowest_pages": [{"file": file_name, "page": page, "seconds": round(seconds, 3)}
+                              for seconds, file_name, page in sorted(self.slowest, reverse=True)],
+        }
+
+    def write_summary(self, running=False):
+        self.last_summary_time = time.monotonic()
+        if not self.metrics_dir:
+            return
+        summary = self.summary()
+        lines = []
+        lines += _metric_lines("batch_running", "gauge", "1 while the batch is running, 0 once it has finished.", [({}, int(running))])
+        lines += _metric_lines("batch_elapsed_seconds", "gauge", "Wall time since the batch started.", [({}, summary["elapsed_seconds"])])
+        lines += _metric_lines("pages_total", "counter", "Pages finished, by where their text came from.",
+                               [({"source": source}, count) for source, count in sorted(self.pages.items())])
+        lines += _metric_lines("page_errors_total", "counter", "Pages whose OCR failed.", [({}, summary["errors"])])
+        lines += _metric_lines("page_retries_total", "counter", "Pages OCR'd again on their own after their range failed.", [({}, summary["retries"])])
+        lines += _metric_lines("pages_per_second", "gauge", "Pages per second of OCR wall time (resumed pages excluded).", [({}, summary["pages_per_sec"])])
+        lines += _metric_lines("stage_seconds_total", "counter", "Time spent per stage, summed over all workers.",
+                               [({"stage": stage}, round(seconds, 3)) for stage, seconds in sorted(self.stage_seconds.items())])
+        lines += _metric_lines("rendered_pixels_total", "counter", "Pixels rendered for OCR.", [({}, summary["pixels"])])
+        lines += _metric_lines("encoded_bytes_total", "counter", "Bytes of images written for the OCR engine.", [({}, summary["encoded_bytes"])])
+        lines += _metric_lines("workers", "gauge", "OCR workers.", [({"executor": self.executor}, self.num_workers)])
+        lines += _metric_lines("worker_utilization_ratio", "gauge", "Busy time of the OCR workers over their available time.", [({}, summary["worker_utilization"])])
+        lines += _metric_lines("queue_depth", "gauge", "Tasks waiting for an OCR worker / documents waiting for output.",
+                               [({"queue": "ocr"}, self.ocr_queue_depth), ({"queue": "render"}, self.render_queue_depth)])
+        lines += _metric_lines("queue_depth_max", "gauge", "Largest queue depth seen in this batch.",
+                               [({"queue": queue}, depth) for queue, depth in sorted(self.max_queue_depth.items())])
+        lines += _metric_lines("output_documents_total", "counter", "Documents written by the output stage.", [({}, self.totals["output_documents"])])
+        lines += _metric_lines("failed_files", "gauge", "Files that failed in this batch.", [({}, self.failed_files)])
+        lines += _metric_lines("slowest_page_seconds", "gauge", f"The {SLOWEST_PAGES} slowest pages (render + preprocess + encode + OCR + format).",
+                               [({"file": page["file"], "page": page["page"]}, page["seconds"]) for page in summary["slowest_pages"]])
+        prom_path = os.path.join(self.metrics_dir, PROMETHEUS_FILE_NAME)
+        try:
+            # Written to a temp file and renamed so the textfile collector never reads half a file
+            with open(prom_path + ".tmp", "w", encoding="utf-8") as f_prom:
+                f_prom.write("\n".join(lines) + "\n")
+            os.replace(prom_path + ".tmp", prom_path)
+        except Exception as e:
+            print(f"Could not write metrics ({prom_path}): {e}")
+        if self.trace_file is not None:
+            self.trace_file.flush()
+
+    def close(self):
+        self.render_queue_depth = 0 # The render queue has been drained by now
+        summary = self.summary()
+        stage_text = ", ".join(f"{stage} {self.stage_seconds[stage]:.1f}s" for stage in ["prepass"] + PAGE_STAGES + ["output"] if stage in self.stage_seconds)
+        if stage_text:
+            print(f"Stage time (all workers): {stage_text}; worker utilization {summary['worker_utilization']:.0%}")
+        if self.slowest:
+            seconds, file_name, page = max(self.slowest)
+            print(f"Slowest page: {file_name} page {page} ({seconds:.2f}s)")
+        self._trace(dict(summary, type="batch"))
+        self.write_summary(running=False)
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+            print(f"Metrics saved: {os.path.join(self.metrics_dir, TRACE_FILE_NAME)}, {os.path.join(self.metrics_dir, PROMETHEUS_FILE_NAME)}")
@@ -0,0 +1,76 @@
+import threading
+import pytesseract
+
+# Per-page orientation and script detection (Tesseract OSD, needs osd.traineddata) before OCR:
+#
+#   rotation  - pages detected as turned by 90/180/270 degrees are rotated upright before OCR
+#   languages - the selected languages are narrowed to those written in the detected script,
+#               so an eng+rus+ara batch OCRs a Cyrillic page with rus alone
+#
+# Detection runs on a render of at most OSD_MAX_DPI that also fits the page pixel budget
+# (--max-page-megapixels), so pages OCR'd as tiles are detected at a lower DPI. Below the
+# confidence limits, or when OSD finds too little text, the page keeps its orientation and the
+# user's language selection.
+# Languages of one script (eng+tur) cannot be told apart this way and are kept together.
+
+try:
+    import tesserocr # Optional dependency
+except ImportError:
+    tesserocr = None
+
+OSD_MAX_DPI = 200
+MIN_ORIENTATION_CONFIDENCE = 5.0
+MIN_SCRIPT_CONFIDENCE = 1.5
+
+# Tesseract language -> scripts OSD reports for it. Languages missing here are never dropped.
+LANGUAGE_SCRIPTS = {
+    "eng": ("Latin",), "tur": ("Latin",), "deu": ("Latin",), "fra": ("Latin",), "spa": ("Latin",),
+    "ita": ("Latin",), "por": ("Latin",), "nld": ("Latin",), "pol": ("Latin",), "ces": ("Latin",),
+    "swe": ("Latin",), "dan": ("Latin",), "nor": ("Latin",), "fin": ("Latin",), "hun": ("Latin",),
+    "ron": ("Latin",), "vie": ("Latin",), "ind": ("Latin",), "aze": ("Latin",),
+    "rus": ("Cyrillic",), "ukr": ("Cyrillic",), "bul": ("Cyrillic",), "srp": ("Cyrillic",), "bel": ("Cyrillic",),
+    "ell": ("Greek",), "heb": ("Hebrew",), "ara": ("Arabic",), "fas": ("Arabic",), "urd": ("Arabic",),
+    "hin": ("Devanagari",), "mar": ("Devanagari",), "nep": ("Devanagari",), "tha": ("Thai",),
+    "kor": ("Hangul", "Korean", "Han"), "jpn": ("Japanese", "Katakana", "Hiragana", "Han"),
+    "chi_sim": ("Han",), "chi_tra": ("Han",),
+}
+
+_local = threading.local()
+
+def _tesserocr_api():
+    api = getattr(_local, "api", None)
+    if api is None:
+        api = _local.api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.OSD_ONLY)
+    return api
+
+# Returns {"rotate", "orientation_conf", "script", "script_conf"} for a page image, or None when
+# OSD cannot decide. rotate is how far the image has to be turned clockwise to be upright.
+def detect_orientation_script(img):
+    if tesserocr is not None:
+        api = _tesserocr_api()
+        api.SetImage(img)
+        result = api.DetectOrientationScript()
+        if not result:
+            return None
+        return {"rotate": (360 - result["orient_deg"]) % 360, "orientation_conf": result["orient_conf"],
+                "script": result["script_name"], "script_conf": result["script_conf"]}
+    try:
+        result = pytesseract.image_to_osd(img, output_type=pytesseract.Output.DICT)
+        return {"rotate": int(result["rotate"]), "orientation_conf": float(result["orientation_conf"]),
+                "script": result["script"], "script_conf": float(result["script_conf"])}
+    except (pytesseract.TesseractError, KeyError, ValueError):
+        return None # Too few characters, or osd.traineddata is missing
+
+# The selected languages written in `script`; the whole selection when none of them is
+def narrow_languages(ocr_lang, script):
+    languages = [lang for lang in ocr_lang.split("+") if lang]
+    narrowed = [lang for lang in languages if script in LANGUAGE_SCRIPTS.get(lang, (script,))]
+    return "+".join(narrowed) if narrowed else ocr_lang
+
+# Turns a detection into (clockwise rotation to apply, languages to OCR with) for one page
+def page_decision(detection, ocr_lang):
+    if detection is None:
+        return 0, ocr_lang
+    rotate = detection["rotate"] if detection["orientation_conf"] >= MIN_ORIENTATION_CONFIDENCE else 0
+    lang = narrow_languages(ocr_lang, detection["script"]) if detection["script_conf"] >= MIN_SCRIPT_CONFIDENCE else ocr_lang
+    return rotate, lang
@@ -0,0 +1,115 @@
+import os
+import html
+import contextlib
+import fitz # PyMuPDF
+import ocr_journal
+
+# Output engines that do not need a LaTeX toolchain.
+#
+#   pymupdf - copies the original PDF and lays the OCR'd words over each page as invisible text
+#             (a "sandwich" PDF: the scans stay untouched, the text is searchable and selectable)
+#   reflow  - an optional text-only PDF typeset from the formatted Markdown with PyMuPDF's Story
+#
+# "pandoc" (the Markdown -> LaTeX -> PDF path) lives in ocr_pipeline.run_pandoc.
+
+OUTPUT_ENGINES = ["pandoc", "pymupdf"]
+DEFAULT_OUTPUT_ENGINE = "pandoc"
+TEXT_LAYER_FONT = "helv" # Invisible, so only glyph coverage and widths matter
+REFLOW_PAGE_SIZE = "a4"
+REFLOW_MARGIN_PT = 54
+REFLOW_CSS = "body {font-family: serif; font-size: 11pt;} h1, h2, h3 {font-family: sans-serif;}"
+
+_text_layer_font = None
+
+def get_text_layer_font():
+    global _text_layer_font
+    if _text_layer_font is None:
+        _text_layer_font = fitz.Font(TEXT_LAYER_FONT)
+    return _text_layer_font
+
+def reflowed_pdf_path(pdf_path, target_directory):
+    base_name_no_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(target_directory, f"{base_name_no_ext}_ocr_text.pdf")
+
+# Writes each word into its box: the font's ascender-to-descender height fills the box height
+# unless the word would then be wider than the box, and the descender sits on the box bottom,
+# so the invisible glyphs (and what a viewer highlights) stay inside the OCR word box
+def add_invisible_words(page, words):
+    font = get_text_layer_font()
+    glyph_height = font.ascender - font.descender
+    writer = fitz.TextWriter(page.rect)
+    for x0, y0, x1, y1, text in words:
+        text_width = font.text_length(text, fontsize=1)
+        if text_width <= 0 or x1 <= x0 or y1 <= y0:
+            continue
+        fontsize = min((x1 - x0) / text_width, (y1 - y0) / glyph_height)
+        writer.append((x0, y1 + font.descender * fontsize), text, font=font, fontsize=fontsize)
+    writer.write_text(page, render_mode=3) # 3 = neither fill nor stroke
+
+# Copies the source PDF and adds the journaled word boxes as an invisible text layer. Pages whose
+# own text layer was used have no word boxes and are left as they are.
+# Messages go to log. Returns (title, error_message) on failure, None on success.
+def write_searchable_pdf(pdf_path, journal_path, output_pdf_path, fitz_lock=None, log=print):
+    fitz_lock = fitz_lock or contextlib.nullcontext()
+    try:
+        with fitz_lock:
+            doc = fitz.open(pdf_path)
+        try:
+            for page_num, words in ocr_journal.iter_journal_words(journal_path):
+                with fitz_lock:
+                    add_invisible_words(doc.load_page(page_num), words)
+            with fitz_lock:
+                doc.save(output_pdf_path, garbage=1, deflate=True)
+        finally:
+            with fitz_lock:
+                doc.close()
+    except Exception as e:
+        error_message = f"Searchable PDF error ({os.path.basename(pdf_path)}): {e}"
+        log(error_message)
+        return ("Output Error", error_message)
+    log(f"PDF successfully converted: {output_pdf_path}")
+    return None
+
+def markdown_to_html(markdown_lines):
+    parts, paragraph = [], []
+    for line in markdown_lines:
+        line = line.rstrip("\n").replace('\\\\', '\\') # Undo ocr_format.escape_markdown
+        stripped_line = line.strip()
+        heading_level = len(stripped_line) - len(stripped_line.lstrip("#"))
+        if not stripped_line or 1 <= heading_level <= 3 and stripped_line[heading_level:heading_level + 1] == " ":
+            if paragraph:
+                parts.append("<p>" + html.escape(" ".join(paragraph)) + "</p>")
+                paragraph = []
+            if stripped_line:
+                parts.append(f"<h{heading_level}>" + html.escape(stripped_line[heading_level + 1:]) + f"</h{heading_level}>")
+        else:
+            paragraph.append(stripped_line)
+    if paragraph:
+        parts.append("<p>" + html.escape(" ".join(paragraph)) + "</p>")
+    return "\n".join(parts)
+
+# Typesets the formatted Markdown as a plain text-only PDF.
+# Messages go to log. Returns (title, error_message) on failure, None on success.
+def write_reflowed_pdf(markdown_path, output_pdf_path, fitz_lock=None, log=print):
+    fitz_lock = fitz_lock or contextlib.nullcontext()
+    try:
+        with open(markdown_path, encoding="utf-8") as f_md:
+            body_html = markdown_to_html(f_md)
+        mediabox = fitz.paper_rect(REFLOW_PAGE_SIZE)
+        where = mediabox + (REFLOW_MARGIN_PT, REFLOW_MARGIN_PT, -REFLOW_MARGIN_PT, -REFLOW_MARGIN_PT)
+        with fitz_lock:
+            story = fitz.Story(html=body_html, user_css=REFLOW_CSS)
+            writer = fitz.DocumentWriter(output_pdf_path)
+            more = True
+            while more:
+                device = writer.begin_page(mediabox)
+                more, _ = story.place(where)
+                story.draw(device)
+                writer.end_page()
+            writer.close()
+    except Exception as e:
+        error_message = f"Reflowed PDF error ({os.path.basename(markdown_path)}): {e}"
+        log(error_message)
+        return ("Output Error", error_message)
+    log(f"Reflowed text PDF saved: {output_pdf_path}")
+    return None
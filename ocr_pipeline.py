@@ -0,0 +1,937 @@
+import os
+import json
+import subprocess # For Pandoc
+import functools
+import pytesseract
+import ocr_backends
+import ocr_cache
+import ocr_render
+import ocr_journal
+import ocr_format
+import ocr_output
+import ocr_latex
+import ocr_metrics
+import ocr_preprocess
+import ocr_prepass
+import ocr_osd
+import ocr_spool
+import fitz # PyMuPDF
+from PIL import Image
+import collections
+import multiprocessing # For parallel processing
+import multiprocessing.pool
+import multiprocessing.util
+import threading
+import time
+
+# This module holds the OCR -> heuristics -> Pandoc pipeline. It must not import the GUI stack:
+# pool workers re-import it (spawn start method) and the headless CLI runs it on servers without a display.
+
+TESSERACT_WINDOWS_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+DEFAULT_OCR_LANG = "eng+tur"
+DEFAULT_DPI = 300
+DEFAULT_RASTER_MODE = "gray"
+RASTER_MODES = ["gray", "mono", "rgb"]
+DEFAULT_MAXTASKSPERCHILD = 10
+DOCUMENT_CACHE_SIZE = 4 # Open fitz.Document handles kept per worker
+MAX_PAGE_CHUNK_SIZE = 16
+MAX_PREPASS_CHUNK_SIZE = 64 # Thumbnails are cheap, so pre-pass tasks are larger
+DEFAULT_RENDER_WORKERS = 2 # Concurrent Pandoc/output runs, separate from the OCR workers
+
+# Text layer checks (see classify_text_layer)
+MIN_TEXT_LAYER_CHARS = 100 # Non-whitespace characters a page needs before its text layer is trusted
+MIN_TEXT_LAYER_READABLE_RATIO = 0.85
+IMAGE_PAGE_TEXT_CHARS = 400 # Below this, a page mostly covered by images is treated as a scan
+TEXT_LAYER_PUNCTUATION = set(".,;:!?'\"()[]{}-\u2013\u2014/%&*+=<>@#$\u2018\u2019\u201c\u201d\u2022")
+
+DEFAULT_PANDOC_SETTINGS = {
+    "font_size": "11pt",
+    "margin": "0.7in",
+    "main_font": "Liberation Serif",
+    "pdf_engine": "xelatex",
+    "line_spacing": "1.0",
+    "precompiled_preamble": False, # See ocr_latex (pdflatex only)
+}
+
+# Probing Tesseract spawns a subprocess, so it is done once on first use instead of at import time
+@functools.lru_cache(maxsize=None)
+def is_tesseract_available():
+    # Specify the path to Tesseract if it's not in the system's PATH (may be needed for Windows)
+    try:
+        subprocess.run([pytesseract.pytesseract.tesseract_cmd, "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        print("Tesseract OCR found in PATH.")
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("Tesseract OCR not found in PATH. Attempting to set manually or add to PATH.")
+        if os.name == 'nt': # Only for Windows
+            if os.path.exists(TESSERACT_WINDOWS_PATH):
+                pytesseract.pytesseract.tesseract_cmd = TESSERACT_WINDOWS_PATH
+                print(f"Tesseract OCR path set to: {TESSERACT_WINDOWS_PATH}")
+                return True
+            print(f"Default Tesseract OCR path ({TESSERACT_WINDOWS_PATH}) not found.")
+        return False
+
+def default_process_count():
+    return max(1, os.cpu_count() or 1)
+
+# PyMuPDF is not thread-safe; in the thread executor every fitz call goes through this lock.
+# In worker processes it is uncontended.
+_FITZ_LOCK = threading.Lock()
+
+# Worker-local LRU of open documents, keyed by (path, mtime). Reopening a large scan for
+# every page reparses its whole xref table, which can cost more than rendering the page.
+_open_documents = collections.OrderedDict()
+_open_documents_finalizer = None
+
+def close_cached_documents():
+    while _open_documents:
+        _, doc = _open_documents.popitem(last=False)
+        try:
+            doc.close()
+        except Exception as e:
+            print(f"Could not close cached document: {e}")
+
+# Callers must hold _FITZ_LOCK
+def get_cached_document(pdf_path):
+    global _open_documents_finalizer
+    key = (pdf_path, os.path.getmtime(pdf_path))
+    doc = _open_documents.pop(key, None)
+    if doc is None:
+        for stale_key in [k for k in _open_documents if k[0] == pdf_path]:
+            _open_documents.pop(stale_key).close()
+        while len(_open_documents) >= DOCUMENT_CACHE_SIZE:
+            _, evicted_doc = _open_documents.popitem(last=False)
+            evicted_doc.close()
+        doc = fitz.open(pdf_path)
+    _open_documents[key] = doc
+    if _open_documents_finalizer is None:
+        # Pool workers leave through os._exit, so atexit would not run when maxtasksperchild recycles them
+        _open_documents_finalizer = multiprocessing.util.Finalize(None, close_cached_documents, exitpriority=10)
+    return doc
+
+# Consecutive pages are handed out as ranges so one worker handles a contiguous part of
+# the same file, reuses its cached document handle and OCRs the range in one backend call
+def page_task_chunksize(total_pages, num_workers):
+    return max(1, min(MAX_PAGE_CHUNK_SIZE, total_pages // (num_workers * 4)))
+
+# Wraps the pixmap's sample buffer as a PIL image (zero-copy for grayscale; PIL repacks RGB
+# to 4 bytes per pixel). The image is only valid while `pix` is alive. Format "PPM" makes
+# pytesseract hand Tesseract an uncompressed PGM/PPM file instead of re-encoding it as PNG.
+def pixmap_to_image(pix):
+    mode = "L" if pix.n == 1 else "RGB"
+    samples = getattr(pix, "samples_mv", None) or pix.samples
+    img = Image.frombuffer(mode, (pix.width, pix.height), samples, "raw", mode, pix.stride, 1)
+    img.format = "PPM"
+    return img
+
+# raster_mode: "gray" (default), "mono" (1-bit, thresholded) or "rgb" (full color render)
+def render_page_image(page, dpi, raster_mode=DEFAULT_RASTER_MODE, clip=None):
+    colorspace = fitz.csRGB if raster_mode == "rgb" else fitz.csGRAY
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False, clip=clip)
+    img = pixmap_to_image(pix)
+    if raster_mode == "mono":
+        img = img.convert("1", dither=Image.Dither.NONE)
+        img.format = "PPM" # Saved as PBM
+    return pix, img
+
+# Renders (page_num, dpi, clip) jobs one at a time for a backend; each image is released before
+# the next one is rendered. With a `stats` list, one {"render_ms", "preprocess_ms", "pixels"} record
+# is added per job. rotations ({page_num: clockwise degrees}, see ocr_osd) turns whole-page renders
+# upright, and with preprocess_steps (see ocr_preprocess) the image is cleaned up before OCR. The
+# geometry changes of each job are appended to `transforms` as a list, in the order applied.
+def iter_rendered_pages(pdf_path, render_jobs, raster_mode=DEFAULT_RASTER_MODE, stats=None, preprocess_steps=None, transforms=None, rotations=None):
+    for page_num, dpi, clip in render_jobs:
+        start = time.perf_counter()
+        with _FITZ_LOCK:
+            doc = get_cached_document(pdf_path)
+            page = doc.load_page(page_num)
+            pix, img = render_page_image(page, dpi, raster_mode, clip)
+        job_transforms = []
+        rotate = (rotations or {}).get(page_num, 0) if clip is None else 0
+        if rotate:
+            try:
+                rotated_img = img.rotate(-rotate, expand=True)
+            finally:
+                img.close()
+                del img, pix
+            pix, img = None, rotated_img
+            img.format = "PPM"
+            job_transforms.append({"angle": -rotate, "size": rotated_img.size[::-1] if rotate % 180 else rotated_img.size,
+                                   "rotated_size": rotated_img.size, "offset": (0, 0)})
+        render_ms = ocr_metrics.elapsed_ms(start)
+        pixels = img.width * img.height
+        start = time.perf_counter()
+        if preprocess_steps:
+            # The processed image owns its pixels, so the render can go before OCR starts
+            try:
+                processed_img, transform = ocr_preprocess.preprocess_image(img, preprocess_steps, dpi)
+            finally:
+                img.close()
+                del img, pix
+            pix, img = None, processed_img
+            if transform:
+                job_transforms.append(transform)
+        if transforms is not None:
+            transforms.append(job_transforms)
+        if stats is not None:
+            stats.append({"render_ms": render_ms, "preprocess_ms": ocr_metrics.elapsed_ms(start), "pixels": pixels})
+        try:
+            yield img
+        finally:
+            # The image borrows the pixmap's buffer, so it has to go first
+            img.close()
+            del img, pix
+
+# Per-page metadata returned next to the text. source: "ocr", "cache" or "text-layer".
+# With ocr_options["word_boxes"], OCR'd and cached pages also carry "words" (see ocr_render.page_words_from_tiles).
+# Failed pages carry "error_message"; every page returned by the worker carries "metrics" (see ocr_metrics).
+def make_page_info(source, error=False, text_layer=None, **extra):
+    return dict({"source": source, "cache_hit": source == "cache", "error": error, "text_layer": text_layer}, **extra)
+
+# A text layer is used instead of OCR when it has enough characters, most of them are
+# letters/digits/punctuation (not mis-mapped glyphs), and it is not just a caption on a scan
+def classify_text_layer(page):
+    text = page.get_text("text")
+    stripped = "".join(text.split())
+    if len(stripped) < MIN_TEXT_LAYER_CHARS:
+        return ("none" if not stripped else "sparse"), text
+    readable = sum(1 for char in stripped if char.isalnum() or char in TEXT_LAYER_PUNCTUATION)
+    if readable < len(stripped) * MIN_TEXT_LAYER_READABLE_RATIO:
+        return "garbage", text
+    if len(stripped) < IMAGE_PAGE_TEXT_CHARS:
+        page_area = abs(page.rect) or 1
+        image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+        if image_area > page_area * 0.5:
+            return "image", text
+    return "text", text
+
+# Splits the range into pages whose own text layer is usable and pages that need OCR
+def _extract_text_layer_pages(pdf_path, page_nums, ocr_options):
+    if ocr_options.get("force_ocr"):
+        return [], list(page_nums), {}
+    try:
+        with _FITZ_LOCK:
+            doc = get_cached_document(pdf_path)
+            layers = [(page_num,) + classify_text_layer(doc.load_page(page_num)) for page_num in page_nums]
+    except Exception as e:
+        print(f"Text layer check failed ({os.path.basename(pdf_path)}): {e}")
+        return [], list(page_nums), {}
+    results, pages_to_ocr, classifications = [], [], {}
+    for page_num, classification, text in layers:
+        if classification == "text":
+            results.append((page_num, text + ocr_backends.PAGE_SEPARATOR, make_page_info("text-layer", text_layer=classification)))
+        else:
+            pages_to_ocr.append(page_num)
+            classifications[page_num] = classification
+    return results, pages_to_ocr, classifications
+
+# retries: how many times these pages have already failed as part of a larger range
+def _ocr_pages(pdf_path, page_nums, ocr_lang, dpi, ocr_options, retries=0):
+    raster_mode = ocr_options.get("raster_mode", DEFAULT_RASTER_MODE)
+    psm = ocr_options.get("psm", ocr_backends.DEFAULT_PSM)
+    with_words = ocr_options.get("word_boxes", False)
+    page_metrics = {page_num: dict(ocr_metrics.new_page_metrics(), retries=retries) for page_num in page_nums}
+    try:
+        backend = ocr_backends.get_ocr_backend(ocr_options.get("backend", ocr_backends.DEFAULT_OCR_BACKEND))
+        render_plans = []
+        for page_num in page_nums:
+            start = time.perf_counter()
+            with _FITZ_LOCK:
+                doc = get_cached_document(pdf_path)
+                render_plans.append(ocr_render.plan_page_render(doc.load_page(page_num), dpi, ocr_options))
+            page_metrics[page_num]["render_ms"] += ocr_metrics.elapsed_ms(start)
+        render_jobs = [(page_num, page_dpi, clip) for page_num, (page_dpi, clips, cols) in zip(page_nums, render_plans) for clip in clips]
+        page_osd = _detect_page_osd(pdf_path, page_nums, render_plans, ocr_lang, ocr_options, page_metrics) if ocr_options.get("osd") else {}
+        rotations = {page_num: osd["rotate"] for page_num, osd in page_osd.items()}
+
+        # One engine call per language set; the results are put back in render_jobs order
+        lang_jobs = collections.defaultdict(list)
+        for job_index, job in enumerate(render_jobs):
+            lang_jobs[page_osd[job[0]]["lang"] if job[0] in page_osd else ocr_lang].append(job_index)
+        tile_texts, tile_words = [None] * len(render_jobs), [None] * len(render_jobs)
+        render_stats, engine_stats = [None] * len(render_jobs), [None] * len(render_jobs)
+        for lang, job_indexes in lang_jobs.items():
+            group_render_stats, group_engine_stats, transforms = [], [], []
+            rendered_pages = iter_rendered_pages(pdf_path, [render_jobs[index] for index in job_indexes], raster_mode,
+                                                 group_render_stats, ocr_options.get("preprocess"), transforms, rotations)
+            if with_words:
+                group_results = backend.recognize_pages_with_words(rendered_pages, lang, psm, stats=group_engine_stats)
+            else:
+                group_results = [(text, None) for text in backend.recognize_pages(rendered_pages, lang, psm, stats=group_engine_stats)]
+            for index, (text, words), job_transforms, job_render_stats, job_engine_stats in zip(job_indexes, group_results, transforms, group_render_stats, group_engine_stats):
+                # Undo the geometry changes in reverse order
+                for transform in reversed(job_transforms if with_words else []):
+                    words = ocr_preprocess.map_words_to_render(words, transform)
+                tile_texts[index], tile_words[index] = text, words
+                render_stats[index], engine_stats[index] = job_render_stats, job_engine_stats
+        for (page_num, page_dpi, clip), tile_render_stats, tile_engine_stats in zip(render_jobs, render_stats, engine_stats):
+            metrics = page_metrics[page_num]
+            for stats in (tile_render_stats, tile_engine_stats):
+                for key, value in stats.items():
+                    metrics[key] += value
+
+        results, tile_index = [], 0
+        for page_num, (page_dpi, clips, cols) in zip(page_nums, render_plans):
+            page_tile_texts = tile_texts[tile_index:tile_index + len(clips)]
+            if len(clips) > 1:
+                page_text = ocr_render.stitch_tile_texts(page_tile_texts, cols, ocr_backends.PAGE_SEPARATOR)
+            else:
+                page_text = page_tile_texts[0]
+            page_info = make_page_info("ocr", dpi=page_dpi, tiles=len(clips), metrics=page_metrics[page_num])
+            if page_num in page_osd:
+                page_info["osd"] = page_osd[page_num]
+            if with_words:
+                page_info["words"] = ocr_render.page_words_from_tiles(tile_words[tile_index:tile_index + len(clips)], clips, page_dpi)
+            tile_index += len(clips)
+            results.append((page_num, page_text, page_info))
+        return results
+    except pytesseract.TesseractNotFoundError:
+        print(f"TESSERACT NOT FOUND IN WORKER PROCESS: Pages {page_nums[0]+1}-{page_nums[-1]+1}, File: {os.path.basename(pdf_path)}. Command Path: {getattr(pytesseract.pytesseract, 'tesseract_cmd', 'Not Set')}")
+        return [(page_num, f"[Tesseract Not Found Error for Page {page_num+1}]",
+                 make_page_info("ocr", error=True, error_message="Tesseract not found", metrics=page_metrics[page_num])) for page_num in page_nums]
+    except Exception as e:
+        if len(page_nums) > 1:
+            # Retry page by page so one bad page does not take the whole range down with it
+            print(f"OCR Error (Worker): Pages {page_nums[0]+1}-{page_nums[-1]+1}, File: {os.path.basename(pdf_path)}: {e}. Retrying page by page.")
+            return [result for page_num in page_nums for result in _ocr_pages(pdf_path, [page_num], ocr_lang, dpi, ocr_options, retries + 1)]
+        print(f"OCR Error (Worker): Page {page_nums[0]+1}, File: {os.path.basename(pdf_path)}: {e}")
+        return [(page_nums[0], f"[OCR Error for Page {page_nums[0]+1}: {str(e)}]",
+                 make_page_info("ocr", error=True, error_message=str(e), metrics=page_metrics[page_nums[0]]))]
+
+# Orientation and script of each page (see ocr_osd), detected on a whole-page render of at most
+# OSD_MAX_DPI. Returns {page_num: {"rotate", "lang", "script", "orientation_conf", "script_conf"}};
+# rotate is only set for pages OCR'd in one piece.
+def _detect_page_osd(pdf_path, page_nums, render_plans, ocr_lang, ocr_options, page_metrics):
+    page_osd = {}
+    for page_num, (page_dpi, clips, cols) in zip(page_nums, render_plans):
+        start = time.perf_counter()
+        with _FITZ_LOCK:
+            page = get_cached_document(pdf_path).load_page(page_num)
+            # OSD needs the whole page at once, so tiled pages are detected at a lower DPI instead
+            osd_dpi = ocr_render.fit_dpi_to_pixels(page.rect, min(page_dpi, ocr_osd.OSD_MAX_DPI), ocr_render.max_page_pixels(ocr_options))
+            pix, img = render_page_image(page, osd_dpi)
+        try:
+            detection = ocr_osd.detect_orientation_script(img)
+        finally:
+            img.close()
+            del img, pix
+        rotate, lang = ocr_osd.page_decision(detection, ocr_lang)
+        page_osd[page_num] = {"rotate": rotate if len(clips) == 1 else 0, "lang": lang,
+                              "script": detection["script"] if detection else None,
+                              "orientation_conf": round(detection["orientation_conf"], 2) if detection else None,
+                              "script_conf": round(detection["script_conf"], 2) if detection else None}
+        page_metrics[page_num]["osd_ms"] += ocr_metrics.elapsed_ms(start)
+    return page_osd
+
+# Looks the pages up in the OCR result cache. Returns (cache, {page_num: key}, {page_num: (text, words)}).
+# When word boxes are needed, entries stored without them count as misses.
+def _lookup_cached_pages(pdf_path, page_nums, ocr_lang, dpi, ocr_options):
+    cache_dir = ocr_options.get("cache_dir")
+    if not cache_dir:
+        return None, {}, {}
+    try:
+        cache = ocr_cache.get_ocr_cache(cache_dir, ocr_options.get("cache_max_bytes", ocr_cache.DEFAULT_CACHE_MAX_BYTES))
+        raster_mode = ocr_options.get("raster_mode", DEFAULT_RASTER_MODE)
+        psm = ocr_options.get("psm", ocr_backends.DEFAULT_PSM)
+        render_policy = ocr_render.render_policy_key(ocr_options)
+        engine = ocr_backends.engine_id(ocr_backends.get_ocr_backend(ocr_options.get("backend", ocr_backends.DEFAULT_OCR_BACKEND)))
+        cache_keys = {}
+        with _FITZ_LOCK:
+            doc = get_cached_document(pdf_path)
+            for page_num in page_nums:
+                content_hash = ocr_cache.page_content_hash(doc, doc.load_page(page_num))
+                cache_keys[page_num] = ocr_cache.ocr_cache_key(content_hash, ocr_lang, dpi, psm, raster_mode, render_policy, engine)
+        found = cache.get_many(list(cache_keys.values()))
+        if ocr_options.get("word_boxes"):
+            found = {key: entry for key, entry in found.items() if entry[1] is not None}
+        return cache, cache_keys, {page_num: found[key] for page_num, key in cache_keys.items() if key in found}
+    except Exception as e:
+        print(f"OCR cache unavailable ({os.path.basename(pdf_path)}): {e}")
+        return None, {}, {}
+
+# OCR function to be executed by worker processes. Handles a range of pages of one file so
+# backends can amortize process start-up and model loading over several pages.
+# Returns a list of (page_num, page_text, formatted_text, page_info); pages are formatted for
+# Pandoc here so the heuristics run in parallel with the rest of the batch.
+def ocr_page_range_worker_function(args_tuple):
+    pdf_path, page_nums, ocr_lang, dpi, tesseract_cmd_path_from_main = args_tuple[:5]
+    ocr_options = args_tuple[5] if len(args_tuple) > 5 else {}
+
+    if tesseract_cmd_path_from_main:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd_path_from_main
+
+    results, pages_needing_ocr, classifications = _extract_text_layer_pages(pdf_path, page_nums, ocr_options)
+
+    cache, cache_keys, cached_pages = _lookup_cached_pages(pdf_path, pages_needing_ocr, ocr_lang, dpi, ocr_options)
+    for page_num in pages_needing_ocr:
+        if page_num in cached_pages:
+            page_text, words = cached_pages[page_num]
+            page_info = make_page_info("cache")
+            if ocr_options.get("word_boxes"):
+                page_info["words"] = json.loads(words)
+            results.append((page_num, page_text, page_info))
+
+    pages_to_ocr = [page_num for page_num in pages_needing_ocr if page_num not in cached_pages]
+    if pages_to_ocr:
+        ocr_results = _ocr_pages(pdf_path, pages_to_ocr, ocr_lang, dpi, ocr_options)
+        results.extend(ocr_results)
+        if cache is not None:
+            try:
+                cache.put_many([(cache_keys[page_num], page_text, json.dumps(page_info["words"]) if "words" in page_info else None)
+                                for page_num, page_text, page_info in ocr_results if not page_info["error"]])
+            except Exception as e:
+                print(f"Could not store OCR results in cache ({os.path.basename(pdf_path)}): {e}")
+
+    formatted_results = []
+    for page_num, page_text, page_info in results:
+        if page_info["text_layer"] is None:
+            page_info["text_layer"] = classifications.get(page_num, "unchecked")
+        metrics = page_info.setdefault("metrics", ocr_metrics.new_page_metrics())
+        start = time.perf_counter()
+        formatted_results.append((page_num, page_text, ocr_format.format_page_text(page_text), page_info))
+        metrics["format_ms"] = ocr_metrics.elapsed_ms(start)
+    return formatted_results
+
+# Single-page OCR. Returns (page_num, page_text).
+def ocr_page_worker_function(args_tuple):
+    pdf_path, page_num = args_tuple[:2]
+    return ocr_page_range_worker_function((pdf_path, [page_num]) + tuple(args_tuple[2:]))[0][:2]
+
+# Thumbnail pre-pass over a page range (see ocr_prepass). Pages whose own text layer will be used
+# are not checked. Returns [(page_num, text_layer_classification, signature or None)].
+def prepass_page_range_worker_function(args_tuple):
+    pdf_path, page_nums, force_ocr = args_tuple
+    results = []
+    for page_num in page_nums:
+        try:
+            with _FITZ_LOCK:
+                page = get_cached_document(pdf_path).load_page(page_num)
+                classification, text = classify_text_layer(page)
+                signature = None if classification == "text" and not force_ocr else ocr_prepass.page_signature(page, text)
+        except Exception as e:
+            print(f"Pre-pass error (Worker): Page {page_num+1}, File: {os.path.basename(pdf_path)}: {e}")
+            classification, signature = "unchecked", None
+        results.append((page_num, classification, signature))
+    return results
+
+# Pre-pass duplicate confirmation: pairs is [(page_num, candidate page_num), ...] of one file.
+# Returns [((page_num, candidate), mismatch)]; pairs that could not be compared are left out.
+def prepass_confirm_worker_function(args_tuple):
+    pdf_path, pairs = args_tuple
+    images = {}
+    results = []
+    for pair in pairs:
+        try:
+            for page_num in pair:
+                if page_num not in images:
+                    with _FITZ_LOCK:
+                        images[page_num] = ocr_prepass.confirmation_image(get_cached_document(pdf_path).load_page(page_num))
+            results.append((pair, ocr_prepass.page_mismatch(images[pair[0]], images[pair[1]])))
+        except Exception as e:
+            print(f"Pre-pass error (Worker): Pages {pair[0]+1}/{pair[1]+1}, File: {os.path.basename(pdf_path)}: {e}")
+    return results
+
+def resolve_pandoc_settings(font_size=None, margin=None, main_font=None, pdf_engine=None, line_spacing=None, precompiled_preamble=False):
+    settings = dict(DEFAULT_PANDOC_SETTINGS)
+    settings["precompiled_preamble"] = bool(precompiled_preamble)
+    if font_size: settings["font_size"] = font_size
+    if main_font: settings["main_font"] = main_font
+    if pdf_engine: settings["pdf_engine"] = pdf_engine
+
+    margin = (margin or "").strip()
+    if margin: settings["margin"] = margin
+
+    line_spacing = (line_spacing or "").strip()
+    if line_spacing:
+        try:
+            float_val = float(line_spacing)
+            if float_val <= 0:
+                print(f"Invalid line spacing: '{line_spacing}'. Using default '1.0'.")
+            else:
+                settings["line_spacing"] = line_spacing
+        except ValueError:
+            print(f"Invalid line spacing format: '{line_spacing}'. Using default '1.0'.")
+    return settings
+
+def build_pandoc_command(output_pdf_path, pandoc_settings, input_path=None):
+    pdf_engine = pandoc_settings["pdf_engine"]
+    pandoc_command = [
+        'pandoc', '-s', f'--pdf-engine={pdf_engine}',
+        '-V', f'fontsize={pandoc_settings["font_size"]}', '-V', f'geometry:margin={pandoc_settings["margin"]}',
+        '-V', 'papersize=a4', '-V', f'linestretch={pandoc_settings["line_spacing"]}',
+        '-f', 'markdown', '-o', output_pdf_path,
+        '-V', 'documentclass=scrartcl'
+    ]
+    if pdf_engine in ["xelatex", "lualatex"]:
+        pandoc_command.extend(['-V', f'mainfont={pandoc_settings["main_font"]}', '-V', 'lang=en-US']) # Changed lang to en-US
+    elif pdf_engine == "pdflatex":
+        pandoc_command.extend(['-V', 'fontenc=T1', '-V', 'inputenc=utf8'])
+    if input_path:
+        pandoc_command.append(input_path)
+    return pandoc_command
+
+def _noop(*args, **kwargs):
+    pass
+
+def _is_cancelled(cancel_event):
+    return cancel_event is not None and cancel_event.is_set()
+
+def create_ocr_pool(num_processes, executor="process", spool_settings=None, cancel_event=None):
+    # Threads are enough when the heavy lifting happens in the tesseract subprocess;
+    # rendering is serialized by _FITZ_LOCK in that mode.
+    # "spool" hands the tasks to spool workers on other machines (ocr_spool); its imap_unordered
+    # waits on them and stops when cancel_event is set.
+    if executor == "spool":
+        return ocr_spool.SpoolPool(spool_settings["spool_dir"], spool_settings.get("lease_seconds", ocr_spool.DEFAULT_LEASE_SECONDS),
+                                   spool_settings.get("worker_timeout", ocr_spool.DEFAULT_WORKER_TIMEOUT), cancel_event)
+    if executor == "thread":
+        return multiprocessing.pool.ThreadPool(processes=num_processes)
+    return multiprocessing.Pool(processes=num_processes, maxtasksperchild=DEFAULT_MAXTASKSPERCHILD)
+
+# Routes page results back to their document when pages of several files share one pool.
+# Returns (doc_index, page_results, task_info) with the worker's id and busy time for ocr_metrics.
+def run_scheduled_page_task(task):
+    doc_index, range_args = task
+    profile_dir = range_args[5].get("profile_dir") if len(range_args) > 5 else None
+    start = time.perf_counter()
+    page_results = ocr_metrics.run_profiled(profile_dir, ocr_page_range_worker_function, range_args)
+    return doc_index, page_results, {"worker": ocr_metrics.worker_id(), "busy_ms": ocr_metrics.elapsed_ms(start)}
+
+def run_prepass_task(task):
+    doc_index, range_args = task
+    return doc_index, prepass_page_range_worker_function(range_args)
+
+def run_prepass_confirm_task(task):
+    doc_index, range_args = task
+    return doc_index, prepass_confirm_worker_function(range_args)
+
+# Runs the thumbnail pre-pass over the pages still to OCR on the OCR pool and writes each
+# document's skipped pages report. Blank pages are completed right away; duplicates are taken out
+# of missing_pages and completed when their first occurrence comes back (_duplicate_page_results).
+# Returns (number of blank pages, documents that have no pages left to OCR), counting only the
+# documents handled before a cancel.
+def _run_prepass(pool, documents, prepass_settings, ocr_options, target_directory, num_processes, metrics, status_callback, cancel_event=None):
+    pages_to_check = sum(len(doc["missing_pages"]) for doc in documents)
+    status_callback(f"Pre-pass: checking {pages_to_check} pages for blank and duplicate pages")
+    start_time = time.monotonic()
+    chunksize = max(1, min(MAX_PREPASS_CHUNK_SIZE, pages_to_check // (num_processes * 4)))
+    prepass_tasks = [
+        (doc_index, (doc["pdf_path"], doc["missing_pages"][start:start + chunksize], ocr_options.get("force_ocr", False)))
+        for doc_index, doc in enumerate(documents)
+        for start in range(0, len(doc["missing_pages"]), chunksize)
+    ]
+    page_checks = collections.defaultdict(dict) # doc_index -> {page_num: (classification, signature)}
+    for doc_index, results in pool.imap_unordered(run_prepass_task, prepass_tasks):
+        if _is_cancelled(cancel_event):
+            return 0, []
+        for page_num, classification, signature in results:
+            if signature is not None:
+                page_checks[doc_index][page_num] = (classification, signature)
+
+    skipped_counts = collections.Counter()
+    completed_documents = []
+    for doc_index, checks in sorted(page_checks.items()):
+        doc = documents[doc_index]
+        def measure_mismatches(pairs):
+            pair_chunksize = max(1, min(MAX_PREPASS_CHUNK_SIZE, len(pairs) // (num_processes * 4)))
+            confirm_tasks = [(doc_index, (doc["pdf_path"], pairs[start:start + pair_chunksize])) for start in range(0, len(pairs), pair_chunksize)]
+            return {pair: mismatch for _, results in pool.imap_unordered(run_prepass_confirm_task, confirm_tasks) for pair, mismatch in results}
+        skipped = ocr_prepass.find_skippable_pages({page_num: signature for page_num, (classification, signature) in checks.items()}, prepass_settings, measure_mismatches)
+        if _is_cancelled(cancel_event):
+            break # Documents handled so far keep their blank pages
+        ocr_prepass.write_skipped_report(doc["pdf_path"], target_directory, skipped)
+        blank_results = []
+        for page_num, (reason, ink_ratio, duplicate_of, mismatch) in sorted(skipped.items()):
+            skipped_counts[reason] += 1
+            if reason == "blank":
+                page_info = make_page_info("blank", text_layer=checks[page_num][0], ink_ratio=round(ink_ratio, 5))
+                blank_text = ocr_backends.PAGE_SEPARATOR
+                blank_results.append((page_num, blank_text, ocr_format.format_page_text(blank_text), page_info))
+                doc["page_info"][page_num] = page_info
+                doc["remaining"] -= 1
+            else:
+                doc["duplicates"].setdefault(duplicate_of, []).append(page_num)
+        doc["missing_pages"] = [page_num for page_num in doc["missing_pages"] if page_num not in skipped]
+        if blank_results:
+            doc["writer"].add_pages(blank_results)
+        if doc["remaining"] == 0:
+            completed_documents.append(doc)
+    elapsed = time.monotonic() - start_time
+    metrics.record_prepass(pages_to_check, skipped_counts, elapsed)
+    print(f"Pre-pass: {pages_to_check} pages checked in {elapsed:.1f}s, {skipped_counts['blank']} blank, {skipped_counts['duplicate']} duplicate")
+    return skipped_counts["blank"], completed_documents
+
+# Results for the pages found to be duplicates of page_num, built from its result
+def _duplicate_page_results(doc, page_num, page_text, formatted_text, page_info):
+    results = []
+    for duplicate_page in doc["duplicates"].pop(page_num, []):
+        duplicate_info = dict(page_info, source="duplicate", cache_hit=False, duplicate_of=page_num + 1)
+        duplicate_info.pop("metrics", None)
+        results.append((duplicate_page, page_text, formatted_text, duplicate_info))
+    return results
+
+def write_error_text(target_directory, pdf_path, raw_ocr_text):
+    base_name_no_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+    output_txt_path_error = os.path.join(target_directory, f"{base_name_no_ext}_ocr.txt")
+    try:
+        with open(output_txt_path_error, "w", encoding="utf-8") as f_txt_err:
+            f_txt_err.write(raw_ocr_text)
+        print(f"Text output for failed file: {output_txt_path_error}")
+    except Exception as e_write_txt_error:
+        print(f"Could not write TXT for failed file: {e_write_txt_error}")
+
+# Runs Pandoc on one document's formatted Markdown. Pandoc reads the file itself, so the
+# document text is never held in memory here.
+# Returns (title, error_message) on failure, None on success.
+def run_pandoc(pdf_path, markdown_path, target_directory, pandoc_settings, status_callback=print, log=print):
+    current_file_basename = os.path.basename(pdf_path)
+    base_name_no_ext = os.path.splitext(current_file_basename)[0]
+
+    output_pdf_path = os.path.join(target_directory, f"{base_name_no_ext}_ocr.pdf")
+    if pandoc_settings.get("precompiled_preamble") and pandoc_settings["pdf_engine"] in ocr_latex.FORMAT_ENGINES:
+        try:
+            ocr_latex.run_pandoc_with_preamble_format(
+                lambda tex_path: build_pandoc_command(tex_path, pandoc_settings, markdown_path), markdown_path,
+                output_pdf_path, pandoc_settings["pdf_engine"], ocr_latex.default_format_directory(), log)
+            log(f"PDF successfully converted (precompiled preamble): {output_pdf_path}")
+            return None
+        except Exception as e:
+            log(f"Precompiled preamble not usable for {current_file_basename}, running Pandoc normally: {e}")
+    pandoc_command = build_pandoc_command(output_pdf_path, pandoc_settings, markdown_path)
+
+    log(f"Executing Pandoc command: {' '.join(pandoc_command)}")
+    process = subprocess.Popen(pandoc_command, stdin=subprocess.DEVNULL, text=True, encoding='utf-8',
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+
+    if process.returncode != 0:
+        error_message = f"Pandoc error ({current_file_basename}):\n{stderr.strip()}\n\nStdout:\n{stdout.strip()}"
+        log(error_message)
+        status_callback(f"Pandoc error: {current_file_basename}")
+        return ("Pandoc Error", error_message)
+
+    log(f"PDF successfully converted: {output_pdf_path}")
+    if stderr.strip(): log(f"Pandoc warnings:\n{stderr.strip()}")
+    return None
+
+# Per-page report of where each page's text came from (<name>_ocr_report.tsv)
+def write_page_report(doc, target_directory):
+    base_name_no_ext = os.path.splitext(os.path.basename(doc["pdf_path"]))[0]
+    report_path = os.path.join(target_directory, f"{base_name_no_ext}_ocr_report.tsv")
+    try:
+        with open(report_path, "w", encoding="utf-8") as f_report:
+            f_report.write("page\tsource\ttext_layer\tdpi\ttiles\terror\trotate\tlang\n")
+            for page_num, page_info in enumerate(doc["page_info"]):
+                page_info = page_info or make_page_info("missing", error=True)
+                f_report.write(f"{page_num + 1}\t{page_info['source']}\t{page_info['text_layer']}\t{page_info.get('dpi', '')}\t{page_info.get('tiles', '')}\t{int(page_info['error'])}\t{page_info.get('osd', {}).get('rotate', '')}\t{page_info.get('osd', {}).get('lang', '')}\n")
+        print(f"Page report saved: {report_path}")
+    except Exception as e_report:
+        print(f"Could not write page report ({report_path}): {e_report}")
+
+# Produces the output PDF(s) of one document with the selected engine. Messages go to log, so a
+# render thread can hand them to the driving thread instead of printing over its output.
+# Returns ((title, error_message) or None, seconds spent).
+def write_output_pdfs(doc, markdown_path, target_directory, output_settings, log=print):
+    pdf_path = doc["pdf_path"]
+    output_pdf_path = os.path.join(target_directory, f"{os.path.splitext(os.path.basename(pdf_path))[0]}_ocr.pdf")
+    start_time = time.monotonic()
+    try:
+        if output_settings["engine"] == "pymupdf":
+            if doc["total_pages"]:
+                error = ocr_output.write_searchable_pdf(pdf_path, doc["writer"].journal_path, output_pdf_path, _FITZ_LOCK, log)
+            else:
+                error = ocr_output.write_reflowed_pdf(markdown_path, output_pdf_path, _FITZ_LOCK, log)
+        else:
+            error = run_pandoc(pdf_path, markdown_path, target_directory, output_settings["pandoc"], log, log)
+        if error is None and output_settings.get("reflow_pdf"):
+            error = ocr_output.write_reflowed_pdf(markdown_path, ocr_output.reflowed_pdf_path(pdf_path, target_directory), _FITZ_LOCK, log)
+    except Exception as e_output:
+        error_message = f"Output error ({os.path.basename(pdf_path)}): {e_output}"
+        log(error_message)
+        error = ("Output Error", error_message)
+    return error, time.monotonic() - start_time
+
+# Writes the page report and closes the text outputs. Returns the Markdown path for the output stage.
+def _prepare_document_output(doc, target_directory):
+    pdf_path = doc["pdf_path"]
+    if doc["total_pages"] == 0:
+        raw_ocr_text = "[Document is empty or contains no pages]\n\n"
+        write_error_text(target_directory, pdf_path, raw_ocr_text)
+        markdown_path = ocr_journal.output_paths(pdf_path, target_directory)[1]
+        with open(markdown_path, "w", encoding="utf-8") as f_md:
+            f_md.write(ocr_format.escape_markdown(ocr_format.format_text_with_heuristics(raw_ocr_text)))
+        return markdown_path
+    write_page_report(doc, target_directory)
+    doc["page_info"] = None
+    writer = doc["writer"]
+    if writer.close():
+        print(f"Text output saved: {writer.txt_path}")
+    else:
+        print(f"Warning: Text output is missing pages ({writer.txt_path})")
+    return writer.markdown_path
+
+# Runs the output stage (Pandoc/LaTeX or PyMuPDF) of finished documents on its own bounded
+# thread pool, so the OCR pool carries on with the next files while earlier ones are typeset.
+# Results are collected on the thread that drives convert_files, which is also where failures
+# are recorded and error_callback is called.
+class OutputRenderQueue:
+    def __init__(self, render_workers, target_directory, output_settings, status_callback, error_callback, failures, metrics):
+        self.pool = multiprocessing.pool.ThreadPool(processes=max(1, render_workers))
+        self.target_directory = target_directory
+        self.output_settings = output_settings
+        self.status_callback = status_callback
+        self.error_callback = error_callback
+        self.failures = failures
+        self.metrics = metrics
+        self.pending = [] # (doc, AsyncResult, messages of the render thread)
+        self.timing = collections.Counter()
+
+    def submit(self, doc):
+        try:
+            markdown_path = _prepare_document_output(doc, self.target_directory)
+        except Exception as e_file:
+            error_message_general = f"General error while processing file ({os.path.basename(doc['pdf_path'])}): {e_file}"
+            print(error_message_general)
+            import traceback
+            traceback.print_exc()
+            self.status_callback(f"Error: {os.path.basename(doc['pdf_path'])}")
+            self.metrics.record_failure(doc["pdf_path"], error_message_general)
+            self._record(doc, ("Processing Error", error_message_general))
+            return
+        self.status_callback(f"Rendering: {os.path.basename(doc['pdf_path'])}")
+        messages = []
+        result = self.pool.apply_async(write_output_pdfs, (doc, markdown_path, self.target_directory, self.output_settings, messages.append))
+        self.pending.append((doc, result, messages))
+
+    # Records the documents whose output stage has finished; with wait=True, waits for all of them
+    def collect(self, wait=False):
+        still_pending = []
+        for doc, result, messages in self.pending:
+            if not wait and not result.ready():
+                still_pending.append((doc, result, messages))
+                continue
+            error, elapsed = result.get()
+            for message in messages:
+                print(message)
+            self.timing["pages"] += doc["total_pages"]
+            self.timing["seconds"] += elapsed
+            self.metrics.record_output(doc["pdf_path"], doc["total_pages"], elapsed, error)
+            self._record(doc, error)
+        self.pending = still_pending
+
+    def _record(self, doc, error):
+        if error is None and doc["total_pages"]:
+            # Keep the journal after an output failure so a rerun does not need to OCR again
+            doc["writer"].remove_journal()
+        if error:
+            self.failures.append((doc["pdf_path"], error[1]))
+            self.error_callback(*error)
+
+    def close(self):
+        try:
+            self.collect(wait=True)
+        finally:
+            self.pool.close()
+            self.pool.join()
+
+# Runs the whole OCR -> heuristics -> output pipeline over a batch of files.
+# All pages of all files go through one long-lived pool; each document is handed to the
+# output render queue (render_workers at a time) as soon as its last page comes back, while
+# the OCR pool keeps working on the next files.
+# Pages are streamed to the TXT output in order and journaled as they complete; with
+# resume=True, pages found in the journal of an interrupted run are not OCR'd again.
+# output_engine is "pandoc" (Markdown -> LaTeX -> PDF) or "pymupdf" (the original pages with an
+# invisible OCR text layer); reflow_pdf additionally writes a text-only PDF without LaTeX.
+# prepass_settings (ocr_prepass.resolve_prepass_settings) turns on the thumbnail pre-pass that skips
+# blank pages and reuses the text of duplicate pages.
+# With executor="spool", spool_settings ({"spool_dir", "lease_seconds", "worker_timeout"}) names the shared spool
+# directory that ocr_spool workers take the OCR tasks from; num_processes should then be the
+# number of workers, which only sets the task size.
+# metrics_dir receives a per-page JSONL trace and a Prometheus textfile summary (ocr_metrics);
+# profile_dir a cProfile profile of every OCR worker.
+# The callbacks let the GUI and the headless CLI report progress their own way (both use an
+# ocr_progress.ProgressChannel); progress_callback(pages_done, total_pages) counts the pages of the
+# whole batch. Messages of the render threads are printed when their document is collected.
+# error_callback(title, message) is called once per failed file on the calling thread.
+# Setting cancel_event stops the batch after the OCR task in hand: the pool is terminated,
+# documents already finished are still written, and the others keep their journals, so the same
+# call later continues where this one stopped.
+# Returns a list of (pdf_path, error_message) for files that failed.
+def convert_files(pdf_paths, target_directory, ocr_lang=DEFAULT_OCR_LANG, dpi=DEFAULT_DPI,
+                  num_processes=None, pandoc_settings=None, executor="process", ocr_options=None, resume=True,
+                  output_engine=ocr_output.DEFAULT_OUTPUT_ENGINE, reflow_pdf=False, render_workers=DEFAULT_RENDER_WORKERS,
+                  prepass_settings=None, spool_settings=None, metrics_dir=None, profile_dir=None, cancel_event=None,
+                  status_callback=print, progress_callback=_noop, error_callback=_noop):
+    pandoc_settings = pandoc_settings or resolve_pandoc_settings()
+    ocr_options = dict(ocr_options or {})
+    if output_engine == "pymupdf":
+        ocr_options["word_boxes"] = True
+    if profile_dir:
+        ocr_options["profile_dir"] = os.path.abspath(profile_dir)
+    if ocr_options.get("preprocess") and not ocr_preprocess.is_available():
+        print("NumPy is not installed; pages are OCR'd without preprocessing.")
+        ocr_options["preprocess"] = []
+    output_settings = {"engine": output_engine, "reflow_pdf": reflow_pdf, "pandoc": pandoc_settings}
+    failures = []
+
+    if output_engine == "pandoc":
+        print(f"Settings: Size={pandoc_settings['font_size']}, Font={pandoc_settings['main_font']}, Margin={pandoc_settings['margin']}, Engine={pandoc_settings['pdf_engine']}, Line Spacing={pandoc_settings['line_spacing']}")
+    else:
+        print(f"Output engine: {output_engine}{' + reflowed text PDF' if reflow_pdf else ''}")
+    if output_engine == "pandoc" and pandoc_settings.get("precompiled_preamble") and pandoc_settings["pdf_engine"] not in ocr_latex.FORMAT_ENGINES:
+        print(f"Precompiled preamble is only available for {', '.join(ocr_latex.FORMAT_ENGINES)}; {pandoc_settings['pdf_engine']} runs load the preamble as usual.")
+
+    is_tesseract_available()
+    tesseract_cmd_for_worker = getattr(pytesseract.pytesseract, 'tesseract_cmd', None)
+
+    num_processes = max(1, num_processes or default_process_count())
+    metrics = ocr_metrics.BatchMetrics(metrics_dir, num_processes, executor)
+    journal_key = ocr_journal.journal_settings_key(ocr_lang, dpi, ocr_options)
+    page_source_counts = collections.Counter()
+
+    # Page-count pre-pass so the scheduler knows every document's size up front
+    documents = []
+    for pdf_path in pdf_paths:
+        current_file_basename = os.path.basename(pdf_path)
+        try:
+            doc_meta = fitz.open(pdf_path)
+            total_pages = len(doc_meta)
+            doc_meta.close()
+            writer = ocr_journal.StreamingDocumentWriter(pdf_path, target_directory, total_pages, journal_key, resume) if total_pages else None
+        except Exception as e_meta:
+            print(f"Could not open PDF/read page count ({current_file_basename}): {e_meta}")
+            status_callback(f"Error (page count): {current_file_basename}")
+            failures.append((pdf_path, f"Could not open document or read page count: {e_meta}"))
+            metrics.record_failure(pdf_path, f"Could not open document or read page count: {e_meta}")
+            write_error_text(target_directory, pdf_path, f"[Could not open document or read page count: {e_meta}]\n\n")
+            continue
+        if total_pages == 0:
+            print(f"PDF ({current_file_basename}) is empty or has no pages.")
+        doc = {"pdf_path": pdf_path, "total_pages": total_pages, "writer": writer,
+               "page_info": [None] * total_pages, "missing_pages": [], "remaining": 0, "duplicates": {}}
+        if writer is not None:
+            for page_num, page_info in writer.recovered_page_info().items():
+                doc["page_info"][page_num] = page_info
+            page_source_counts["journal"] += len(writer.recovered)
+            metrics.record_resumed_pages(len(writer.recovered))
+            doc["missing_pages"] = writer.missing_pages()
+            doc["remaining"] = len(doc["missing_pages"])
+        documents.append(doc)
+
+    batch_total_pages = sum(doc["total_pages"] for doc in documents)
+    pages_processed_count = page_source_counts["journal"]
+
+    render_queue = OutputRenderQueue(render_workers, target_directory, output_settings, status_callback, error_callback, failures, metrics)
+    try:
+        for doc in documents:
+            if doc["remaining"] == 0:
+                render_queue.submit(doc)
+
+        pages_to_process = batch_total_pages - pages_processed_count
+        if pages_to_process:
+            status_callback(f"Starting OCR: {len(documents)} file(s) - {pages_to_process} pages")
+            progress_callback(pages_processed_count, batch_total_pages)
+            with create_ocr_pool(num_processes, executor, spool_settings, cancel_event) as pool:
+                if prepass_settings:
+                    blank_pages, completed_documents = _run_prepass(pool, documents, prepass_settings, ocr_options, target_directory,
+                                                                    num_processes, metrics, status_callback, cancel_event)
+                    page_source_counts["blank"] += blank_pages
+                    pages_processed_count += blank_pages
+                    progress_callback(pages_processed_count, batch_total_pages)
+                    for doc in completed_documents:
+                        render_queue.submit(doc)
+                    pages_to_process = sum(len(doc["missing_pages"]) for doc in documents)
+
+                chunksize = page_task_chunksize(pages_to_process, num_processes)
+                page_tasks = (
+                    (doc_index, (doc["pdf_path"], doc["missing_pages"][start:start + chunksize],
+                                 ocr_lang, dpi, tesseract_cmd_for_worker, ocr_options))
+                    for doc_index, doc in enumerate(documents)
+                    for start in range(0, len(doc["missing_pages"]), chunksize)
+                    if not _is_cancelled(cancel_event)
+                )
+
+                print(f"Using {num_processes} parallel {executor} workers for {pages_to_process} pages in {len(documents)} file(s), pages per task: {chunksize}, OCR backend: {ocr_options.get('backend', ocr_backends.DEFAULT_OCR_BACKEND)}, preprocessing: {'+'.join(ocr_options.get('preprocess') or []) or 'none'}")
+                start_time = time.monotonic()
+                for doc_index, page_results, task_info in pool.imap_unordered(run_scheduled_page_task, metrics.track_tasks(page_tasks)):
+                    if _is_cancelled(cancel_event):
+                        break # Leaving the with block terminates the workers
+                    doc = documents[doc_index]
+                    valid_results, page_metrics = [], []
+                    for page_num_result, page_text_result, formatted_text, page_info in page_results:
+                        # Duplicates found by the pre-pass complete together with their first occurrence
+                        completed = [(page_num_result, page_text_result, formatted_text, page_info)]
+                        completed += _duplicate_page_results(doc, page_num_result, page_text_result, formatted_text, page_info)
+                        for page_num, page_text, page_formatted_text, completed_info in completed:
+                            page_metrics.append((page_num, completed_info, completed_info.pop("metrics", None)))
+                            page_source_counts[completed_info["source"]] += 1
+                            if 0 <= page_num < doc["total_pages"]:
+                                valid_results.append((page_num, page_text, page_formatted_text, completed_info))
+                                doc["page_info"][page_num] = completed_info
+                            else:
+                                print(f"Warning: Invalid page number ({page_num}) returned from OCR result.")
+                            doc["remaining"] -= 1
+                            pages_processed_count += 1
+                    doc["writer"].add_pages(valid_results)
+                    metrics.record_task(doc["pdf_path"], task_info, page_metrics, len(render_queue.pending))
+
+                    current_file_basename = os.path.basename(doc["pdf_path"])
+                    status_callback(f"OCR: {current_file_basename} - Page {doc['total_pages'] - doc['remaining']}/{doc['total_pages']} (batch {pages_processed_count}/{batch_total_pages})")
+                    progress_callback(pages_processed_count, batch_total_pages)
+
+                    if doc["remaining"] == 0:
+                        render_queue.submit(doc)
+                    render_queue.collect()
+
+            if executor == "thread":
+                # Thread workers share this process's cache; release the handles with the pool
+                with _FITZ_LOCK:
+                    close_cached_documents()
+
+            if _is_cancelled(cancel_event):
+                for doc in documents:
+                    if doc["writer"] is not None and doc["remaining"] > 0:
+                        doc["writer"].abort()
+                print(f"Cancelled after {pages_processed_count} of {batch_total_pages} pages. Unfinished documents keep their journals; converting them again continues from there.")
+                status_callback("Cancelling: finishing documents that are already complete")
+
+            elapsed = time.monotonic() - start_time
+            if elapsed > 0 and pages_to_process and not _is_cancelled(cancel_event):
+                print(f"Processed {pages_to_process} pages in {elapsed:.1f}s ({pages_to_process / elapsed:.2f} pages/sec)")
+    finally:
+        try:
+            if render_queue.pending:
+                status_callback(f"Waiting for {len(render_queue.pending)} document(s) to finish rendering")
+            render_queue.close()
+            if render_queue.timing["seconds"] > 0:
+                timing = render_queue.timing
+                print(f"Output ({output_engine}, {render_workers} render worker(s)): {timing['pages']} pages in {timing['seconds']:.1f}s of render time ({timing['pages'] / timing['seconds']:.2f} pages/sec per worker)")
+        finally:
+            metrics.close() # Flushes and closes the trace even when the batch raised
+    if profile_dir:
+        try:
+            summary_path = ocr_metrics.write_profile_summary(ocr_options["profile_dir"])
+            if summary_path:
+                print(f"Worker profile summary: {summary_path}")
+        except Exception as e:
+            print(f"Could not summarize worker profiles: {e}")
+    print(f"Page sources: {page_source_counts['ocr']} OCR, {page_source_counts['cache']} cached, {page_source_counts['text-layer']} text layer, {page_source_counts['journal']} resumed"
+          + (f", {page_source_counts['blank']} blank, {page_source_counts['duplicate']} duplicate" if prepass_settings else ""))
+
+    if ocr_options.get("cache_dir"):
+        print(f"OCR cache: {page_source_counts['cache']} hit(s), {page_source_counts['ocr']} miss(es)")
+        try:
+            cache = ocr_cache.get_ocr_cache(ocr_options["cache_dir"], ocr_options.get("cache_max_bytes", ocr_cache.DEFAULT_CACHE_MAX_BYTES))
+            evicted = cache.evict()
+            entry_count, total_bytes = cache.total_size()
+            print(f"OCR cache: {entry_count} entries, {total_bytes / (1024 * 1024):.1f} MB, {evicted} evicted ({cache.db_path})")
+            cache.close()
+        except Exception as e:
+            print(f"OCR cache maintenance failed: {e}")
+
+    if _is_cancelled(cancel_event):
+        status_callback(f"Cancelled ({pages_processed_count}/{batch_total_pages} pages)")
+    else:
+        progress_callback(batch_total_pages, batch_total_pages)
+        status_callback("All files processed!")
+    return failures
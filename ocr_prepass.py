@@ -0,0 +1,186 @@
+import os
+import hashlib
+import fitz # PyMuPDF
+from PIL import Image
+
+# Thumbnail pre-pass. Before a document's pages are handed to the OCR workers, every page that
+# would be OCR'd is rendered at PREPASS_DPI and
+#
+#   blank pages     - (too little ink in the grayscale histogram) are not OCR'd at all
+#   duplicate pages - (the same content, pixel for pixel, as an earlier page of the document)
+#                     reuse the OCR text of that first occurrence
+#
+# Pages of one layout have nearly the same perceptual hash and row/column ink profiles whatever
+# their text says, so those only pick up to MAX_DUPLICATE_CANDIDATES candidate pages. Each
+# candidate is then confirmed on CONFIRM_DPI renders of both pages: after aligning them, no tile
+# of the page may differ in more than duplicate_threshold of its ink pixels. One changed word
+# fails that; so does a re-scan of the same sheet, whose noise cannot be told apart from a small
+# change, so re-scans are OCR'd again. Duplicate detection needs NumPy; without it only blank
+# pages are skipped.
+
+try:
+    import numpy # Optional dependency
+except ImportError:
+    numpy = None
+
+PREPASS_DPI = 36
+DEFAULT_BLANK_INK_RATIO = 0.002 # Pages with less ink than this share of their area are blank
+DEFAULT_DUPLICATE_THRESHOLD = 0.02 # Share of differing ink pixels allowed in any tile; 0 disables
+INK_LEVEL_DELTA = 48 # How much darker than the paper a thumbnail pixel must be to count as ink
+EDGE_MARGIN_RATIO = 0.05 # Scanner edges and punch holes are outside the measured area
+HASH_SIZE = 8 # 64-bit difference hash
+DUPLICATE_HASH_DISTANCE = 12
+PROFILE_SHIFT_PX = 4 # About 3 mm at 36 DPI
+CANDIDATE_PROFILE_DISTANCE = 0.15 # Ink profile difference relative to the pages' mean ink
+MAX_DUPLICATE_CANDIDATES = 3
+CONFIRM_DPI = 72
+CONFIRM_SHIFT_PX = 8
+CONFIRM_GRID = 8 # Tiles per side
+CONFIRM_PIXEL_DELTA = 64 # Gray levels two aligned pixels may differ by (compression noise)
+CONFIRM_MIN_TILE_INK = 20 # Tiles with fewer ink pixels in both pages are not compared
+
+def resolve_prepass_settings(blank_ink_ratio=None, duplicate_threshold=None):
+    return {"blank_ink_ratio": DEFAULT_BLANK_INK_RATIO if blank_ink_ratio is None else float(blank_ink_ratio),
+            "duplicate_threshold": DEFAULT_DUPLICATE_THRESHOLD if duplicate_threshold is None else float(duplicate_threshold)}
+
+def difference_hash(img):
+    small = img.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX).tobytes()
+    value = 0
+    for y in range(HASH_SIZE):
+        row = small[y * (HASH_SIZE + 1):(y + 1) * (HASH_SIZE + 1)]
+        for x in range(HASH_SIZE):
+            value = value << 1 | (row[x] > row[x + 1])
+    return value
+
+# Returns {"size", "ink_ratio", "hash", "rows", "cols", "text"} for one page; rows/cols are the
+# mean gray level of every thumbnail row/column (bytes, so the signature pickles cheaply), text
+# a digest of whatever text layer the page has (None without one)
+def page_signature(page, text_layer=""):
+    pix = page.get_pixmap(dpi=PREPASS_DPI, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    margin_x, margin_y = int(img.width * EDGE_MARGIN_RATIO), int(img.height * EDGE_MARGIN_RATIO)
+    inner = img.crop((margin_x, margin_y, img.width - margin_x, img.height - margin_y))
+    histogram = inner.histogram()
+    total = sum(histogram) or 1
+    # Paper is the median level: ink never covers half of a page
+    cumulative, paper = 0, 255
+    for level, count in enumerate(histogram):
+        cumulative += count
+        if cumulative * 2 >= total:
+            paper = level
+            break
+    ink = sum(histogram[:max(0, paper - INK_LEVEL_DELTA)])
+    return {"size": img.size, "ink_ratio": ink / total, "hash": difference_hash(img),
+            "rows": img.resize((1, img.height), Image.Resampling.BOX).tobytes(),
+            "cols": img.resize((img.width, 1), Image.Resampling.BOX).tobytes(),
+            "text": hashlib.sha1(" ".join(text_layer.split()).encode("utf-8")).hexdigest() if text_layer.strip() else None}
+
+def _profile_distance(profile, candidates):
+    # Mean absolute difference of the ink profiles at the best shift, relative to their mean ink;
+    # candidates is a (pages, length) array, the result one distance per candidate
+    best = numpy.full(len(candidates), numpy.inf)
+    length = len(profile)
+    for shift in range(-PROFILE_SHIFT_PX, PROFILE_SHIFT_PX + 1):
+        a = profile[max(0, shift):length + min(0, shift)]
+        b = candidates[:, max(0, -shift):length + min(0, -shift)]
+        best = numpy.minimum(best, numpy.abs(b - a).mean(axis=1))
+    mean_ink = (profile.mean() + candidates.mean(axis=1)) / 2
+    return best / numpy.maximum(mean_ink, 1e-6)
+
+# {page_num: [earlier pages, most similar first]} for the pages that may be duplicates
+def find_duplicate_candidates(signatures, skipped):
+    candidates = {}
+    earlier = {} # (size, text) -> ([page_num], [hash], [rows], [cols])
+    for page_num in sorted(signatures):
+        if page_num in skipped:
+            continue
+        signature = signatures[page_num]
+        # Profiles as ink (dark = high) so the relative distance is measured against the ink
+        rows = 255 - numpy.frombuffer(signature["rows"], dtype=numpy.uint8).astype(numpy.float32)
+        cols = 255 - numpy.frombuffer(signature["cols"], dtype=numpy.uint8).astype(numpy.float32)
+        page_nums, hashes, all_rows, all_cols = earlier.setdefault((signature["size"], signature["text"]), ([], [], [], []))
+        similar = [index for index, value in enumerate(hashes) if bin(value ^ signature["hash"]).count("1") <= DUPLICATE_HASH_DISTANCE]
+        if similar:
+            distances = numpy.maximum(_profile_distance(rows, numpy.stack([all_rows[index] for index in similar])),
+                                      _profile_distance(cols, numpy.stack([all_cols[index] for index in similar])))
+            order = [index for index in numpy.argsort(distances, kind="stable") if distances[index] <= CANDIDATE_PROFILE_DISTANCE]
+            if order:
+                candidates[page_num] = [page_nums[similar[index]] for index in order[:MAX_DUPLICATE_CANDIDATES]]
+        page_nums.append(page_num)
+        hashes.append(signature["hash"])
+        all_rows.append(rows)
+        all_cols.append(cols)
+    return candidates
+
+# Grayscale render the duplicate check compares (int16, so differences do not wrap)
+def confirmation_image(page):
+    pix = page.get_pixmap(dpi=CONFIRM_DPI, colorspace=fitz.csGRAY, alpha=False)
+    return numpy.frombuffer(pix.samples, dtype=numpy.uint8).reshape(pix.height, pix.width).astype(numpy.int16)
+
+def _best_shift(profile_a, profile_b):
+    length = len(profile_a)
+    shifts = range(-CONFIRM_SHIFT_PX, CONFIRM_SHIFT_PX + 1)
+    return min(shifts, key=lambda shift: numpy.abs(profile_a[max(0, shift):length + min(0, shift)]
+                                                   - profile_b[max(0, -shift):length + min(0, -shift)]).mean())
+
+# Largest share of differing ink pixels over the tiles of two confirmation images, after aligning
+# them by their row/column profiles; 0.0 for identical pages, 1.0 when they cannot be compared
+def page_mismatch(image_a, image_b):
+    if image_a.shape != image_b.shape:
+        return 1.0
+    dy = _best_shift(image_a.mean(axis=1), image_b.mean(axis=1))
+    dx = _best_shift(image_a.mean(axis=0), image_b.mean(axis=0))
+    height, width = image_a.shape
+    a = image_a[max(0, dy):height + min(0, dy), max(0, dx):width + min(0, dx)]
+    b = image_b[max(0, -dy):height + min(0, -dy), max(0, -dx):width + min(0, -dx)]
+    ink_level = numpy.median(a) - INK_LEVEL_DELTA
+    ink = (a < ink_level) | (b < ink_level)
+    differs = numpy.abs(a - b) > CONFIRM_PIXEL_DELTA
+    tile_height, tile_width = a.shape[0] // CONFIRM_GRID, a.shape[1] // CONFIRM_GRID
+    worst = 0.0
+    for y in range(0, tile_height * CONFIRM_GRID, tile_height):
+        for x in range(0, tile_width * CONFIRM_GRID, tile_width):
+            tile_ink = numpy.count_nonzero(ink[y:y + tile_height, x:x + tile_width])
+            if tile_ink >= CONFIRM_MIN_TILE_INK:
+                worst = max(worst, numpy.count_nonzero(differs[y:y + tile_height, x:x + tile_width]) / tile_ink)
+    return float(worst)
+
+# signatures: {page_num: signature}. measure_mismatches([(page_num, candidate), ...]) returns
+# {(page_num, candidate): page_mismatch} - the OCR pool in the pipeline.
+# Returns {page_num: (reason, ink_ratio, duplicate_of, mismatch)} for the pages that do not need
+# OCR; duplicate_of is always a page that is OCR'd itself. A page with some text layer is never
+# blank, and only a duplicate of a page with the same text layer.
+def find_skippable_pages(signatures, prepass_settings, measure_mismatches):
+    skipped = {}
+    for page_num, signature in signatures.items():
+        if signature["ink_ratio"] < prepass_settings["blank_ink_ratio"] and not signature["text"]:
+            skipped[page_num] = ("blank", signature["ink_ratio"], None, None)
+    duplicate_threshold = prepass_settings["duplicate_threshold"] if numpy is not None else 0
+    if duplicate_threshold <= 0:
+        return skipped
+    candidates = find_duplicate_candidates(signatures, skipped)
+    pairs = [(page_num, candidate) for page_num, page_candidates in sorted(candidates.items()) for candidate in page_candidates]
+    mismatches = measure_mismatches(pairs) if pairs else {}
+    for page_num in sorted(candidates):
+        for candidate in candidates[page_num]:
+            mismatch = mismatches.get((page_num, candidate), 1.0)
+            if mismatch <= duplicate_threshold:
+                if candidate in skipped: # Itself a duplicate: point at the page that is OCR'd
+                    candidate = skipped[candidate][2]
+                skipped[page_num] = ("duplicate", signatures[page_num]["ink_ratio"], candidate, mismatch)
+                break
+    return skipped
+
+# <name>_ocr_skipped.tsv: the pages the pre-pass took out of OCR and why
+def write_skipped_report(pdf_path, target_directory, skipped):
+    base_name_no_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+    report_path = os.path.join(target_directory, f"{base_name_no_ext}_ocr_skipped.tsv")
+    try:
+        with open(report_path, "w", encoding="utf-8") as f_report:
+            f_report.write("page\treason\tink_ratio\tduplicate_of\tmismatch\n")
+            for page_num in sorted(skipped):
+                reason, ink_ratio, duplicate_of, mismatch = skipped[page_num]
+                f_report.write(f"{page_num + 1}\t{reason}\t{ink_ratio:.5f}\t{'' if duplicate_of is None else duplicate_of + 1}\t{'' if mismatch is None else f'{mismatch:.3f}'}\n")
+        print(f"Skipped pages report saved: {report_path}")
+    except Exception as e_report:
+        print(f"Could not write skipped pages report ({report_path}): {e_report}")
@@ -0,0 +1,159 @@
+import math
+from PIL import Image
+
+# Optional clean-up of the rendered page before OCR (NumPy, vectorized):
+#
+#   threshold - adaptive (local mean) binarization: uneven paper, bleed-through and color noise
+#               become white, so Tesseract's own thresholding has less to do
+#   deskew    - rotates the page so the text lines are level; the angle is the one whose
+#               horizontal projection profile is sharpest
+#   crop      - cuts the page down to the bounding box of its ink plus a small margin
+#
+# Colour renders are converted to grayscale first. Word boxes found on the processed image are
+# mapped back to the rendered image with map_words_to_render, so the searchable PDF layer still
+# lines up with the page.
+
+try:
+    import numpy # Optional dependency
+except ImportError:
+    numpy = None
+
+PREPROCESS_STEPS = ["threshold", "deskew", "crop"]
+PREPROCESS_CHOICES = ["none", "threshold", "deskew,crop", "threshold,deskew,crop"] # GUI presets
+THRESHOLD_WINDOW_INCHES = 0.25 # Side of the local-mean window, a few text line heights
+THRESHOLD_PERCENT = 15 # Ink is this much darker than its neighbourhood (Bradley-Roth)
+THRESHOLD_MAX_INK_LEVEL = 230 # Lighter pixels are never ink, whatever their surroundings
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_COARSE_STEP = 0.5
+DESKEW_FINE_STEP = 0.1
+DESKEW_MIN_ANGLE = 0.1 # Smaller skews are left alone
+DESKEW_MAX_SIDE_PX = 1200 # The angle is searched on a mask downsampled to this size
+DESKEW_MIN_INK_PIXELS = 200
+CROP_MIN_INK_FRACTION = 0.002 # Rows/columns with less ink than this (speckle) do not extend the box
+CROP_MARGIN_INCHES = 0.1
+
+def is_available():
+    return numpy is not None
+
+# "threshold,crop" / "all" / "none" -> steps in pipeline order
+def parse_preprocess_steps(text):
+    names = [name.strip().lower() for name in (text or "").split(",") if name.strip()]
+    if names in ([], ["none"]):
+        return []
+    if names == ["all"]:
+        return list(PREPROCESS_STEPS)
+    unknown = [name for name in names if name not in PREPROCESS_STEPS]
+    if unknown:
+        raise ValueError(f"unknown preprocessing step(s): {', '.join(unknown)} (choose from {', '.join(PREPROCESS_STEPS)}, all, none)")
+    return [step for step in PREPROCESS_STEPS if step in names]
+
+def to_grayscale_array(img):
+    if img.mode != "L":
+        img = img.convert("L")
+    return numpy.asarray(img)
+
+# Bradley-Roth adaptive threshold with a separable box filter on cumulative sums (int32 is
+# enough: a window sum of 255 * window^2 pixels stays far below 2^31). Returns the ink mask.
+def adaptive_ink_mask(gray, dpi):
+    radius = max(3, int(dpi * THRESHOLD_WINDOW_INCHES) // 2)
+    window = 2 * radius + 1
+    padded = numpy.pad(gray, radius, mode="edge")
+    cumulative = numpy.zeros((padded.shape[0] + 1, padded.shape[1]), dtype=numpy.int32)
+    numpy.cumsum(padded, axis=0, dtype=numpy.int32, out=cumulative[1:])
+    vertical = cumulative[window:] - cumulative[:-window]
+    del cumulative
+    cumulative = numpy.zeros((vertical.shape[0], vertical.shape[1] + 1), dtype=numpy.int32)
+    numpy.cumsum(vertical, axis=1, dtype=numpy.int32, out=cumulative[:, 1:])
+    del vertical
+    window_sums = cumulative[:, window:] - cumulative[:, :-window]
+    del cumulative
+    # pixel < local mean * (1 - percent/100), kept in integers
+    ink = gray.astype(numpy.int32) * (window * window * 100) < window_sums * (100 - THRESHOLD_PERCENT)
+    ink &= gray < THRESHOLD_MAX_INK_LEVEL
+    return ink
+
+def _projection_score(xs, ys, angle):
+    radians = math.radians(angle)
+    rows = numpy.round(ys * math.cos(radians) - xs * math.sin(radians)).astype(numpy.int64)
+    counts = numpy.bincount(rows - rows.min())
+    return float(numpy.dot(counts, counts))
+
+# Angle (degrees, counter-clockwise as in Image.rotate) that levels the text lines of the mask
+def estimate_skew_angle(ink):
+    step = max(1, math.ceil(max(ink.shape) / DESKEW_MAX_SIDE_PX))
+    ys, xs = numpy.nonzero(ink[::step, ::step])
+    if len(xs) < DESKEW_MIN_INK_PIXELS:
+        return 0.0
+    xs = xs - xs.mean()
+    ys = ys - ys.mean()
+    coarse = numpy.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + DESKEW_COARSE_STEP / 2, DESKEW_COARSE_STEP)
+    best = max(coarse, key=lambda angle: _projection_score(xs, ys, angle))
+    fine = numpy.arange(best - DESKEW_COARSE_STEP, best + DESKEW_COARSE_STEP + DESKEW_FINE_STEP / 2, DESKEW_FINE_STEP)
+    best = max(fine, key=lambda angle: _projection_score(xs, ys, angle))
+    return round(float(best), 2)
+
+# (left, top, right, bottom) of the ink, padded by the margin, or None for an empty page
+def content_bounding_box(ink, dpi):
+    row_ink = numpy.count_nonzero(ink, axis=1)
+    col_ink = numpy.count_nonzero(ink, axis=0)
+    rows = numpy.nonzero(row_ink >= max(1, ink.shape[1] * CROP_MIN_INK_FRACTION))[0]
+    cols = numpy.nonzero(col_ink >= max(1, ink.shape[0] * CROP_MIN_INK_FRACTION))[0]
+    if not len(rows) or not len(cols):
+        return None
+    margin = int(dpi * CROP_MARGIN_INCHES)
+    return (max(0, int(cols[0]) - margin), max(0, int(rows[0]) - margin),
+            min(ink.shape[1], int(cols[-1]) + 1 + margin), min(ink.shape[0], int(rows[-1]) + 1 + margin))
+
+# Returns (image for OCR, transform). The transform is None when the geometry is unchanged,
+# otherwise what map_words_to_render needs to undo the rotation and crop.
+def preprocess_image(img, steps, dpi):
+    gray = to_grayscale_array(img)
+    ink = adaptive_ink_mask(gray, dpi)
+    if "threshold" in steps:
+        out_img = Image.fromarray(numpy.where(ink, 0, 255).astype(numpy.uint8), "L")
+    else:
+        out_img = Image.fromarray(gray, "L") if img.mode == "L" else img.convert("L")
+    del gray
+    transform = {"angle": 0.0, "size": out_img.size, "rotated_size": out_img.size, "offset": (0, 0)}
+
+    if "deskew" in steps:
+        angle = estimate_skew_angle(ink)
+        if abs(angle) >= DESKEW_MIN_ANGLE:
+            resample = Image.Resampling.NEAREST if "threshold" in steps else Image.Resampling.BILINEAR
+            out_img = out_img.rotate(angle, resample=resample, expand=True, fillcolor=255)
+            if "crop" in steps:
+                ink_img = Image.fromarray(ink.astype(numpy.uint8) * 255, "L").rotate(angle, resample=Image.Resampling.NEAREST, expand=True, fillcolor=0)
+                ink = numpy.asarray(ink_img) > 0
+            transform["angle"] = angle
+            transform["rotated_size"] = out_img.size
+
+    if "crop" in steps:
+        box = content_bounding_box(ink, dpi)
+        if box is not None and box != (0, 0) + out_img.size:
+            out_img = out_img.crop(box)
+            transform["offset"] = box[:2]
+
+    out_img.format = "PPM"
+    if transform["angle"] == 0.0 and transform["offset"] == (0, 0):
+        return out_img, None
+    return out_img, transform
+
+# Maps word boxes from the processed image back to the rendered image (bounding box of the
+# rotated corners)
+def map_words_to_render(words, transform):
+    if not transform:
+        return words
+    offset_x, offset_y = transform["offset"]
+    radians = math.radians(transform["angle"])
+    cos_a, sin_a = math.cos(radians), math.sin(radians)
+    rotated_cx, rotated_cy = transform["rotated_size"][0] / 2, transform["rotated_size"][1] / 2
+    cx, cy = transform["size"][0] / 2, transform["size"][1] / 2
+    mapped = []
+    for left, top, right, bottom, text in words:
+        xs, ys = [], []
+        for x, y in ((left, top), (right, top), (left, bottom), (right, bottom)):
+            dx, dy = x + offset_x - rotated_cx, y + offset_y - rotated_cy
+            xs.append(cx + cos_a * dx - sin_a * dy)
+            ys.append(cy + sin_a * dx + cos_a * dy)
+        mapped.append((min(xs), min(ys), max(xs), max(ys), text))
+    return mapped
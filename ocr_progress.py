@@ -0,0 +1,119 @@
+import collections
+import threading
+import time
+
+# Progress channel between convert_files (and the threads it runs) and whatever shows progress.
+# Producers call status/progress/finish from any thread; they only swap the latest values under
+# a lock, so a page that completes every few milliseconds costs nothing on the UI side. The
+# consumer calls drain at its own pace - the GUI from the Tk loop every GUI_POLL_MS, the
+# headless CLI from ConsoleProgress every HEADLESS_INTERVAL_SECONDS - and gets at most one
+# snapshot per call. cancel() sets cancel_event, which convert_files checks between tasks.
+
+GUI_POLL_MS = 100 # At most 10 GUI updates per second
+HEADLESS_INTERVAL_SECONDS = 2.0
+RATE_WINDOW_SECONDS = 30.0 # pages/sec is measured over the last half minute
+MIN_RATE_SECONDS = 1.0 # No rate (and no ETA) before this much time has been measured
+
+class ProgressChannel:
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._status = ""
+        self._pages_done = 0
+        self._total_pages = 0
+        self._samples = collections.deque() # (monotonic time, pages_done)
+        self._finished = False
+        self._result = None
+        self._changed = False
+
+    def status(self, message):
+        with self._lock:
+            self._status = message
+            self._changed = True
+
+    def progress(self, pages_done, total_pages):
+        now = time.monotonic()
+        with self._lock:
+            if pages_done < self._pages_done or total_pages != self._total_pages:
+                self._samples.clear() # New batch
+            self._pages_done, self._total_pages = pages_done, total_pages
+            self._samples.append((now, pages_done))
+            while len(self._samples) > 2 and now - self._samples[1][0] > RATE_WINDOW_SECONDS:
+                self._samples.popleft()
+            self._changed = True
+
+    # result is handed to the consumer with the last snapshot (the GUI's list of failures)
+    def finish(self, result=None):
+        with self._lock:
+            self._finished = True
+            self._result = result
+            self._changed = True
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self._lock:
+            self._changed = True
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    # Returns the current state as a dict, or None when nothing changed since the last call
+    def drain(self):
+        with self._lock:
+            if not self._changed:
+                return None
+            self._changed = False
+            rate = None
+            if len(self._samples) >= 2:
+                (first_time, first_done), (last_time, last_done) = self._samples[0], self._samples[-1]
+                if last_time - first_time >= MIN_RATE_SECONDS:
+                    rate = (last_done - first_done) / (last_time - first_time)
+            remaining = self._total_pages - self._pages_done
+            eta = remaining / rate if rate and remaining > 0 else None
+            return {"status": self._status, "pages_done": self._pages_done, "total_pages": self._total_pages,
+                    "fraction": self._pages_done / self._total_pages if self._total_pages else 0.0,
+                    "rate": rate, "eta_seconds": eta, "cancelled": self.cancel_event.is_set(),
+                    "finished": self._finished, "result": self._result}
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+# "120/500 pages (24%), 3.2 pages/sec, ETA 2m 00s"
+def format_progress(snapshot):
+    text = f"{snapshot['pages_done']}/{snapshot['total_pages']} pages ({snapshot['fraction'] * 100:.0f}%)"
+    if snapshot["rate"] is not None:
+        text += f", {snapshot['rate']:.1f} pages/sec"
+    if snapshot["eta_seconds"] is not None:
+        text += f", ETA {format_duration(snapshot['eta_seconds'])}"
+    return text
+
+# Prints the channel's state from a background thread in headless mode, at most once per interval
+class ConsoleProgress:
+    def __init__(self, channel, interval=HEADLESS_INTERVAL_SECONDS):
+        self.channel = channel
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._print()
+
+    def _print(self):
+        snapshot = self.channel.drain()
+        if snapshot is not None and snapshot["total_pages"]:
+            print(f"Progress: {format_progress(snapshot)} - {snapshot['status']}", flush=True)
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        self._print()
@@ -0,0 +1,157 @@
+import math
+import statistics
+import fitz # PyMuPDF
+from PIL import Image
+
+# Per-page rendering policy. The OCR resolution is chosen from a quick estimate of the text
+# line height on a low-resolution thumbnail (large print does not need 300 DPI), and pages
+# that would still exceed the pixel budget (A3/A0 drawings, newspaper spreads) are rendered
+# and OCR'd as overlapping tiles, so a worker never holds more than one tile's pixels.
+
+DEFAULT_MAX_PAGE_MEGAPIXELS = 40
+MIN_ADAPTIVE_DPI = 150
+THUMBNAIL_DPI = 50
+TARGET_LINE_HEIGHT_PX = 48 # Ink height of a text line Tesseract reads best (x-height ~20-25 px)
+INK_ROW_DELTA = 8 # How much darker than the paper a thumbnail row must be to count as text
+TILE_OVERLAP_PT = 36 # Half an inch, two to three lines of body text
+MIN_STRIP_HEIGHT_PX = 1500 # Full-width strips are preferred while they can be at least this tall
+MIN_PAGE_MEGAPIXELS = 1 # Smallest --max-page-megapixels the CLI accepts
+MAX_SEAM_LINES = 6 # Duplicate lines looked for at each horizontal seam
+RENDER_POLICY_VERSION = 1 # Part of the OCR cache key; bump when the policy changes its output
+
+def render_policy_key(ocr_options):
+    adaptive = "adaptive" if ocr_options.get("adaptive_dpi", True) else "fixed"
+    preprocess = "+".join(ocr_options.get("preprocess") or [])
+    return (f"{adaptive}:{max_page_pixels(ocr_options)}:v{RENDER_POLICY_VERSION}" + (f":pre={preprocess}" if preprocess else "")
+            + (":osd" if ocr_options.get("osd") else ""))
+
+def max_page_pixels(ocr_options):
+    return int(ocr_options.get("max_page_megapixels", DEFAULT_MAX_PAGE_MEGAPIXELS) * 1_000_000)
+
+# Median height (in inches) of the dark row runs of a grayscale thumbnail, or None if the page
+# shows no line structure (blank pages, photos)
+def estimate_line_height_inches(page):
+    pix = page.get_pixmap(dpi=THUMBNAIL_DPI, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    row_means = list(img.resize((1, img.height), Image.BOX).getdata())
+    if not row_means:
+        return None
+    paper = max(row_means)
+    runs, run_length = [], 0
+    for row_mean in row_means:
+        if row_mean < paper - INK_ROW_DELTA:
+            run_length += 1
+        elif run_length:
+            runs.append(run_length)
+            run_length = 0
+    if run_length:
+        runs.append(run_length)
+    runs = [run for run in runs if run >= 2]
+    if len(runs) < 3:
+        return None
+    return statistics.median(runs) / THUMBNAIL_DPI
+
+def choose_page_dpi(page, max_dpi, ocr_options):
+    if not ocr_options.get("adaptive_dpi", True):
+        return max_dpi
+    line_height = estimate_line_height_inches(page)
+    if not line_height:
+        return max_dpi
+    return int(min(max_dpi, max(MIN_ADAPTIVE_DPI, TARGET_LINE_HEIGHT_PX / line_height)))
+
+# Returns (clips, cols): clip rects in reading order (rows top to bottom, columns left to right),
+# or ([None], 1) when the whole page fits in the pixel budget
+def plan_page_tiles(rect, dpi, max_pixels):
+    scale = dpi / 72
+    width_px, height_px = rect.width * scale, rect.height * scale
+    if width_px * height_px <= max_pixels:
+        return [None], 1
+
+    overlap = TILE_OVERLAP_PT
+    if width_px * MIN_STRIP_HEIGHT_PX <= max_pixels:
+        cols = 1
+    else:
+        cols = math.ceil(width_px / (math.sqrt(max_pixels) - overlap * scale))
+    core_width = rect.width / cols
+    tile_width_px = (core_width + (overlap if cols > 1 else 0)) * scale
+    max_tile_height = max_pixels / tile_width_px / scale
+    rows = math.ceil(rect.height / max(max_tile_height - overlap, overlap))
+    core_height = rect.height / rows
+
+    clips = []
+    for row in range(rows):
+        for col in range(cols):
+            clip = fitz.Rect(rect.x0 + col * core_width - overlap / 2, rect.y0 + row * core_height - overlap / 2,
+                             rect.x0 + (col + 1) * core_width + overlap / 2, rect.y0 + (row + 1) * core_height + overlap / 2)
+            clips.append(clip & rect)
+    return clips, cols
+
+# Highest DPI up to `dpi` at which the whole page fits in max_pixels, for renders that cannot be tiled
+def fit_dpi_to_pixels(rect, dpi, max_pixels):
+    dpi = min(dpi, int(72 * math.sqrt(max_pixels / max(rect.width * rect.height, 1))))
+    while dpi > 1 and math.ceil(rect.width * dpi / 72) * math.ceil(rect.height * dpi / 72) > max_pixels:
+        dpi -= 1
+    return max(dpi, 1)
+
+# Highest DPI at which a square tile of max_pixels is still twice the tile overlap; above it
+# plan_page_tiles cannot make progress across the page
+def max_tiling_dpi(max_pixels):
+    return max(1, int(72 * math.sqrt(max_pixels) / (2 * TILE_OVERLAP_PT)))
+
+# Returns (dpi, clips, cols) for one page. With a very small pixel budget the DPI is lowered
+# until the page can be tiled.
+def plan_page_render(page, max_dpi, ocr_options):
+    max_pixels = max_page_pixels(ocr_options)
+    dpi = min(choose_page_dpi(page, max_dpi, ocr_options), max_tiling_dpi(max_pixels))
+    clips, cols = plan_page_tiles(page.rect, dpi, max_pixels)
+    return dpi, clips, cols
+
+def _normalized_line(line):
+    return " ".join(line.split()).lower()
+
+# Joins tile texts back into one page text. Tiles in a row are concatenated; at each horizontal
+# seam, lines that were OCR'd in both overlapping tiles are dropped from the lower tile.
+def stitch_tile_texts(tile_texts, cols, page_separator="\f"):
+    tile_texts = [text.rstrip(page_separator) for text in tile_texts]
+    row_texts = ["\n".join(tile_texts[start:start + cols]) for start in range(0, len(tile_texts), cols)]
+    stitched_lines = []
+    for row_text in row_texts:
+        lines = row_text.splitlines()
+        previous = [_normalized_line(line) for line in stitched_lines if line.strip()][-MAX_SEAM_LINES:]
+        leading = [(index, _normalized_line(line)) for index, line in enumerate(lines) if line.strip()][:MAX_SEAM_LINES]
+        drop_until = 0
+        for count in range(min(len(previous), len(leading)), 0, -1):
+            if previous[-count:] == [normalized for _, normalized in leading[:count]]:
+                drop_until = leading[count - 1][0] + 1
+                break
+        stitched_lines.extend(lines[drop_until:])
+    return "\n".join(stitched_lines) + page_separator
+
+# Maps the word boxes of a page's tiles (image pixels) to page coordinates (points), rounded to
+# 0.01 pt. Words centred in the half of an overlap that belongs to the neighbouring tile are
+# dropped, so nothing is doubled along the seams.
+def page_words_from_tiles(tile_words, clips, dpi):
+    scale = 72 / dpi
+    page_rect = None
+    for clip in clips:
+        if clip is not None:
+            page_rect = fitz.Rect(clip) if page_rect is None else page_rect | clip
+    half_overlap = TILE_OVERLAP_PT / 2
+    page_words = []
+    for words, clip in zip(tile_words, clips):
+        if clip is None:
+            origin_x = origin_y = 0
+            core = None
+        else:
+            origin_x, origin_y = clip.x0, clip.y0
+            core = (clip.x0 + (half_overlap if clip.x0 > page_rect.x0 else 0), clip.y0 + (half_overlap if clip.y0 > page_rect.y0 else 0),
+                    clip.x1 - (half_overlap if clip.x1 < page_rect.x1 else 0), clip.y1 - (half_overlap if clip.y1 < page_rect.y1 else 0))
+        for left, top, right, bottom, text in words:
+            box = [round(origin_x + left * scale, 2), round(origin_y + top * scale, 2),
+                   round(origin_x + right * scale, 2), round(origin_y + bottom * scale, 2)]
+            if core is not None:
+                center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+                if not (core[0] <= center_x < core[2] and core[1] <= center_y < core[3]):
+                    continue
+            page_words.append(box + [text])
+    return page_words
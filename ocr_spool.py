@@ -0,0 +1,268 @@
+import os
+import pickle
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+# Multi-machine OCR over a shared spool directory (NFS/SMB mount, or a local folder for several
+# workers on one host). The coordinator is a normal convert_files run whose pool is a SpoolPool;
+# workers are started on any machine that sees the spool with `ocr-pdf-converter.py --spool-worker DIR`.
+#
+#   DIR/<batch>/batch.pickle            lease length of the batch
+#   DIR/<batch>/documents/<n>.pdf       the input PDFs, linked or copied once per batch
+#   DIR/<batch>/tasks/<seq>.task        queued tasks: (function name, task)
+#   DIR/<batch>/leased/<seq>.<claim>    a task claimed by a worker (atomic rename from tasks/);
+#                                       the worker touches it every lease/4 seconds
+#   DIR/<batch>/results/<seq>.result    (claim, result) or (claim, None, error), written atomically
+#
+# A lease whose file has not been touched for lease_seconds (measured on the coordinator's own
+# clock, so the machines' clocks do not need to agree) is renamed back to tasks/ for another
+# worker. After MAX_TASK_ATTEMPTS expired or failed attempts the coordinator runs the task
+# itself. Results of a task that was already completed are dropped, so a slow worker that lost
+# its lease does no harm. Tasks and results are pickled: only give users you trust write access
+# to the spool.
+# While tasks are waiting and no worker holds a lease, the coordinator warns after
+# NO_WORKER_WARNING_SECONDS and gives up with an error after worker_timeout seconds.
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_WORKER_TIMEOUT = 600
+NO_WORKER_WARNING_SECONDS = 60
+MAX_TASK_ATTEMPTS = 3
+POLL_SECONDS = 0.2
+SPOOL_TASK_FUNCTIONS = ("run_scheduled_page_task", "run_prepass_task", "run_prepass_confirm_task") # Functions workers may run
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f_out:
+        f_out.write(data)
+    os.replace(tmp_path, path)
+
+def _read_pickle(path):
+    with open(path, "rb") as f_in:
+        return pickle.load(f_in)
+
+# ---- Coordinator side ----
+
+# Stands in for the OCR pool of convert_files. Tasks must be (doc_index, (pdf_path, ...)) like
+# run_scheduled_page_task's and the pre-pass tasks'; pdf_path is replaced by the spool copy.
+# Setting cancel_event ends imap_unordered without waiting for the tasks still out.
+class SpoolPool:
+    def __init__(self, spool_dir, lease_seconds=DEFAULT_LEASE_SECONDS, worker_timeout=DEFAULT_WORKER_TIMEOUT, cancel_event=None):
+        self.batch_dir = os.path.join(os.path.abspath(spool_dir), f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}")
+        self.lease_seconds = lease_seconds
+        self.worker_timeout = worker_timeout
+        self.cancel_event = cancel_event
+        for name in ("documents", "tasks", "leased", "results"):
+            os.makedirs(os.path.join(self.batch_dir, name), exist_ok=True)
+        _write_atomic(os.path.join(self.batch_dir, "batch.pickle"), pickle.dumps({"lease_seconds": lease_seconds}))
+        self.documents = {} # pdf_path -> name in documents/
+        self.next_task = 0
+        print(f"Spool batch: {self.batch_dir} (lease {lease_seconds}s)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.terminate()
+
+    # Removes the batch; workers holding one of its tasks notice when they write the result
+    def terminate(self):
+        shutil.rmtree(self.batch_dir, ignore_errors=True)
+
+    def _spool_document(self, pdf_path):
+        if pdf_path not in self.documents:
+            name = f"{len(self.documents)}.pdf"
+            target_path = os.path.join(self.batch_dir, "documents", name)
+            try:
+                os.link(pdf_path, target_path)
+            except OSError:
+                shutil.copyfile(pdf_path, target_path + ".tmp")
+                os.replace(target_path + ".tmp", target_path)
+            self.documents[pdf_path] = name
+        return self.documents[pdf_path]
+
+    def _queue(self, task_id, function_name, task):
+        _write_atomic(os.path.join(self.batch_dir, "tasks", f"{task_id}.task"), pickle.dumps((function_name, task)))
+
+    # Same contract as multiprocessing.Pool.imap_unordered: yields fn(task) as tasks complete.
+    # cancel_event defaults to the pool's.
+    def imap_unordered(self, fn, iterable, cancel_event=None):
+        cancel_event = cancel_event or self.cancel_event
+        if fn.__name__ not in SPOOL_TASK_FUNCTIONS:
+            raise ValueError(f"{fn.__name__} cannot be run by spool workers")
+        pending = {} # task_id -> task
+        for task in iterable:
+            doc_index, range_args = task
+            spooled_task = (doc_index, (self._spool_document(range_args[0]),) + tuple(range_args[1:]))
+            task_id = f"{self.next_task:08d}"
+            self.next_task += 1
+            self._queue(task_id, fn.__name__, spooled_task)
+            pending[task_id] = task
+
+        attempts = {task_id: 0 for task_id in pending}
+        lease_seen = {} # lease file -> (mtime, coordinator time it last changed)
+        results_dir, leased_dir = os.path.join(self.batch_dir, "results"), os.path.join(self.batch_dir, "leased")
+        idle_seconds, warned = 0, False # Time spent polling while no worker held a lease
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            found_result = lease_held = False
+            for file_name in sorted(os.listdir(results_dir)):
+                if not file_name.endswith(".result"):
+                    continue
+                path = os.path.join(results_dir, file_name)
+                task_id = file_name[:-len(".result")]
+                try:
+                    result = _read_pickle(path)
+                    os.remove(path)
+                except (OSError, EOFError, pickle.UnpicklingError) as e:
+                    print(f"Spool: unreadable result {file_name}: {e}")
+                    continue
+                if task_id not in pending:
+                    continue # Completed by an earlier claim
+                found_result = True
+                if result[1] is None:
+                    print(f"Spool: task {task_id} failed on a worker: {result[2].strip().splitlines()[-1]}")
+                    yield from self._retry_or_run_locally(fn, task_id, pending, attempts)
+                    continue
+                pending.pop(task_id)
+                yield result[1]
+
+            now = time.monotonic()
+            for file_name in os.listdir(leased_dir):
+                path = os.path.join(leased_dir, file_name)
+                task_id = file_name.split(".")[0]
+                try:
+                    mtime = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    lease_seen.pop(file_name, None)
+                    continue
+                if task_id not in pending:
+                    continue
+                lease_held = True
+                seen_mtime, changed_at = lease_seen.get(file_name, (None, now))
+                if seen_mtime != mtime:
+                    lease_seen[file_name] = (mtime, now)
+                elif now - changed_at > self.lease_seconds:
+                    lease_seen.pop(file_name)
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue # The worker just finished it
+                    print(f"Spool: lease of task {task_id} expired, requeueing")
+                    yield from self._retry_or_run_locally(fn, task_id, pending, attempts)
+            if found_result or lease_held:
+                idle_seconds, warned = 0, False
+            elif idle_seconds > self.worker_timeout:
+                raise RuntimeError(f"no spool worker took a task for {idle_seconds:.0f}s ({len(pending)} task(s) left in {self.batch_dir})")
+            elif idle_seconds > NO_WORKER_WARNING_SECONDS and not warned:
+                print(f"Spool: no worker has taken a task for {idle_seconds:.0f}s; start workers with --spool-worker --spool-dir {os.path.dirname(self.batch_dir)}")
+                warned = True
+            if not found_result:
+                time.sleep(POLL_SECONDS)
+                idle_seconds += POLL_SECONDS
+
+    def _retry_or_run_locally(self, fn, task_id, pending, attempts):
+        attempts[task_id] += 1
+        if attempts[task_id] < MAX_TASK_ATTEMPTS:
+            doc_index, range_args = pending[task_id]
+            self._queue(task_id, fn.__name__, (doc_index, (self.documents[range_args[0]],) + tuple(range_args[1:])))
+            return
+        print(f"Spool: task {task_id} failed {attempts[task_id]} times on workers, running it here")
+        yield fn(pending.pop(task_id))
+
+# ---- Worker side ----
+
+def _claim_task(spool_dir, claim_prefix):
+    try:
+        batch_names = sorted(os.listdir(spool_dir))
+    except FileNotFoundError:
+        return None
+    for batch_name in batch_names:
+        batch_dir = os.path.join(spool_dir, batch_name)
+        try:
+            task_names = sorted(os.listdir(os.path.join(batch_dir, "tasks")))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for task_name in task_names:
+            if not task_name.endswith(".task"):
+                continue
+            task_id = task_name[:-len(".task")]
+            lease_path = os.path.join(batch_dir, "leased", f"{task_id}.{claim_prefix}-{uuid.uuid4().hex[:8]}")
+            try:
+                os.rename(os.path.join(batch_dir, "tasks", task_name), lease_path)
+            except FileNotFoundError:
+                continue # Another worker was faster
+            return batch_dir, task_id, lease_path
+    return None
+
+def _heartbeat(lease_path, interval, stop_event):
+    while not stop_event.wait(interval):
+        try:
+            os.utime(lease_path)
+        except FileNotFoundError:
+            return # Lease expired and was requeued; the result is still delivered
+
+# Localizes a task for this machine: the spool copy of the PDF, this worker's Tesseract and OCR cache
+def _local_task(ocr_pipeline, function_name, task, batch_dir, worker_settings):
+    doc_index, range_args = task
+    range_args = (os.path.join(batch_dir, "documents", range_args[0]),) + tuple(range_args[1:])
+    if function_name == "run_scheduled_page_task":
+        ocr_options = dict(range_args[5])
+        ocr_options.pop("profile_dir", None)
+        ocr_options.pop("cache_dir", None)
+        if worker_settings.get("cache_dir") and task[1][5].get("cache_dir"):
+            ocr_options["cache_dir"] = worker_settings["cache_dir"]
+        range_args = range_args[:4] + (worker_settings.get("tesseract_cmd"), ocr_options) + range_args[6:]
+    return doc_index, range_args
+
+# Runs tasks from every batch in the spool until stopped, or until idle_exit_seconds pass
+# without work. worker_settings: {"cache_dir": this machine's OCR cache or None}
+def run_spool_worker(spool_dir, worker_settings=None, idle_exit_seconds=None):
+    import ocr_pipeline # Not at module level: ocr_pipeline imports this module
+    import pytesseract
+    worker_settings = dict(worker_settings or {})
+    ocr_pipeline.is_tesseract_available()
+    worker_settings["tesseract_cmd"] = getattr(pytesseract.pytesseract, "tesseract_cmd", None)
+    spool_dir = os.path.abspath(spool_dir)
+    claim_prefix = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Spool worker {claim_prefix} waiting for tasks in {spool_dir}")
+    idle_since = time.monotonic()
+    tasks_done = 0
+    while True:
+        claim = _claim_task(spool_dir, claim_prefix)
+        if claim is None:
+            if idle_exit_seconds is not None and time.monotonic() - idle_since > idle_exit_seconds:
+                print(f"Spool worker {claim_prefix}: idle, exiting after {tasks_done} task(s)")
+                return tasks_done
+            time.sleep(POLL_SECONDS)
+            continue
+        batch_dir, task_id, lease_path = claim
+        stop_event = threading.Event()
+        try:
+            function_name, task = _read_pickle(lease_path)
+            lease_seconds = _read_pickle(os.path.join(batch_dir, "batch.pickle"))["lease_seconds"]
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            print(f"Spool worker {claim_prefix}: could not read task {task_id}: {e}")
+            continue
+        heartbeat = threading.Thread(target=_heartbeat, args=(lease_path, max(1.0, lease_seconds / 4), stop_event), daemon=True)
+        heartbeat.start()
+        try:
+            if function_name not in SPOOL_TASK_FUNCTIONS:
+                raise ValueError(f"unknown task function {function_name}")
+            result = (claim_prefix, getattr(ocr_pipeline, function_name)(_local_task(ocr_pipeline, function_name, task, batch_dir, worker_settings)))
+        except Exception:
+            result = (claim_prefix, None, traceback.format_exc())
+        finally:
+            stop_event.set()
+            heartbeat.join()
+        try:
+            _write_atomic(os.path.join(batch_dir, "results", f"{task_id}.result"), pickle.dumps(result))
+            os.remove(lease_path)
+        except FileNotFoundError:
+            pass # Batch finished or cancelled meanwhile, or the lease was requeued
+        tasks_done += 1
+        idle_since = time.monotonic()
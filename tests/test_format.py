@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_format
+import ocr_journal
+
+# (pages, expected Markdown). Expected outputs are those of the original single-pass
+# format_text_with_heuristics on the pages joined by blank lines.
+GOLDEN_CASES = {
+    "chapter_headings": (
+        ["Chapter 1 The Beginning\nIt was a dark night.\n\n2 - CHAPTER 4: road ahead\nchapter\nMore text."],
+        "# THE BEGINNING\nIt was a dark night.\n\n# ROAD AHEAD\nchapter\nMore text.",
+    ),
+    "numbered_headings": (
+        ["1. Introduction to Methods\n2.3 Results and Discussion\n3 lower case start\n"
+         "4.1 This heading has far too many words to be a heading at all ok\n12345"],
+        "## 1. Introduction to Methods\n## 2.3 Results and Discussion\n3 lower case start\n"
+        "4.1 This heading has far too many words to be a heading at all ok\n12345",
+    ),
+    "all_caps_lines": (
+        ["The previous line ends here.\nTHE GREAT HALL\nBody starts with a capital.\n\nsome text without a stop\n"
+         "NOT A HEADING\nBody.\n\nTHE END.\nMIXED CASE LINE\nlowercase next line"],
+        "The previous line ends here.\n### THE GREAT HALL\nBody starts with a capital.\n\nsome text without a stop\n"
+        "NOT A HEADING\nBody.\n\nTHE END.\nMIXED CASE LINE\nlowercase next line",
+    ),
+    "keyword_headings": (
+        ["ABSTRACT\nIntroduction:\nBody text here.\nReferences\n# Heading\nconclusion.\nSummary of the study"],
+        "### ABSTRACT\nIntroduction:\nBody text here.\nReferences\n# Heading\n## Conclusion.\nSummary of the study",
+    ),
+    "text_then_number": (
+        ["Getting Started - 12\nThe Long Title \u2014 123\nx - 1\nBody text - 5 more"],
+        "### Getting Started\n### The Long Title\nx - 1\nBody text - 5 more",
+    ),
+    "form_feeds": (
+        ["First page text.\n\fSECOND PAGE TITLE\nBody.\f\n\n\n\nINTRODUCTION\n\n\n\nLast line - 7\f"],
+        "First page text.\n\n### SECOND PAGE TITLE\nBody.\n\n### INTRODUCTION\n\n### Last line",
+    ),
+    "page_seams": (
+        ["Page one ends with a stop.\n\n\n\f", "\n\nCONTENTS\nChapter 2 Growth\n\f", "\f", "Abstract\nBody text.\n\n\n"],
+        "Page one ends with a stop.\n\n### CONTENTS\n# GROWTH\n\n## Abstract\nBody text.\n\n",
+    ),
+}
+
+@pytest.mark.parametrize("name", sorted(GOLDEN_CASES))
+def test_format_text_with_heuristics(name):
+    pages, expected = GOLDEN_CASES[name]
+    assert ocr_format.format_text_with_heuristics(ocr_journal.PAGE_JOINER.join(pages)) == expected
+
+# The streaming path of StreamingDocumentWriter: pages formatted on their own, blank lines collapsed across the seams
+@pytest.mark.parametrize("name", sorted(GOLDEN_CASES))
+def test_format_page_text_with_blank_line_collapser(name):
+    pages, expected = GOLDEN_CASES[name]
+    blank_lines = ocr_format.BlankLineCollapser()
+    output = []
+    for page_num, page_text in enumerate(pages):
+        if page_num > 0:
+            output.append(blank_lines.feed(ocr_journal.PAGE_JOINER))
+        output.append(blank_lines.feed(ocr_format.format_page_text(page_text)))
+    output.append(blank_lines.finish())
+    assert "".join(output) == expected
+
+def test_escape_markdown():
+    assert ocr_format.escape_markdown(r"C:\temp\file") == r"C:\\temp\\file"
@@ -0,0 +1,37 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_latex
+import ocr_pipeline
+
+def mylatexformat_available():
+    if not (shutil.which("pandoc") and shutil.which("pdflatex") and shutil.which("kpsewhich")):
+        return False
+    proc = subprocess.run(["kpsewhich", "mylatexformat.ltx"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return proc.returncode == 0 and proc.stdout.strip() != b""
+
+pytestmark = pytest.mark.skipif(not mylatexformat_available(), reason="needs pandoc, pdflatex and mylatexformat.ltx")
+
+def test_preamble_format_is_built_once_and_typesets_the_pdf(tmp_path):
+    settings = ocr_pipeline.resolve_pandoc_settings(pdf_engine="pdflatex", precompiled_preamble=True)
+    format_directory = str(tmp_path / "formats")
+    messages = []
+    for name in ("one", "two"):
+        markdown_path = tmp_path / f"{name}.md"
+        markdown_path.write_text(f"# Chapter {name}\n\nSome text of document {name}.\n", encoding="utf-8")
+        output_pdf_path = str(tmp_path / f"{name}.pdf")
+        ocr_latex.run_pandoc_with_preamble_format(
+            lambda tex_path: ocr_pipeline.build_pandoc_command(tex_path, settings, str(markdown_path)),
+            str(markdown_path), output_pdf_path, "pdflatex", format_directory, messages.append)
+        with open(output_pdf_path, "rb") as f_pdf:
+            assert f_pdf.read(5) == b"%PDF-"
+
+    # Both documents share the preamble, so the format was dumped for the first one only
+    formats = os.listdir(format_directory)
+    assert len(formats) == 1 and formats[0].endswith(".fmt")
+    assert len([message for message in messages if message.startswith("Precompiled LaTeX preamble")]) == 1
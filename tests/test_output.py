@@ -0,0 +1,20 @@
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_output
+
+def test_invisible_words_stay_inside_their_boxes():
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=200)
+    words = [(10, 20, 90, 40, "Hello"), (100, 20, 120, 40, "Wide word"), (10, 100, 200, 104, "tiny")]
+    ocr_output.add_invisible_words(page, words)
+
+    spans = [span for block in page.get_text("dict")["blocks"] for line in block["lines"] for span in line["spans"]]
+    assert [span["text"] for span in spans] == [text for *_, text in words]
+    for span, (x0, y0, x1, y1, text) in zip(spans, words):
+        span_x0, span_y0, span_x1, span_y1 = span["bbox"]
+        assert span_x0 >= x0 - 0.01 and span_x1 <= x1 + 0.01
+        assert span_y0 >= y0 - 0.01 and span_y1 <= y1 + 0.01
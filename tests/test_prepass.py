@@ -0,0 +1,93 @@
+import io
+import os
+import random
+import sys
+
+import fitz
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_prepass
+
+WORDS = "the of and to in is was that for on with as by at from his her they have this which are one had not but were all can their there been when who will more would if no out so said what up its about into than them only other new some".split()
+SCAN_DPI = 150
+
+def book_lines(rng):
+    lines = []
+    for _ in range(40):
+        line = ""
+        while len(line) < 70:
+            line += rng.choice(WORDS) + " "
+        lines.append(line[:70])
+    return lines
+
+# A scanned book page: the same margins, font and line count for every page, only the words differ
+def scanned_page(lines):
+    scale = SCAN_DPI / 72
+    img = Image.new("L", (int(595 * scale), int(842 * scale)), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=int(11 * scale))
+    for index, line in enumerate(lines):
+        draw.text((int(72 * scale), int((72 + 15 * index) * scale)), line, fill=20, font=font)
+    data = io.BytesIO()
+    img.save(data, format="PNG")
+    return data.getvalue()
+
+def write_pdf(path, images):
+    doc = fitz.open()
+    for image in images:
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=image)
+    doc.save(path)
+
+def skippable_pages(pdf_path, prepass_settings):
+    doc = fitz.open(pdf_path)
+    signatures = {page_num: ocr_prepass.page_signature(doc.load_page(page_num)) for page_num in range(doc.page_count)}
+    images = {}
+    def measure_mismatches(pairs):
+        for pair in pairs:
+            for page_num in pair:
+                if page_num not in images:
+                    images[page_num] = ocr_prepass.confirmation_image(doc.load_page(page_num))
+        return {(a, b): ocr_prepass.page_mismatch(images[a], images[b]) for a, b in pairs}
+    return ocr_prepass.find_skippable_pages(signatures, prepass_settings, measure_mismatches)
+
+def test_same_layout_pages_with_different_text_are_not_duplicates(tmp_path):
+    rng = random.Random(1)
+    texts = [book_lines(rng) for _ in range(6)]
+    one_word_changed = list(texts[2])
+    one_word_changed[20] = one_word_changed[20][:30] + "XXXXXXX" + one_word_changed[20][37:]
+    images = [scanned_page(lines) for lines in texts]
+    images += [images[4], scanned_page(one_word_changed), images[0]]
+    pdf_path = str(tmp_path / "book.pdf")
+    write_pdf(pdf_path, images)
+
+    skipped = skippable_pages(pdf_path, ocr_prepass.resolve_prepass_settings())
+
+    assert sorted(skipped) == [6, 8]
+    assert skipped[6][:3] == ("duplicate", skipped[6][1], 4)
+    assert skipped[8][2] == 0
+    assert skipped[6][3] <= ocr_prepass.DEFAULT_DUPLICATE_THRESHOLD
+
+def test_duplicate_threshold_zero_turns_duplicates_off(tmp_path):
+    images = [scanned_page(book_lines(random.Random(2)))] * 2
+    pdf_path = str(tmp_path / "copies.pdf")
+    write_pdf(pdf_path, images)
+
+    assert skippable_pages(pdf_path, ocr_prepass.resolve_prepass_settings(duplicate_threshold=0)) == {}
+    assert sorted(skippable_pages(pdf_path, ocr_prepass.resolve_prepass_settings())) == [1]
+
+def test_blank_page_is_skipped(tmp_path):
+    blank = Image.new("L", (595, 842), 255)
+    data = io.BytesIO()
+    blank.save(data, format="PNG")
+    pdf_path = str(tmp_path / "blank.pdf")
+    write_pdf(pdf_path, [scanned_page(book_lines(random.Random(3))), data.getvalue()])
+
+    skipped = skippable_pages(pdf_path, ocr_prepass.resolve_prepass_settings())
+
+    assert list(skipped) == [1]
+    assert skipped[1][0] == "blank"
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_render
+
+def letter_page():
+    doc = fitz.open()
+    return doc, doc.new_page(width=612, height=792)
+
+def test_page_within_budget_is_not_tiled():
+    doc, page = letter_page()
+    assert ocr_render.plan_page_render(page, 300, {"adaptive_dpi": False}) == (300, [None], 1)
+
+def test_oversized_page_is_tiled_over_the_whole_page():
+    doc, page = letter_page()
+    dpi, clips, cols = ocr_render.plan_page_render(page, 300, {"adaptive_dpi": False, "max_page_megapixels": 2})
+    assert dpi == 300 and len(clips) > 1
+    covered = fitz.Rect(clips[0])
+    for clip in clips:
+        assert clip.width * clip.height * (dpi / 72) ** 2 <= 2_000_000
+        covered |= clip
+    assert covered == page.rect
+
+# A budget smaller than the tile overlap at the requested DPI used to give no tiles at all
+def test_degenerate_budget_lowers_the_dpi_instead_of_dropping_the_page():
+    doc, page = letter_page()
+    dpi, clips, cols = ocr_render.plan_page_render(page, 300, {"adaptive_dpi": False, "max_page_megapixels": 0.02})
+    assert 0 < dpi < 300 and cols >= 1 and clips
+    covered = fitz.Rect(clips[0])
+    for clip in clips:
+        covered |= clip
+    assert covered == page.rect
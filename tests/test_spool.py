@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import fitz
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr_pipeline
+import ocr_spool
+
+PAGES = 8
+
+def write_pdf(path):
+    doc = fitz.open()
+    for page_num in range(PAGES):
+        page = doc.new_page(width=300, height=400)
+        page.draw_rect(fitz.Rect(20, 20 + 30 * page_num, 280, 40 + 30 * page_num), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.save(path)
+
+# A spool worker whose pre-pass tasks take long enough to be killed in the middle of one
+def slow_spool_worker(spool_dir, task_seconds, idle_exit_seconds):
+    run_prepass_task = ocr_pipeline.run_prepass_task
+    def slow_prepass_task(task):
+        time.sleep(task_seconds)
+        return run_prepass_task(task)
+    ocr_pipeline.run_prepass_task = slow_prepass_task
+    ocr_spool.run_spool_worker(spool_dir, None, idle_exit_seconds)
+
+def kill_when_leasing(worker, leased_dir, deadline):
+    while time.monotonic() < deadline:
+        if any(f"-{worker.pid}-" in file_name for file_name in os.listdir(leased_dir)):
+            os.kill(worker.pid, signal.SIGKILL)
+            return
+        time.sleep(0.05)
+
+def test_task_of_a_killed_worker_is_requeued(tmp_path, capsys):
+    pdf_path = str(tmp_path / "doc.pdf")
+    write_pdf(pdf_path)
+    spool_dir = str(tmp_path / "spool")
+    tasks = [(0, (pdf_path, [page_num], False)) for page_num in range(PAGES)]
+
+    with ocr_spool.SpoolPool(spool_dir, lease_seconds=1, worker_timeout=30) as pool:
+        workers = [multiprocessing.Process(target=slow_spool_worker, args=(spool_dir, 0.3, 5)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        killer = threading.Thread(target=kill_when_leasing, args=(workers[0], os.path.join(pool.batch_dir, "leased"), time.monotonic() + 30))
+        killer.start()
+        results = list(pool.imap_unordered(ocr_pipeline.run_prepass_task, tasks))
+        killer.join()
+    for worker in workers:
+        worker.join(30)
+
+    assert workers[0].exitcode == -signal.SIGKILL
+    assert workers[1].exitcode == 0
+    assert "expired, requeueing" in capsys.readouterr().out
+    assert sorted(page_num for _, page_results in results for page_num, _, _ in page_results) == list(range(PAGES))
+
+def test_cancel_event_stops_waiting_for_workers(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    write_pdf(pdf_path)
+    cancel_event = threading.Event()
+    threading.Timer(0.5, cancel_event.set).start()
+    with ocr_spool.SpoolPool(str(tmp_path / "spool"), cancel_event=cancel_event) as pool:
+        start = time.monotonic()
+        assert list(pool.imap_unordered(ocr_pipeline.run_prepass_task, [(0, (pdf_path, [0], False))])) == []
+        assert time.monotonic() - start < 5
+
+def test_no_worker_fails_after_the_timeout(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    write_pdf(pdf_path)
+    with ocr_spool.SpoolPool(str(tmp_path / "spool"), worker_timeout=1) as pool:
+        with pytest.raises(RuntimeError, match="no spool worker"):
+            list(pool.imap_unordered(ocr_pipeline.run_prepass_task, [(0, (pdf_path, [0], False))]))